@@ -0,0 +1,233 @@
+# Change Detection — per-field hashes of every stored profile
+# - Each monitored field is reduced to a canonical form and hashed once;
+#   comparing a new profile costs one hash per field, and the old profile is
+#   only read from disk when a hash differs (to report the old value)
+# - List fields are compared as sets: a reordered or repeated "products"
+#   entry is not a change
+# - Hashes live in cache/field_hashes.json (files backend) or
+#   cache/field_hashes.sqlite.json (SQLite backend); each entry carries a
+#   stamp of the stored profile (file mtime + size, or the row's updated_at),
+#   so a profile edited by hand or by another backend is re-hashed
+# - detect() never records the new profile; commit() does, once the profile
+#   has actually been saved
+# - diff_corpus() compares a whole re-crawl against the stored state in one pass
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+FIELD_HASHES_PATH = BASE_DIR / "cache" / "field_hashes.json"
+SQLITE_FIELD_HASHES_PATH = BASE_DIR / "cache" / "field_hashes.sqlite.json"
+
+# Fields to monitor for changes
+MONITORED_FIELDS = [
+    "founded", "headquarters", "summary", "products",
+    "target_market", "pricing_model", "company_size",
+    "key_features", "use_cases", "value_proposition",
+    "market_position", "competitors", "technology_stack",
+]
+
+_lock = threading.RLock()
+_hashes = {} # backend -> {slug: {"stamp": str, "fields": {field: hash}}}
+_dirty = set() # backends with unsaved entries
+
+
+def canonical_value(value) -> str:
+    # Stable text for one field value; lists become sorted sets of their items
+    if isinstance(value, list):
+        items = {json.dumps(item, sort_keys=True, ensure_ascii=False) for item in value}
+        return "[" + ",".join(sorted(items)) + "]"
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+def field_hashes(profile: dict) -> dict:
+    # {field: short hash} for every monitored field
+    return {
+        field: hashlib.blake2b(canonical_value(profile.get(field)).encode("utf-8"), digest_size=12).hexdigest()
+        for field in MONITORED_FIELDS
+    }
+
+
+def diff_fields(old_hashes: dict, new_hashes: dict) -> list:
+    # Monitored fields whose hashes differ, in MONITORED_FIELDS order
+    return [field for field in MONITORED_FIELDS if old_hashes.get(field) != new_hashes.get(field)]
+
+
+def build_changes(fields: list, old_data: dict, new_data: dict) -> list:
+    # [{"field", "old", "new"}] as logged by updater.log_changes
+    return [{"field": field, "old": old_data.get(field), "new": new_data.get(field)} for field in fields]
+
+
+# ---- stored hashes ----
+
+def _backend() -> str:
+    from agents import sqlite_store
+    return "sqlite" if sqlite_store.is_enabled() else "files"
+
+
+def _path(backend: str) -> Path:
+    return SQLITE_FIELD_HASHES_PATH if backend == "sqlite" else FIELD_HASHES_PATH
+
+
+def _load(backend: str) -> dict:
+    if backend not in _hashes:
+        try:
+            with _path(backend).open("r", encoding="utf-8") as f:
+                _hashes[backend] = json.load(f)
+        except Exception:
+            _hashes[backend] = {}
+    return _hashes[backend]
+
+
+def profile_stamp(slug: str, backend: str = None):
+    # Version stamp of the stored profile, or None when there is none
+    if (backend or _backend()) == "sqlite":
+        from agents import sqlite_store
+        return sqlite_store.profile_stamps([slug]).get(slug)
+    from agents.profile_generator import JSON_DIR
+    try:
+        st = (JSON_DIR / f"{slug}.json").stat()
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _all_stamps(backend: str) -> dict:
+    # {slug: stamp} for every stored profile
+    if backend == "sqlite":
+        from agents import sqlite_store
+        return sqlite_store.profile_stamps()
+    from agents.profile_generator import JSON_DIR
+    return {path.stem: profile_stamp(path.stem, backend) for path in JSON_DIR.glob("*.json")}
+
+
+def save():
+    # Only touches the disk when something new was remembered
+    with _lock:
+        from agents.profile_generator import atomic_write_text
+        for backend in sorted(_dirty):
+            path = _path(backend)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(path, json.dumps(_hashes[backend]))
+        _dirty.clear()
+
+
+def remember(slug: str, hashes: dict, stamp: str, backend: str = None):
+    backend = backend or _backend()
+    entry = {"stamp": stamp, "fields": hashes}
+    with _lock:
+        store = _load(backend)
+        if store.get(slug) != entry:
+            store[slug] = entry
+            _dirty.add(backend)
+
+
+def stored_hashes(slug: str, load_profile):
+    # Hashes of the stored profile; computed from it (and remembered) when
+    # missing or stale. Returns (hashes, profile) where profile is only set if
+    # it had to be read.
+    backend = _backend()
+    stamp = profile_stamp(slug, backend)
+    if stamp is None:
+        return None, None
+    with _lock:
+        entry = _load(backend).get(slug)
+    if entry and entry.get("stamp") == stamp:
+        return entry["fields"], None
+    profile = load_profile(slug)
+    if profile is None:
+        return None, None
+    hashes = field_hashes(profile)
+    remember(slug, hashes, stamp, backend)
+    return hashes, profile
+
+
+# ---- detection ----
+
+def detect(slug: str, new_data: dict, load_profile):
+    # Changes between the stored profile and new_data, or None for a new profile.
+    # Nothing about new_data is recorded: call commit() once it is saved.
+    old_hashes, old_data = stored_hashes(slug, load_profile)
+    if old_hashes is None:
+        return None
+
+    fields = diff_fields(old_hashes, field_hashes(new_data))
+    if fields and old_data is None:
+        old_data = load_profile(slug)
+        if old_data is None:
+            return None # deleted between the stamp check and the read
+    return build_changes(fields, old_data or {}, new_data)
+
+
+def commit(slug: str, profile: dict):
+    # The saved profile becomes the stored state; call after it was written
+    backend = _backend()
+    stamp = profile_stamp(slug, backend)
+    if stamp is None:
+        return
+    remember(slug, field_hashes(profile), stamp, backend)
+    save()
+
+
+def _stored_profiles() -> dict:
+    # {slug: profile} for the whole corpus, read once
+    from agents import sqlite_store
+    if sqlite_store.is_enabled():
+        return sqlite_store.all_profiles()
+
+    from agents.profile_generator import JSON_DIR
+    profiles = {}
+    for path in JSON_DIR.glob("*.json"):
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                profiles[path.stem] = json.load(f)
+        except Exception as e:
+            print(f"[CHANGES] Skipping {path.name}: {e}")
+    return profiles
+
+
+def diff_corpus(new_profiles: dict) -> dict:
+    # Compare a full re-crawl {slug: profile} against the stored state in one pass.
+    # Returns {"changed": {slug: [changes]}, "new": [slugs], "missing": [slugs],
+    #          "unchanged": count}. The re-crawl itself is not recorded.
+    backend = _backend()
+    stamps = _all_stamps(backend)
+    with _lock:
+        entries = dict(_load(backend))
+    known = {
+        slug: entries[slug]["fields"] for slug, stamp in stamps.items()
+        if slug in entries and entries[slug].get("stamp") == stamp
+    }
+    new_hashes = {slug: field_hashes(profile) for slug, profile in new_profiles.items()}
+
+    # The stored corpus is read at most once: when a stored profile has no
+    # (current) hashes, or when a field changed and its old value is needed
+    stored = {}
+    needs_old = len(known) < len(stamps) or any(
+        slug in known and diff_fields(known[slug], hashes)
+        for slug, hashes in new_hashes.items()
+    )
+    if needs_old:
+        stored = _stored_profiles()
+        for slug, profile in stored.items():
+            if slug not in known and slug in stamps:
+                known[slug] = field_hashes(profile)
+                remember(slug, known[slug], stamps[slug], backend)
+
+    result = {"changed": {}, "new": [], "missing": [], "unchanged": 0}
+    for slug, profile in sorted(new_profiles.items()):
+        old_hashes = known.get(slug)
+        if old_hashes is None:
+            result["new"].append(slug)
+        else:
+            fields = diff_fields(old_hashes, new_hashes[slug])
+            if fields:
+                result["changed"][slug] = build_changes(fields, stored.get(slug) or {}, profile)
+            else:
+                result["unchanged"] += 1
+
+    result["missing"] = sorted(set(known) - set(new_profiles))
+    save()
+    return result
@@ -0,0 +1,242 @@
+# Change History — structured, append-only record of every detected change
+# - One row per changed field: company, field, old, new, timestamp, run id
+# - Indexed by company and time (and field), so "what changed for Coursera in
+#   the last 30 days" or "which fields churn most" stay fast as history grows
+# - Stored in change_history.sqlite3 whichever profile storage is used
+# - changes.log is a rendered view: blocks are appended as changes are
+#   recorded, and render_log() rebuilds it from the history; blocks the
+#   history does not hold (written before it existed) are kept in place
+
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+HISTORY_PATH = BASE_DIR / "change_history.sqlite3"
+CHANGES_LOG = BASE_DIR / "changes.log"
+
+# Start of one block in changes.log (see render_block)
+BLOCK_START = re.compile(r"(?=\n={70}\n\[)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT,
+    slug TEXT,
+    company TEXT,
+    field TEXT,
+    old TEXT,
+    new TEXT,
+    changed_at REAL
+);
+CREATE INDEX IF NOT EXISTS changes_slug_time ON changes(slug, changed_at);
+CREATE INDEX IF NOT EXISTS changes_time ON changes(changed_at);
+CREATE INDEX IF NOT EXISTS changes_field_time ON changes(field, changed_at);
+CREATE INDEX IF NOT EXISTS changes_run ON changes(run_id);
+"""
+
+_lock = threading.Lock()
+_conn = None
+_run_id = None
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(str(HISTORY_PATH), check_same_thread=False, timeout=30)
+        _conn.row_factory = sqlite3.Row
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.executescript(SCHEMA)
+        _conn.commit()
+    return _conn
+
+
+def start_run(label: str = "") -> str:
+    # New run id for the changes recorded from now on (one per batch / scheduled run)
+    global _run_id
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    _run_id = f"{stamp}-{label + '-' if label else ''}{uuid.uuid4().hex[:6]}"
+    return _run_id
+
+
+def current_run() -> str:
+    return _run_id or start_run()
+
+
+def _row(row) -> dict:
+    return {
+        "run_id": row["run_id"],
+        "slug": row["slug"],
+        "company": row["company"],
+        "field": row["field"],
+        "old": json.loads(row["old"]),
+        "new": json.loads(row["new"]),
+        "changed_at": row["changed_at"],
+    }
+
+
+# ---- recording ----
+
+def record(slug: str, company: str, changes: list, changed_at: float = None, run_id: str = None) -> list:
+    # changes: [{"field", "old", "new"}] as produced by updater.detect_changes.
+    # Returns the stored records and appends their rendered block to changes.log.
+    changed_at = changed_at or time.time()
+    run_id = run_id or current_run()
+    records = [
+        {
+            "run_id": run_id,
+            "slug": slug,
+            "company": company,
+            "field": change["field"],
+            "old": change["old"],
+            "new": change["new"],
+            "changed_at": changed_at,
+        }
+        for change in changes
+    ]
+    if not records:
+        return records
+    rows = [
+        (
+            r["run_id"], r["slug"], r["company"], r["field"],
+            json.dumps(r["old"], ensure_ascii=False),
+            json.dumps(r["new"], ensure_ascii=False),
+            r["changed_at"],
+        )
+        for r in records
+    ]
+    with _lock:
+        conn = _connect()
+        conn.executemany(
+            "INSERT INTO changes (run_id, slug, company, field, old, new, changed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+        with CHANGES_LOG.open("a", encoding="utf-8") as f:
+            f.write(render_block(records))
+    return records
+
+
+# ---- queries ----
+
+def changes_for(slug: str, since: float = 0, until: float = None, field: str = None) -> list:
+    # One company's changes, oldest first
+    sql = "SELECT * FROM changes WHERE slug = ? AND changed_at >= ?"
+    params = [slug, since]
+    if until is not None:
+        sql += " AND changed_at < ?"
+        params.append(until)
+    if field:
+        sql += " AND field = ?"
+        params.append(field)
+    with _lock:
+        rows = _connect().execute(sql + " ORDER BY changed_at, id", params).fetchall()
+    return [_row(r) for r in rows]
+
+
+def changes_since(since: float, until: float = None) -> list:
+    # Every change in a time window, oldest first
+    sql = "SELECT * FROM changes WHERE changed_at >= ?"
+    params = [since]
+    if until is not None:
+        sql += " AND changed_at < ?"
+        params.append(until)
+    with _lock:
+        rows = _connect().execute(sql + " ORDER BY changed_at, id", params).fetchall()
+    return [_row(r) for r in rows]
+
+
+def changes_in_run(run_id: str) -> list:
+    with _lock:
+        rows = _connect().execute(
+            "SELECT * FROM changes WHERE run_id = ? ORDER BY changed_at, id", (run_id,)
+        ).fetchall()
+    return [_row(r) for r in rows]
+
+
+def field_churn(since: float = 0, limit: int = None) -> list:
+    # [(field, number of changes)] most churned first
+    sql = "SELECT field, COUNT(*) AS n FROM changes WHERE changed_at >= ? GROUP BY field ORDER BY n DESC, field"
+    params = [since]
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with _lock:
+        rows = _connect().execute(sql, params).fetchall()
+    return [(r["field"], r["n"]) for r in rows]
+
+
+def companies_changed(since: float = 0) -> list:
+    # [(slug, number of changes, last change time)] most recently changed first
+    with _lock:
+        rows = _connect().execute(
+            "SELECT slug, COUNT(*) AS n, MAX(changed_at) AS last FROM changes "
+            "WHERE changed_at >= ? GROUP BY slug ORDER BY last DESC",
+            (since,),
+        ).fetchall()
+    return [(r["slug"], r["n"], r["last"]) for r in rows]
+
+
+# ---- text view ----
+
+def render_block(records: list) -> str:
+    # Same layout updater.log_changes has always written, one block per company
+    if not records:
+        return ""
+    timestamp = datetime.fromtimestamp(records[0]["changed_at"]).strftime("%Y-%m-%d %H:%M:%S")
+    lines = [
+        "",
+        "=" * 70,
+        f"[{timestamp}] CHANGES DETECTED: {records[0]['company']}",
+        "=" * 70,
+    ]
+    for r in records:
+        lines += ["", f"Field: {r['field']}", f"  OLD: {r['old']}", f"  NEW: {r['new']}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def _block_header(block: str) -> str:
+    # "[2024-05-01 12:00:00] CHANGES DETECTED: Coursera"
+    lines = block.split("\n")
+    return lines[2] if len(lines) > 2 else ""
+
+
+def render_log(path: Path = None, since: float = 0) -> int:
+    # Rebuild changes.log from the history; returns the number of changes written.
+    # Existing blocks the history does not hold are kept, merged by time; with
+    # no history at all the log is left untouched.
+    path = path or CHANGES_LOG
+    records = changes_since(since)
+    if not records:
+        return 0
+    blocks = []
+    group = []
+    for r in records:
+        # A block is one company's changes from one detection
+        if group and (r["slug"], r["changed_at"]) != (group[0]["slug"], group[0]["changed_at"]):
+            blocks.append(render_block(group))
+            group = []
+        group.append(r)
+    blocks.append(render_block(group))
+
+    from agents.profile_generator import atomic_write_text
+    with _lock:
+        try:
+            existing = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            existing = ""
+        rendered = {_block_header(block) for block in blocks}
+        kept = [
+            block for block in BLOCK_START.split(existing)
+            if block.strip() and _block_header(block) not in rendered
+        ]
+        # Headers start with the timestamp, so sorting them orders by time
+        merged = sorted(kept + blocks, key=_block_header)
+        atomic_write_text(path, "".join(merged))
+    return len(records)
@@ -1,4 +1,4 @@
-import requests #allows python to download web pages from the urls
+from agents.http_client import get_session #shared pooled session so connections are reused
 from bs4 import BeautifulSoup #allws python to clean html web text
 
 
@@ -6,7 +6,7 @@ def fetch_website(url: str) -> str:
     #Downloads HTML content from a URL and returns it as text.
     #This is the sense part of the agent
     try:
-        response = requests.get(url, timeout=10) #this is the request download the page with time out to prevent frezing
+        response = get_session().get(url, timeout=10) #this is the request download the page with time out to prevent frezing
         response.raise_for_status() #checking to see if there is an error
         return response.text #returning the html
     except Exception as e:
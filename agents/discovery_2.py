@@ -1,10 +1,10 @@
-import requests                     # download web pages
+from agents.http_client import get_session  # shared pooled session (keep-alive)
 from bs4 import BeautifulSoup       # clean & parse HTML
 #DOWNLOAD HTML
 def fetch_website(url: str) -> str:
     # Download HTML content from a webpage
     try:
-        response = requests.get(url, timeout=10)
+        response = get_session().get(url, timeout=10)
         response.raise_for_status()
         return response.text
     except Exception as e:
@@ -4,7 +4,7 @@
 
 import os                 # lets Python access environment variables (API keys)
 import re                 # lets us search text using regular expressions
-import requests           # used to send HTTP requests (GET / POST)
+from agents.http_client import get_session  # shared pooled session (keep-alive)
 from bs4 import BeautifulSoup  # used to clean HTML into readable text
 
 # LLM CLIENT — sends questions to OpenRouter
@@ -34,7 +34,7 @@ def llm_search(prompt: str) -> str:
 
     # Try sending the request; if it fails, return empty string.
     try:
-        response = requests.post(url, json=data, headers=headers, timeout=20)
+        response = get_session().post(url, json=data, headers=headers, timeout=20)
         response.raise_for_status()  # checks for errors
         out = response.json()        # convert reply into JSON
         return out["choices"][0]["message"]["content"]  # return text answer
@@ -69,7 +69,7 @@ def validate_url(url: str) -> bool:
 
     # Try a HEAD request (faster than GET).
     try:
-        response = requests.head(url, timeout=8)
+        response = get_session().head(url, timeout=8)
         # If status code < 400 → success.
         return response.status_code < 400
     except:
@@ -118,7 +118,7 @@ def discover_company_website(company_name: str) -> str:
 def fetch_website(url: str) -> str:
     # Download a webpage using HTTP GET.
     try:
-        res = requests.get(url, timeout=10)
+        res = get_session().get(url, timeout=10)
         res.raise_for_status()  # check if page loaded correctly
         return res.text         # return HTML as string
     except Exception as e:
@@ -1,13 +1,26 @@
 # Discovery Agent V4 —thefinal tuned version
 # - Uses an LLM (via OpenRouter) to find the official website for a company
 # - Does NOT hardcode any URLs (the AI must discover them)
-# - Validates the URL by doing a real HTTP request with browser-like headers
-# - Fetches HTML and cleans it into plain text for later LLM processing
-
+# - Validates the URL with a single GET (browser-like headers) and keeps the page
+#   it downloaded, so the homepage is never fetched twice
+# - An LLM answer is only cached once its URL checked out; re-discovering a
+#   company (stale website, expired miss) asks the LLM afresh
+# - Cleans HTML into plain text for later LLM processing
+# - Optional streaming mode stops downloading once it has enough visible text
+
+import json # to read the batch discovery answer
 import os # to read environment variables, API key
 import re # to search for URLs in text using regex
-import requests # to send HTTP requests
+from contextlib import nullcontext # default "gate" when no concurrency limit is given
+from dataclasses import dataclass, field # for the ResolvedPage result object
+from agents.http_client import get_session # shared pooled session to send HTTP requests
 from bs4 import BeautifulSoup  # to clean HTML into readable text
+from agents import resolution_cache # remembers company -> website across runs
+from agents import html_cache # stores homepages with their ETag / Last-Modified
+from agents import llm_cache # answers to prompts we already asked
+from agents.llm_dispatcher import LLMUnavailable, dispatch, estimate_tokens # provider rate limits + retries
+from agents import model_router # cheap model first, stronger one when no URL comes back
+from agents import html_stream # incremental HTML-to-text for streamed downloads
 
 # Global headers so we look like a real browser this basicallyhelps avoid 403 forbidden
 DEFAULT_HEADERS = {
@@ -19,18 +32,88 @@ DEFAULT_HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
+# Model used to look up websites
+DISCOVERY_MODEL = "google/gemini-2.0-flash-001"
+
+# Streaming fetch: read the homepage in chunks and stop early
+# (enough visible text collected, or the byte cap reached)
+STREAM_FETCH = os.getenv("EDUSCOUT_STREAM_FETCH", "off").lower() in ("1", "on", "true", "yes")
+STREAM_MAX_BYTES = int(os.getenv("EDUSCOUT_STREAM_MAX_BYTES", str(2 * 1024 * 1024)))
+STREAM_MAX_TEXT_CHARS = int(os.getenv("EDUSCOUT_STREAM_MAX_TEXT_CHARS", "20000"))
+
+
+@dataclass
+class ResolvedPage:
+    # Result of discovery: the validated website plus the response we got for it
+    url: str # URL as proposed by the LLM (or the cache)
+    final_url: str # URL after following redirects
+    status: int # HTTP status of the final response
+    headers: dict = field(default_factory=dict) # response headers
+    html: str = "" # response body (empty when a streamed download was cut off early)
+    from_cache: bool = False # True when the server answered 304 and the body came from disk
+    text: str = "" # visible text, filled in directly by streaming fetches
+    streamed: bool = False # True when the body was read in chunks
+    truncated: bool = False # True when streaming stopped before the end of the body
+
+    def clean_text(self) -> str:
+        # Visible text of the page (already extracted when it was streamed)
+        if self.text:
+            return self.text
+        return extract_text_from_html(self.html)
+
+
+def set_streaming(enabled: bool, max_bytes: int = None, max_text_chars: int = None):
+    # Switch streaming fetches on/off for this process (e.g. from a --stream flag)
+    global STREAM_FETCH, STREAM_MAX_BYTES, STREAM_MAX_TEXT_CHARS
+    STREAM_FETCH = enabled
+    if max_bytes:
+        STREAM_MAX_BYTES = max_bytes
+    if max_text_chars:
+        STREAM_MAX_TEXT_CHARS = max_text_chars
+
+
+def llm_search(prompt: str, fresh: bool = False):
+    # Returns (answer, model that gave it), or ("", None) when the search failed.
+    # Nothing is cached here: remember_answer() once the answer checked out.
+    # fresh=True ignores a cached answer (it led to a website that went stale).
+    # With the model cascade on, a cheap model answers first and a stronger
+    # one is only asked when the answer holds no URL
+    try:
+        if model_router.is_enabled():
+            return model_router.route(
+                "discovery", prompt,
+                lambda model: llm_search_model(prompt, model, fresh),
+                lambda text: bool(re.search(r"https?://", text or "")),
+            )
+        return llm_search_model(prompt, DISCOVERY_MODEL, fresh), DISCOVERY_MODEL
+    except LLMUnavailable as e:
+        print(f"error the LLM search failed: {e}")
+        return "", None
+
+
+def remember_answer(prompt: str, answer: str, model: str):
+    # Cache a discovery answer whose URL proved valid
+    if answer and model:
+        llm_cache.put("openrouter", model, prompt, answer)
+
+
+def llm_search_model(prompt: str, model: str, fresh: bool = False) -> str:
+    # One discovery question to one model; raises LLMUnavailable on failure
+    # Same question, same answer: reuse what the LLM told us last time
+    if not fresh:
+        cached = llm_cache.get("openrouter", model, prompt)
+        if cached is not None:
+            return cached
 
-def llm_search(prompt: str) -> str:
     # Reads the OpenRouter API key from the environment
     api_key = os.getenv("OPENROUTER_API_KEY")
 
     # If there is no key, it cannot call the LLM
     if not api_key:
-        print("OPENROUTER_API_KEY missing")
-        return ""
+        raise LLMUnavailable("OPENROUTER_API_KEY missing")
 
     # OpenRouter chat completions endpoint
-    url = "https://openrouter.ai/api/v1/chat/completions"
+    url = f"{os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1')}/chat/completions"
 
     # HTTP headers and auth + JSON
     headers = {
@@ -40,26 +123,26 @@ def llm_search(prompt: str) -> str:
 
     # Body which model to use + our prompt as a single user message
     data = {
-        "model": "google/gemini-2.0-flash-001",
+        "model": model,
         "messages": [
             {"role": "user", "content": prompt}
         ],
+        "temperature": 0,
     }
 
-    # Send the POST request and return the text of the first choice
+    # Send the POST request (rate-limited and retried by the dispatcher)
+    # and return the text of the first choice
+    response = dispatch(
+        "openrouter",
+        lambda: get_session().post(url, json=data, headers=headers, timeout=20),
+        estimate_tokens(prompt, max_output=200),
+    )
     try:
-        response = requests.post(
-            url,
-            json=data,
-            headers=headers,
-            timeout=20,
-        )
-        response.raise_for_status()
         out = response.json()
-        return out["choices"][0]["message"]["content"]
+        content = out["choices"][0]["message"]["content"]
     except Exception as e:
-        print(f"error the LLM search failed: {e}")
-        return ""
+        raise LLMUnavailable(f"openrouter: unexpected response ({e})")
+    return content
 
 
 def extract_url_from_text(text: str) -> str:
@@ -85,49 +168,190 @@ def extract_url_from_text(text: str) -> str:
     return url
 
 
-def validate_url(url: str) -> bool:
-    # Empty string is automatically invalid
-    if not url:
-        return False
+def fetch_page(url: str, stream: bool = None):
+    # One GET that both validates the URL and downloads the page.
+    # Sends the cached ETag / Last-Modified so an unchanged page costs a 304.
+    # stream=True (default: STREAM_FETCH) reads the body in chunks and keeps
+    # only its visible text. Returns a ResolvedPage, or None when the URL does not work.
+    if not url or not (url.startswith("http://") or url.startswith("https://")):
+        return None
+    stream = STREAM_FETCH if stream is None else stream
 
-    # A valid URL should start with http:// or https://
-    if not (url.startswith("http://") or url.startswith("https://")):
-        return False
-
-    # First try a HEAD request (lightweight)
     try:
-        head_resp = requests.head(
+        request_headers = dict(DEFAULT_HEADERS)
+        request_headers.update(html_cache.conditional_headers(url))
+        response = get_session().get(
             url,
-            headers=DEFAULT_HEADERS,
+            headers=request_headers,
             allow_redirects=True,
-            timeout=8,
+            timeout=15,
+            stream=stream,
         )
 
-        # Some servers do not support HEAD correctly; if 405/403 we can try GET
-        if head_resp.status_code == 405 or head_resp.status_code == 403:
-            raise Exception(f"HEAD not allowed: {head_resp.status_code}")
-
-        # If status code < 400, consider it valid
-        return head_resp.status_code < 400
-    except Exception:
-        # If HEAD fails, fall back to GET
-        try:
-            get_resp = requests.get(
+        # Not modified: reuse the body we already have on disk
+        if response.status_code == 304:
+            response.close()
+            cached_html = html_cache.load_body(url)
+            if cached_html:
+                return ResolvedPage(
+                    url=url,
+                    final_url=response.url,
+                    status=200,
+                    headers=dict(response.headers),
+                    html=cached_html,
+                    from_cache=True,
+                )
+            # The cached body was evicted in the meantime, download it again
+            response = get_session().get(
                 url,
                 headers=DEFAULT_HEADERS,
                 allow_redirects=True,
-                timeout=12,
+                timeout=15,
+                stream=stream,
             )
-            return get_resp.status_code < 400
-        except Exception as e:
-            print(f"[DISCOVERY V4] URL validation failed for {url}: {e}")
-            return False
 
+        if response.status_code >= 400:
+            response.close()
+            return None
+
+        if stream:
+            streamed = html_stream.read_visible_text(
+                response,
+                max_bytes=STREAM_MAX_BYTES,
+                max_text_chars=STREAM_MAX_TEXT_CHARS,
+            )
+            html, text, truncated = streamed.html, streamed.text, streamed.truncated
+        else:
+            html, text, truncated = response.text, "", False
+    except Exception as e:
+        print(f"[DISCOVERY V4] Request failed for {url}: {e}")
+        return None
+
+    # Only complete bodies are worth revalidating later
+    if html:
+        html_cache.store(
+            [url, response.url],
+            html,
+            etag=response.headers.get("ETag", ""),
+            last_modified=response.headers.get("Last-Modified", ""),
+        )
+    return ResolvedPage(
+        url=url,
+        final_url=response.url,
+        status=response.status_code,
+        headers=dict(response.headers),
+        html=html,
+        text=text,
+        streamed=stream,
+        truncated=truncated,
+    )
+
+
+def discover_websites_batch(company_names: list) -> dict:
+    # Ask for the websites of many companies in ONE LLM call.
+    # Returns {company_name: candidate_url or ""}. URLs are NOT validated here;
+    # pass them to discover_company_page(candidate_url=...) which checks each
+    # one and only falls back to the per-company prompts when it fails.
+    # Companies already in the resolution cache are left out of the prompt.
+    # The answer is cached as a whole (each URL is still validated later),
+    # but not reused when one of the companies is being re-discovered.
+    candidates = {name: "" for name in company_names}
+    to_ask = [name for name in company_names if resolution_cache.lookup(name) is None]
+    if not to_ask:
+        return candidates
+    fresh = any(resolution_cache.seen(name) for name in to_ask)
+
+    print(f"[DISCOVERY V4] Batch searching websites for {len(to_ask)} companies")
+    company_lines = "\n".join(f"- {name}" for name in to_ask)
+    prompt = (
+        "For each company below, give its official website URL.\n"
+        "Answer ONLY with a JSON object that maps each company name, exactly as "
+        "written, to a single http:// or https:// URL (or null if unknown). "
+        "No explanation, no markdown.\n\n"
+        f"Companies:\n{company_lines}"
+    )
+    llm_output, model = llm_search(prompt, fresh)
+    if not llm_output:
+        print("[DISCOVERY V4] Empty LLM response for batch search.")
+        return candidates
+
+    found = parse_batch_urls(llm_output, to_ask)
+    if found:
+        remember_answer(prompt, llm_output, model)
+    candidates.update(found)
+    print(f"[DISCOVERY V4] Batch search proposed {len(found)}/{len(to_ask)} websites")
+    return candidates
+
+
+def parse_batch_urls(llm_output: str, company_names: list) -> dict:
+    # Read {company: url} from the batch answer: a JSON object if possible,
+    # otherwise "company: url" lines. Names are matched loosely (case, punctuation).
+    by_key = {resolution_cache.normalize_company_name(name): name for name in company_names}
+    pairs = []
+
+    match = re.search(r"\{.*\}", llm_output, re.DOTALL)
+    if match:
+        try:
+            pairs = list(json.loads(match.group(0)).items())
+        except Exception:
+            pairs = []
+
+    if not pairs:
+        for line in llm_output.splitlines():
+            if ":" not in line or "http" not in line or line.strip().startswith("http"):
+                continue
+            name, rest = line.split(":", 1)
+            pairs.append((name.strip(" -*\"'"), rest))
+
+    found = {}
+    for name, value in pairs:
+        company = by_key.get(resolution_cache.normalize_company_name(str(name)))
+        url = extract_url_from_text(value) if isinstance(value, str) else ""
+        if company and url:
+            found[company] = url
+    return found
+
+
+def discover_company_page(company_name: str, llm_gate=None, fetch_gate=None, candidate_url: str = ""):
+    # Find the official website and return it already downloaded (ResolvedPage or None).
+    # llm_gate / fetch_gate are optional context managers (e.g. semaphores)
+    # that the batch engine uses to bound LLM calls and downloads separately.
+    # candidate_url comes from discover_websites_batch; it is tried before asking the LLM.
+    llm_gate = llm_gate or nullcontext()
+    fetch_gate = fetch_gate or nullcontext()
 
-def discover_company_website(company_name: str) -> str:
     # Log which company we are working on
     print(f"[DISCOVERY V4] Searching for website of: {company_name}")
 
+    # Known companies skip the LLM entirely; a company seen before (expired
+    # miss, stale website) gets fresh LLM answers, not the cached ones
+    fresh = resolution_cache.seen(company_name)
+    cached = resolution_cache.lookup(company_name)
+    if cached is not None:
+        if cached["status"] != "resolved":
+            print("[DISCOVERY V4] Cached miss, skipping LLM search.")
+            return None
+
+        with fetch_gate:
+            page = fetch_page(cached["final_url"])
+        if page:
+            print(f"[DISCOVERY V4] ✔ Cached website: {page.final_url}")
+            return page
+
+        # The remembered website stopped working, ask the LLM again
+        print(f"[DISCOVERY V4] ⚠ Cached website failed: {cached['final_url']}")
+        resolution_cache.invalidate(company_name)
+
+    # Answer from the batch prompt: validate it on its own
+    if candidate_url:
+        with fetch_gate:
+            page = fetch_page(candidate_url)
+        if page:
+            print(f"[DISCOVERY V4] ✔ Valid website (batch): {candidate_url}")
+            resolution_cache.store_resolved(company_name, candidate_url, page.final_url)
+            return page
+        print(f"[DISCOVERY V4] ⚠ Batch URL seems invalid: {candidate_url}")
+
     # Two prompts for two attempts (slightly different wording)
     prompts = [
         (
@@ -142,14 +366,17 @@ def discover_company_website(company_name: str) -> str:
     ]
 
     # Try each prompt once
+    llm_answered = False
     for attempt_index, prompt in enumerate(prompts, start=1):
         # Ask the LLM for the website
-        llm_output = llm_search(prompt)
+        with llm_gate:
+            llm_output, model = llm_search(prompt, fresh)
 
         # If the LLM returned nothing, try the next prompt
         if not llm_output:
             print(f"[DISCOVERY V4] Empty LLM response on attempt {attempt_index}.")
             continue
+        llm_answered = True
 
         # Try to extract a URL from the LLM text
         url = extract_url_from_text(llm_output)
@@ -159,31 +386,41 @@ def discover_company_website(company_name: str) -> str:
             print("[DISCOVERY V4] No URL detected in AI response.")
             continue
 
-        # Check if the URL actually works (not 404, etc.)
-        if validate_url(url):
+        # Check if the URL actually works (not 404, etc.) and keep the page we got
+        with fetch_gate:
+            page = fetch_page(url)
+        if page:
             print(f"[DISCOVERY V4] ✔ Valid website: {url}")
-            return url
+            resolution_cache.store_resolved(company_name, url, page.final_url)
+            remember_answer(prompt, llm_output, model)
+            return page
         else:
             print(f"[DISCOVERY V4] ⚠ URL seems invalid: {url}")
 
     # If both attempts failed, report that no usable URL was found
     print("[DISCOVERY V4] No valid URL found.")
-    return ""
+    # Only a real answer counts as a miss (not a missing key or a network error)
+    if llm_answered:
+        resolution_cache.store_unresolved(company_name)
+    return None
+
+
+def discover_company_website(company_name: str) -> str:
+    # URL-only version of discover_company_page (empty string if not found).
+    # Returns the URL that was validated (the LLM's answer, or the remembered
+    # website), as before pages were returned; page.final_url has the redirect target.
+    page = discover_company_page(company_name)
+    return page.url if page else ""
 
 
 def fetch_website(url: str) -> str:
-    # Download HTML content for the given URL
-    try:
-        response = requests.get(
-            url,
-            headers=DEFAULT_HEADERS,
-            timeout=15,
-        )
-        response.raise_for_status()
-        return response.text
-    except Exception as e:
-        print(f"[ERROR] Could not fetch {url}: {e}")
+    # Download HTML content for the given URL (revalidated against the HTML cache)
+    # (callers holding a ResolvedPage should use page.html instead)
+    page = fetch_page(url, stream=False)
+    if not page:
+        print(f"[ERROR] Could not fetch {url}")
         return ""
+    return page.html
 
 
 def extract_text_from_html(html: str) -> str:
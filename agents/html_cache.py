@@ -0,0 +1,150 @@
+# HTML Cache — raw homepage bodies kept on disk between runs
+# - Bodies are content-addressed: cache/html/objects/<sha256>.html
+# - index.json maps each URL to its body hash plus the ETag / Last-Modified validators
+# - Later fetches send If-None-Match / If-Modified-Since and reuse the body on a 304
+# - Total size is capped; least recently used bodies are evicted first
+
+import hashlib # content hash used as the object file name
+import json # index file format
+import os # size cap override + atomic replace
+import threading # the batch engine fetches from several threads
+import time # last-access timestamps for LRU
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+HTML_CACHE_DIR = BASE_DIR / "cache" / "html"
+OBJECTS_DIR = HTML_CACHE_DIR / "objects"
+INDEX_PATH = HTML_CACHE_DIR / "index.json"
+
+# Size cap for all stored bodies together
+MAX_CACHE_BYTES = int(float(os.getenv("EDUSCOUT_HTML_CACHE_MB", "200")) * 1024 * 1024)
+
+_lock = threading.Lock()
+_index = None # url -> {"sha", "etag", "last_modified", "size", "last_access"}
+
+
+def _load_index() -> dict:
+    global _index
+    if _index is None:
+        try:
+            with INDEX_PATH.open("r", encoding="utf-8") as f:
+                _index = json.load(f)
+        except Exception:
+            _index = {}
+    return _index
+
+
+def _save_index():
+    HTML_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = INDEX_PATH.with_suffix(".json.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(_index, f)
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def _object_path(sha: str) -> Path:
+    return OBJECTS_DIR / f"{sha}.html"
+
+
+def conditional_headers(url: str) -> dict:
+    # Validator headers for a URL we have a cached body for (empty dict otherwise)
+    with _lock:
+        entry = _load_index().get(url)
+    if not entry or not _object_path(entry["sha"]).exists():
+        return {}
+
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def load_body(url: str) -> str:
+    # Cached body for a URL after a 304 (empty string if it is gone)
+    with _lock:
+        entry = _load_index().get(url)
+        if not entry:
+            return ""
+        try:
+            body = _object_path(entry["sha"]).read_bytes()
+        except OSError:
+            return ""
+        entry["last_access"] = time.time()
+        _save_index()
+    return body.decode("utf-8", errors="replace")
+
+
+def store(urls, body: str, etag: str = "", last_modified: str = ""):
+    # Save a fresh 200 body under one or more URLs (request URL + final URL).
+    # Bodies without any validator cannot be revalidated, so they are not kept.
+    if not etag and not last_modified:
+        return
+
+    data = body.encode("utf-8", errors="replace")
+    sha = hashlib.sha256(data).hexdigest()
+
+    with _lock:
+        OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = _object_path(sha)
+        if not path.exists():
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+        index = _load_index()
+        now = time.time()
+        replaced = set()
+        for url in urls:
+            if url:
+                if url in index:
+                    replaced.add(index[url]["sha"])
+                index[url] = {
+                    "sha": sha,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "size": len(data),
+                    "last_access": now,
+                }
+
+        # Bodies no URL points to anymore (the page changed) are deleted right away
+        still_used = {entry["sha"] for entry in index.values()}
+        for old_sha in replaced - still_used:
+            try:
+                _object_path(old_sha).unlink()
+            except OSError:
+                pass
+
+        _evict_if_needed()
+        _save_index()
+
+
+def _evict_if_needed():
+    # Drop least recently used bodies until the cache fits under MAX_CACHE_BYTES
+    index = _load_index()
+
+    # Several URLs may share one body, an object is as recent as its newest URL
+    objects = {}
+    for entry in index.values():
+        sha = entry["sha"]
+        size, last_access = objects.get(sha, (entry["size"], 0))
+        objects[sha] = (size, max(last_access, entry.get("last_access", 0)))
+
+    total = sum(size for size, _ in objects.values())
+    if total <= MAX_CACHE_BYTES:
+        return
+
+    evicted = set()
+    for sha, (size, _) in sorted(objects.items(), key=lambda item: item[1][1]):
+        if total <= MAX_CACHE_BYTES:
+            break
+        try:
+            _object_path(sha).unlink()
+        except OSError:
+            pass
+        evicted.add(sha)
+        total -= size
+
+    for url in [url for url, entry in index.items() if entry["sha"] in evicted]:
+        del index[url]
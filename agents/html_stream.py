@@ -0,0 +1,107 @@
+# HTML Stream — visible text straight from a streamed HTTP response
+# - Reads the body in chunks and feeds an incremental HTML parser
+# - Stops downloading once we have enough visible text or hit a byte cap
+# - Output matches extract_text_from_html: stripped, non-empty lines joined by "\n"
+# - Peak memory stays bounded by the byte cap, however large the page is
+
+import codecs # incremental decoding, a chunk may end in the middle of a character
+from dataclasses import dataclass
+from html.parser import HTMLParser # stdlib parser that accepts data piece by piece
+
+# Tags whose text extract_text_from_html leaves out: script and style are
+# removed there, and BeautifulSoup's get_text() skips <template> content.
+# <noscript> text is kept by both.
+SKIPPED_TAGS = {"script", "style", "template"}
+
+CHUNK_SIZE = 16 * 1024
+
+
+class VisibleTextParser(HTMLParser):
+    # Collects visible text lines as HTML is fed in; one text node per flush,
+    # like BeautifulSoup's get_text(separator="\n")
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        self.chars = 0
+        self.skip_depth = 0
+        self.pending = []
+
+    def _flush(self):
+        if not self.pending:
+            return
+        for line in "".join(self.pending).splitlines():
+            line = line.strip()
+            if line:
+                self.lines.append(line)
+                self.chars += len(line) + 1
+        self.pending = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.pending.append(data)
+
+    def text(self) -> str:
+        self._flush()
+        return "\n".join(self.lines)
+
+
+@dataclass
+class StreamedText:
+    text: str # visible text collected so far
+    html: str # full body, only when the download finished (empty if it was cut off)
+    bytes_read: int # bytes taken from the network
+    truncated: bool # True when we stopped before the end of the body
+
+
+def read_visible_text(response, max_bytes: int, max_text_chars: int) -> StreamedText:
+    # response must come from a request made with stream=True; it is closed here
+    content_type = response.headers.get("Content-Type", "").lower()
+    encoding = response.encoding if "charset" in content_type and response.encoding else "utf-8"
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    parser = VisibleTextParser()
+    raw_chunks = [] # kept so a complete body can still go into the HTML cache
+    bytes_read = 0
+    truncated = False
+
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if not chunk:
+                continue
+            bytes_read += len(chunk)
+            raw_chunks.append(chunk)
+            parser.feed(decoder.decode(chunk))
+
+            if parser.chars >= max_text_chars or bytes_read >= max_bytes:
+                truncated = True
+                break
+    finally:
+        response.close()
+
+    if truncated:
+        # A cut-off body is useless for caching, drop it right away
+        raw_chunks = []
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+
+    html = b"".join(raw_chunks).decode(encoding, errors="replace") if raw_chunks else ""
+    return StreamedText(
+        text=parser.text()[:max_text_chars],
+        html=html,
+        bytes_read=bytes_read,
+        truncated=truncated,
+    )
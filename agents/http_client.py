@@ -0,0 +1,58 @@
+# HTTP Client — one shared, pooled session for every agent
+# - Keeps TCP+TLS connections alive between calls (no new handshake per request)
+# - Pool sizes are set per host here, in one place
+# - Safe to share between the batch engine's worker threads
+
+import os # to read pool size overrides from the environment
+import threading # guards lazy creation of the shared session
+import requests # the underlying HTTP library
+from requests.adapters import HTTPAdapter # connection pool per mounted prefix
+
+# Pool size for any host not listed below (one pool per host, this many keep-alive sockets each)
+DEFAULT_POOL_SIZE = int(os.getenv("EDUSCOUT_HTTP_POOL_SIZE", "16"))
+
+# Hosts we talk to over and over get their own sized pools
+HOST_POOL_SIZES = {
+    "https://openrouter.ai": int(os.getenv("EDUSCOUT_OPENROUTER_POOL_SIZE", "8")),
+    "https://generativelanguage.googleapis.com": int(os.getenv("EDUSCOUT_GEMINI_POOL_SIZE", "4")),
+}
+
+# Maximum number of distinct hosts kept in the default adapter's pool manager
+MAX_HOSTS = int(os.getenv("EDUSCOUT_HTTP_MAX_HOSTS", "64"))
+
+_session = None
+_lock = threading.Lock()
+
+
+def build_session() -> requests.Session:
+    # Create a session with our pool configuration mounted on it
+    session = requests.Session()
+
+    default_adapter = HTTPAdapter(pool_connections=MAX_HOSTS, pool_maxsize=DEFAULT_POOL_SIZE)
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+
+    # Longer prefixes win, so these override the defaults for their host
+    for prefix, size in HOST_POOL_SIZES.items():
+        session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=size))
+
+    return session
+
+
+def get_session() -> requests.Session:
+    # Return the process-wide session, creating it on first use
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def reset_session():
+    # Close every pooled connection (e.g. at shutdown or between benchmark runs)
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
@@ -0,0 +1,243 @@
+# JSON Salvage — recovers the JSON inside an imperfect LLM answer
+# - Strips markdown code fences and any prose around the JSON
+# - Takes the outermost object (or array), closing brackets and strings
+#   that a cut-off answer left open
+# - Repairs common defects outside string literals: trailing commas,
+#   // and /* */ comments, single-quoted strings, smart quotes, unquoted
+#   keys, Python True / False / None
+# - validate_profile() coerces the result to the profile schema (list
+#   fields are lists, text fields are text) and rejects anything that is not
+#   an object; a sparse profile is still a profile (completeness is scored
+#   elsewhere)
+# - Counters show how many answers parsed cleanly, were salvaged, needed
+#   a repair prompt, or were lost
+
+import json
+import re
+import threading
+
+# Profile schema: field -> expected shape
+LIST_FIELDS = ["products", "target_market", "key_features", "use_cases", "competitors"]
+TEXT_FIELDS = [
+    "company_name", "founded", "headquarters", "summary", "pricing_model",
+    "company_size", "value_proposition", "market_position",
+]
+OBJECT_FIELDS = ["technology_stack", "metadata"]
+
+FENCE = re.compile(r"```[a-zA-Z]*\s*(.*?)```", re.DOTALL)
+SMART_QUOTES = {"“": '"', "”": '"', "„": '"', "‘": "'", "’": "'"}
+LITERALS = {"True": "true", "False": "false", "None": "null", "NaN": "null", "undefined": "null"}
+
+_lock = threading.Lock()
+_stats = {"clean": 0, "salvaged": 0, "repair_prompts": 0, "repaired": 0, "failed": 0}
+
+
+def record(outcome: str):
+    with _lock:
+        _stats[outcome] += 1
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
+
+
+def strip_fences(text: str) -> str:
+    # Content of the first fenced block that holds JSON, or the text itself
+    for block in FENCE.findall(text):
+        if "{" in block or "[" in block:
+            return block
+    return text.replace("```", "")
+
+
+def outermost(text: str, opener: str = "{") -> str:
+    # From the first opener to its matching closer; a cut-off answer gets
+    # its open string and brackets closed. None when there is no opener.
+    start = text.find(opener)
+    if start < 0:
+        return None
+    stack = []
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+            continue
+        if c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append(c)
+        elif c in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return text[start:i + 1]
+
+    tail = text[start:]
+    if in_string:
+        tail += '"'
+    return tail + "".join("}" if c == "{" else "]" for c in reversed(stack))
+
+
+def repair(text: str) -> str:
+    # One pass over the text, fixing defects only outside string literals
+    for smart, plain in SMART_QUOTES.items():
+        text = text.replace(smart, plain)
+    out = []
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == '"' or c == "'":
+            # String literal: copy it, re-quoting single-quoted ones
+            quote = c
+            j = i + 1
+            chars = []
+            while j < n and text[j] != quote:
+                if text[j] == "\\" and j + 1 < n:
+                    # \' is not a JSON escape; the quote needs none once re-quoted
+                    chars.append("'" if text[j + 1] == "'" else text[j:j + 2])
+                    j += 2
+                    continue
+                chars.append('\\"' if text[j] == '"' and quote == "'" else text[j])
+                j += 1
+            out.append('"' + "".join(chars) + '"')
+            i = j + 1
+        elif text.startswith("//", i):
+            while i < n and text[i] != "\n":
+                i += 1
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+        elif c in "}]":
+            # Drop a trailing comma before the closer
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            out.append(c)
+            i += 1
+        elif c.isalpha() or c == "_":
+            j = i
+            while j < n and (text[j].isalnum() or text[j] in "_-"):
+                j += 1
+            word = text[i:j]
+            rest = text[j:].lstrip()
+            if rest.startswith(":"):
+                out.append(f'"{word}"') # unquoted key
+            elif word in LITERALS:
+                out.append(LITERALS[word])
+            else:
+                out.append(word)
+            i = j
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def _drop_last_member(text: str):
+    # {"a": 1, "b":} -> {"a": 1}: cut the last member before the closing brackets
+    body = text.rstrip("}] \n\t")
+    cut = body.rfind(",")
+    if cut <= 0:
+        return None
+    return body[:cut] + text[len(body):].strip()
+
+
+def salvage_json(text: str, opener: str = "{"):
+    # Returns (value, "clean" | "salvaged") or (None, None)
+    if not text:
+        return None, None
+    try:
+        return json.loads(text), "clean"
+    except Exception:
+        pass
+
+    candidate = outermost(strip_fences(text), opener)
+    if candidate is None:
+        return None, None
+    for attempt in (candidate, repair(candidate)):
+        try:
+            return json.loads(attempt), "salvaged"
+        except Exception:
+            continue
+
+    # Cut-off answers: give up members from the end until the rest parses
+    fixed = repair(candidate)
+    for _ in range(5):
+        fixed = _drop_last_member(fixed)
+        if not fixed:
+            break
+        try:
+            return json.loads(fixed), "salvaged"
+        except Exception:
+            continue
+    return None, None
+
+
+def _as_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value if v not in (None, ""))
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, dict):
+        value = list(value.values())
+    if not isinstance(value, list):
+        return [str(value)]
+    return [v if isinstance(v, str) else _as_text(v) for v in value if v not in (None, "")]
+
+
+def _as_object(field: str, value):
+    if value is None or isinstance(value, dict):
+        return value
+    if field == "technology_stack" and isinstance(value, list):
+        return {"tools": _as_list(value)}
+    return {"notes": _as_text(value)}
+
+
+def validate_profile(data):
+    # Profile dict coerced to the schema, or None if this is not an object
+    if isinstance(data, list) and len(data) == 1:
+        data = data[0]
+    if isinstance(data, dict) and len(data) == 1:
+        only = next(iter(data.values()))
+        if isinstance(only, dict) and not any(k in data for k in TEXT_FIELDS + LIST_FIELDS):
+            data = only # {"profile": {...}}
+    if not isinstance(data, dict):
+        return None
+
+    profile = dict(data)
+    for field in TEXT_FIELDS:
+        if field in profile:
+            profile[field] = _as_text(profile[field])
+    for field in LIST_FIELDS:
+        if field in profile:
+            profile[field] = _as_list(profile[field])
+    for field in OBJECT_FIELDS:
+        if field in profile:
+            profile[field] = _as_object(field, profile[field])
+    return profile
+
+
+def salvage_profile(text: str):
+    # Returns (profile, "clean" | "salvaged") or (None, None)
+    data, how = salvage_json(text, "{")
+    profile = validate_profile(data) if data is not None else None
+    return (profile, how) if profile is not None else (None, None)
@@ -0,0 +1,160 @@
+# JSON Stream — reads a streamed (SSE) chat completion as it arrives
+# - Pulls the content deltas out of the "data: {...}" server-sent events
+# - Tracks the JSON incrementally (string / escape / bracket depth), so we
+#   know when the first top-level field is complete and when the top-level
+#   object or array closes
+# - Only the expected opener ({ for a profile, [ for a batch) starts a value;
+#   a closed value that does not parse ("[see below]" in the prose, a trailing
+#   comma) is set aside and reading goes on
+# - Closes the stream as soon as the JSON is complete: trailing chatter
+#   ("Let me know if...") is never waited for
+# - Text before the JSON (prose, a ``` fence) is skipped
+# - A stream that ends (or breaks) before the JSON closes raises
+#   LLMUnavailable: a truncated answer must not be used or cached
+# - A stream that ends after values that did not parse returns the whole
+#   answer for salvage, flagged so the caller does not cache it
+# - Counts streams, early closes, time to first field and total latency
+
+import json
+import threading
+import time
+
+from agents.llm_dispatcher import LLMCancelled, LLMUnavailable
+
+_lock = threading.Lock()
+_stats = {
+    "streams": 0, "completed": 0, "incomplete": 0, "first_fields": 0,
+    "first_field_seconds": 0.0, "total_seconds": 0.0,
+}
+
+
+class JsonStreamParser:
+    # Feed content pieces in order; feed() returns True once a top-level value
+    # starting with opener is complete and parses. first_field_at is the
+    # monotonic time the first top-level member (or array item) was complete.
+    # rejected: the last closed value that did not parse, if any.
+    def __init__(self, opener: str = "{"):
+        self.opener = opener
+        self.raw = []
+        self.done = False
+        self.rejected = None
+        self._reset()
+
+    def _reset(self):
+        # Back to looking for the opener
+        self.json = []
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+        self.first_field_at = None
+
+    def feed(self, piece: str) -> bool:
+        self.raw.append(piece)
+        for c in piece:
+            if not self.started:
+                if c != self.opener:
+                    continue
+                self.started = True
+            self.json.append(c)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == "\\":
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+                continue
+            if c == '"':
+                self.in_string = True
+            elif c in "{[":
+                self.depth += 1
+            elif c in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    value = "".join(self.json)
+                    try:
+                        json.loads(value)
+                    except ValueError:
+                        self.rejected = value
+                        self._reset()
+                        continue
+                    self._first_field()
+                    self.done = True
+                    return True
+            elif c == "," and self.depth == 1:
+                self._first_field()
+        return False
+
+    def _first_field(self):
+        if self.first_field_at is None:
+            self.first_field_at = time.monotonic()
+
+    def text(self) -> str:
+        # The JSON value once complete, otherwise everything received
+        return "".join(self.json) if self.done else "".join(self.raw)
+
+
+def sse_deltas(lines):
+    # Content pieces from OpenRouter / OpenAI style server-sent events
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue # blank separators, ": keep-alive" comments, event names
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            event = json.loads(data)
+        except ValueError:
+            continue
+        if event.get("error"):
+            raise ValueError(f"stream error: {event['error']}")
+        for choice in event.get("choices") or []:
+            piece = (choice.get("delta") or {}).get("content")
+            if piece:
+                yield piece
+
+
+def read_stream(response, started: float, cancel=None, opener: str = "{"):
+    # Reads the response until the JSON is complete (then closes it early).
+    # Returns (text, parsed): the JSON text and True, or the whole answer and
+    # False when it only held closed values that did not parse (salvage it,
+    # never cache it). Raises LLMCancelled once cancel is set and
+    # LLMUnavailable when the stream ends before the JSON is complete.
+    # started: monotonic time the request was sent, for the latency numbers.
+    parser = JsonStreamParser(opener)
+    response.encoding = response.encoding or "utf-8"
+    try:
+        for piece in sse_deltas(response.iter_lines(decode_unicode=True)):
+            if cancel is not None and cancel.is_set():
+                raise LLMCancelled("stream cancelled")
+            if parser.feed(piece):
+                break
+    finally:
+        response.close()
+        _record(parser, started)
+
+    if parser.done:
+        return parser.text(), True
+    if parser.rejected is not None and not parser.started:
+        return parser.text(), False
+    raise LLMUnavailable("stream ended before the JSON was complete")
+
+
+def _record(parser: JsonStreamParser, started: float):
+    with _lock:
+        _stats["streams"] += 1
+        _stats["total_seconds"] += time.monotonic() - started
+        _stats["completed" if parser.done else "incomplete"] += 1
+        if parser.first_field_at is not None:
+            _stats["first_fields"] += 1
+            _stats["first_field_seconds"] += parser.first_field_at - started
+
+
+def stats() -> dict:
+    # Counters plus average time to first field and total latency
+    with _lock:
+        snapshot = dict(_stats)
+    snapshot["avg_first_field_seconds"] = snapshot["first_field_seconds"] / (snapshot["first_fields"] or 1)
+    snapshot["avg_total_seconds"] = snapshot["total_seconds"] / (snapshot["streams"] or 1)
+    return snapshot
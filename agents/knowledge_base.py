@@ -0,0 +1,147 @@
+# Knowledge Base — append-only JSONL with a latest-wins offset index
+# - knowledge_base.jsonl stays appendable: every save adds one line
+# - knowledge_base.idx.json maps each slug to the byte offset/length of its
+#   latest line, so one profile is read with a single seek
+# - compact() rewrites the file to one latest record per slug (temp file,
+#   fsync, atomic replace); the append that crosses the superseded-lines
+#   threshold runs it right away, under the same lock, so no append can
+#   land in the file being replaced (python main.py --compact-kb forces it)
+
+import json
+import os
+import threading
+
+from agents.profile_generator import KB_PATH, slugify
+
+INDEX_PATH = KB_PATH.with_name("knowledge_base.idx.json")
+
+# Compact once the file has this many lines AND this many lines per profile
+COMPACT_MIN_LINES = int(os.getenv("EDUSCOUT_KB_COMPACT_MIN_LINES", "200"))
+COMPACT_RATIO = float(os.getenv("EDUSCOUT_KB_COMPACT_RATIO", "3"))
+
+_lock = threading.RLock()
+_index = None # {"size": bytes covered, "lines": int, "offsets": {slug: [offset, length]}}
+
+
+def record_slug(record: dict) -> str:
+    # Same slug act_save_outputs uses for the JSON/Markdown file names
+    return slugify(record.get("company_name") or "unknown_company")
+
+
+def _scan() -> dict:
+    # Build the index by reading the whole file once
+    index = {"size": 0, "lines": 0, "offsets": {}}
+    if not KB_PATH.exists():
+        return index
+    offset = 0
+    with KB_PATH.open("rb") as f:
+        for raw in f:
+            try:
+                record = json.loads(raw)
+                index["offsets"][record_slug(record)] = [offset, len(raw)]
+                index["lines"] += 1
+            except Exception:
+                pass # half-written or corrupt line
+            offset += len(raw)
+    index["size"] = offset
+    return index
+
+
+def _save_index():
+    tmp_path = INDEX_PATH.with_suffix(".json.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(_index, f, ensure_ascii=False)
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def load_index() -> dict:
+    # Index for the current file; rebuilt when the file changed behind our back
+    global _index
+    with _lock:
+        size = KB_PATH.stat().st_size if KB_PATH.exists() else 0
+        if _index is None:
+            try:
+                with INDEX_PATH.open("r", encoding="utf-8") as f:
+                    _index = json.load(f)
+            except Exception:
+                _index = None
+        if _index is None or _index.get("size") != size:
+            _index = _scan()
+            _save_index()
+        return _index
+
+
+def append_record(record: dict):
+    # Append one profile and point the index at it
+    append_records([record])
+
+
+def append_records(records: list):
+    # Group commit: all records in one write, one index update
+    if not records:
+        return
+    lines = [(json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in records]
+    with _lock:
+        index = load_index()
+        with KB_PATH.open("ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(b"".join(lines))
+        for record, line in zip(records, lines):
+            index["offsets"][record_slug(record)] = [offset, len(line)]
+            offset += len(line)
+        index["lines"] += len(lines)
+        index["size"] = offset
+        _save_index()
+        if (
+            index["lines"] >= COMPACT_MIN_LINES
+            and index["lines"] >= COMPACT_RATIO * max(len(index["offsets"]), 1)
+        ):
+            compact()
+
+
+def read_profile(slug: str):
+    # Latest KB record for a slug, or None
+    with _lock:
+        entry = load_index()["offsets"].get(slug)
+        if not entry:
+            return None
+        offset, length = entry
+        with KB_PATH.open("rb") as f:
+            f.seek(offset)
+            raw = f.read(length)
+    return json.loads(raw)
+
+
+def all_slugs() -> list:
+    with _lock:
+        return list(load_index()["offsets"])
+
+
+def compact() -> tuple:
+    # Rewrite the KB with only the latest record per slug.
+    # Returns (lines before, lines after).
+    global _index
+    with _lock:
+        index = load_index()
+        before = index["lines"]
+        latest = sorted(index["offsets"].items(), key=lambda item: item[1][0])
+
+        tmp_path = KB_PATH.with_suffix(".jsonl.tmp")
+        offsets = {}
+        with KB_PATH.open("rb") as src, tmp_path.open("wb") as dst:
+            for slug, (offset, length) in latest:
+                src.seek(offset)
+                raw = src.read(length)
+                if not raw.endswith(b"\n"):
+                    raw += b"\n"
+                offsets[slug] = [dst.tell(), len(raw)]
+                dst.write(raw)
+            size = dst.tell()
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, KB_PATH)
+
+        _index = {"size": size, "lines": len(offsets), "offsets": offsets}
+        _save_index()
+    print(f"[KB] Compacted knowledge base: {before} → {len(offsets)} lines")
+    return before, len(offsets)
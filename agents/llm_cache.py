@@ -0,0 +1,127 @@
+# LLM Cache — remembers LLM answers between runs
+# - Keyed by (provider, model, prompt hash, prompt version)
+# - We call every model with temperature 0, so a repeated prompt gets the stored answer
+# - Stored in a small SQLite file, pruned by age and total size
+# - Set EDUSCOUT_LLM_CACHE=off (or call set_enabled(False)) to always hit the provider
+
+import hashlib # prompt hashing
+import os # settings from the environment
+import sqlite3 # storage
+import threading # shared by the batch engine's worker threads
+import time # entry age
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+LLM_CACHE_PATH = BASE_DIR / "cache" / "llm_responses.sqlite3"
+
+# Bump when prompts or response handling change in a way the prompt text does not show
+PROMPT_VERSION = "v1"
+
+MAX_AGE = float(os.getenv("EDUSCOUT_LLM_CACHE_MAX_AGE_DAYS", "30")) * 86400
+MAX_BYTES = int(float(os.getenv("EDUSCOUT_LLM_CACHE_MB", "100")) * 1024 * 1024)
+
+_enabled = os.getenv("EDUSCOUT_LLM_CACHE", "on").lower() not in ("0", "off", "false", "no")
+_lock = threading.Lock()
+_conn = None
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def set_enabled(enabled: bool):
+    # Turn the cache on/off for this process (e.g. from a --no-llm-cache flag)
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        LLM_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(str(LLM_CACHE_PATH), check_same_thread=False)
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT,
+                model TEXT,
+                prompt_version TEXT,
+                prompt_hash TEXT,
+                response TEXT,
+                size INTEGER,
+                created REAL
+            )
+            """
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses(created)")
+        _conn.commit()
+        _prune()
+    return _conn
+
+
+def make_key(provider: str, model: str, prompt: str, prompt_version: str = PROMPT_VERSION):
+    # Returns (cache key, prompt hash)
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    raw = "\0".join([provider, model, prompt_version, prompt_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest(), prompt_hash
+
+
+def get(provider: str, model: str, prompt: str, prompt_version: str = PROMPT_VERSION):
+    # Cached response text, or None on a miss (or when the cache is off)
+    if not _enabled:
+        return None
+    key, _ = make_key(provider, model, prompt, prompt_version)
+    with _lock:
+        row = _connect().execute(
+            "SELECT response, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row and time.time() - row[1] <= MAX_AGE:
+            _stats["hits"] += 1
+            return row[0]
+        _stats["misses"] += 1
+    return None
+
+
+def put(provider: str, model: str, prompt: str, response: str, prompt_version: str = PROMPT_VERSION):
+    # Store a real provider answer (never mock output or errors)
+    if not _enabled or not response:
+        return
+    key, prompt_hash = make_key(provider, model, prompt, prompt_version)
+    size = len(response.encode("utf-8"))
+    with _lock:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, provider, model, prompt_version, prompt_hash, response, size, time.time()),
+        )
+        conn.commit()
+        _stats["stores"] += 1
+        if _stats["stores"] % 50 == 0:
+            _prune()
+
+
+def _prune():
+    # Drop entries past MAX_AGE, then the oldest ones until under MAX_BYTES
+    conn = _conn
+    cur = conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - MAX_AGE,))
+    evicted = cur.rowcount
+
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total > MAX_BYTES:
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY created").fetchall():
+            if total <= MAX_BYTES:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+
+    conn.commit()
+    _stats["evictions"] += max(evicted, 0)
+
+
+def stats() -> dict:
+    # Hit/miss counters for this process
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,341 @@
+# LLM Dispatcher — shared gate in front of every LLM provider
+# - Per-provider token buckets: requests/minute and tokens/minute
+# - Adaptive concurrency (AIMD): one more slot after enough successes,
+#   half the slots after a 429 / 5xx
+# - Retries 429, 5xx and network errors with jittered exponential backoff;
+#   a Retry-After header pauses the whole provider for that long
+# - Queue depth, wait time, throttles, retries and recent latencies are kept
+#   per provider
+# - Circuit breaker: after BREAKER_FAILURES failed calls in a row a provider
+#   is skipped for BREAKER_COOLDOWN seconds, then one trial call is let through
+# - A cancel event (set by the hedging race) stops a call before it sends
+# - A streamed answer is read inside the call (read=): the concurrency slot
+#   is held and the latency measured until the whole body is in
+# - When retries run out the call raises LLMUnavailable; callers report the
+#   failure instead of substituting mock data
+
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+MAX_RETRIES = int(os.getenv("EDUSCOUT_LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("EDUSCOUT_LLM_BACKOFF_SECONDS", "1.0"))
+BACKOFF_CAP = float(os.getenv("EDUSCOUT_LLM_BACKOFF_CAP_SECONDS", "30"))
+
+# provider -> (requests/min, tokens/min, max concurrency); 0 = no limit
+PROVIDER_LIMITS = {
+    "openrouter": (
+        int(os.getenv("EDUSCOUT_OPENROUTER_RPM", "120")),
+        int(os.getenv("EDUSCOUT_OPENROUTER_TPM", "200000")),
+        int(os.getenv("EDUSCOUT_OPENROUTER_CONCURRENCY", "8")),
+    ),
+    "gemini": (
+        int(os.getenv("EDUSCOUT_GEMINI_RPM", "15")),
+        int(os.getenv("EDUSCOUT_GEMINI_TPM", "1000000")),
+        int(os.getenv("EDUSCOUT_GEMINI_CONCURRENCY", "4")),
+    ),
+}
+DEFAULT_LIMITS = (60, 100000, 4)
+
+# Concurrency every provider starts at before AIMD finds the real limit
+INITIAL_CONCURRENCY = int(os.getenv("EDUSCOUT_LLM_INITIAL_CONCURRENCY", "2"))
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+BREAKER_FAILURES = int(os.getenv("EDUSCOUT_LLM_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.getenv("EDUSCOUT_LLM_BREAKER_COOLDOWN_SECONDS", "60"))
+
+# Successful call latencies kept per provider (for percentiles)
+LATENCY_WINDOW = 200
+
+
+class LLMUnavailable(Exception):
+    # The provider did not give a usable answer (after retries)
+    pass
+
+
+class LLMCancelled(LLMUnavailable):
+    # The caller no longer wants the answer (another provider won the race)
+    pass
+
+
+class TokenBucket:
+    # Reservation-based bucket: take() always succeeds and says how long to wait,
+    # so callers are served in arrival order without spinning
+    def __init__(self, per_minute: float, burst: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, amount: float = 1) -> float:
+        # Seconds to wait before amount is available
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= min(amount, self.capacity)
+            return max(0.0, -self.level / self.rate)
+
+
+class AdaptiveConcurrency:
+    # AIMD limit on calls in flight
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.in_flight = 0
+        self.waiting = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            self.waiting += 1
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.waiting -= 1
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False, succeeded: bool = True):
+        with self.cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif succeeded:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.cond.notify_all()
+
+
+class CircuitBreaker:
+    # closed -> open after `failures` failed calls in a row; open -> half-open
+    # once `cooldown` has passed (one trial call); a success closes it again
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self.trial:
+                return False
+            self.trial = True # only one trial call at a time
+            return True
+
+    def record(self, succeeded):
+        # succeeded=None: the call ended without telling us anything (cancelled)
+        with self.lock:
+            self.trial = False
+            if succeeded is None:
+                return
+            if succeeded:
+                self.consecutive = 0
+                self.opened_at = None
+                return
+            self.consecutive += 1
+            if self.opened_at is not None or self.consecutive >= self.failures:
+                self.opened_at = time.monotonic()
+
+
+def retry_after_seconds(response) -> float:
+    # Retry-After as seconds (it may also be an HTTP date); None when absent
+    value = (response.headers or {}).get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class ProviderDispatcher:
+    def __init__(self, name: str, rpm: int, tpm: int, max_concurrency: int):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency(INITIAL_CONCURRENCY, max_concurrency)
+        self.breaker = CircuitBreaker()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.stats = {
+            "calls": 0, "succeeded": 0, "failed": 0, "throttled": 0,
+            "retries": 0, "wait_seconds": 0.0, "max_queue": 0,
+            "cancelled": 0, "short_circuited": 0,
+        }
+
+    def _count(self, key: str, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def _wait_turn(self, tokens: int):
+        # Rate limits first, then a concurrency slot
+        wait = max(
+            self.requests.take(1),
+            self.tokens.take(tokens),
+            self.paused_until - time.monotonic(),
+        )
+        if wait > 0:
+            self._count("wait_seconds", wait)
+            time.sleep(wait)
+        with self.lock:
+            self.stats["max_queue"] = max(self.stats["max_queue"], self.concurrency.waiting + 1)
+        started = time.monotonic()
+        self.concurrency.acquire()
+        self._count("wait_seconds", time.monotonic() - started)
+
+    def percentile(self, q: float):
+        # Latency (seconds) at quantile q of recent successful calls, None without data
+        with self.lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(q * len(samples)) - 1)]
+
+    def call(self, send, tokens: int = 0, cancel=None, read=None):
+        # send() performs one HTTP request and returns the response.
+        # Returns the first 2xx response; raises LLMUnavailable otherwise.
+        # cancel: optional threading.Event; once set, nothing more is sent.
+        # read: optional read(response) -> result for a streamed body, run
+        # before the slot is released; call() then returns its result.
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise LLMUnavailable(f"{self.name}: circuit open")
+        last_error = None
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                self._count("retries")
+            self._wait_turn(tokens)
+            if cancel is not None and cancel.is_set():
+                self.concurrency.release(succeeded=False)
+                self.breaker.record(succeeded=None)
+                self._count("cancelled")
+                raise LLMCancelled(f"{self.name}: cancelled")
+            response = None
+            throttled = False
+            started = time.monotonic()
+            try:
+                response = send()
+            except Exception as e:
+                # Timeouts and dropped connections are worth another try
+                last_error = str(e) or e.__class__.__name__
+                status = None
+            else:
+                status = response.status_code
+                if status < 400:
+                    return self._succeed(response, started, read)
+                throttled = status in RETRYABLE_STATUS
+                last_error = f"HTTP {status}"
+            self.concurrency.release(throttled=throttled, succeeded=False)
+
+            if status is not None and not throttled:
+                break # 400 / 401 / 404 ...: retrying will not help
+            if throttled:
+                self._count("throttled")
+
+            delay = retry_after_seconds(response)
+            if delay is not None:
+                # The provider told us when to come back: hold every caller
+                with self.lock:
+                    self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                # _wait_turn sleeps until then; only spread the callers out
+                delay = random.uniform(0, BACKOFF_BASE)
+            else:
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            if attempt < MAX_RETRIES:
+                time.sleep(delay)
+
+        self.breaker.record(succeeded=False)
+        self._count("failed")
+        raise LLMUnavailable(f"{self.name}: {last_error}")
+
+    def _succeed(self, response, started: float, read):
+        # Releases the slot once the body is read; a body that breaks off (or
+        # is cancelled) mid-way is not retried, the caller decides
+        try:
+            result = read(response) if read is not None else response
+        except LLMCancelled:
+            self.concurrency.release(succeeded=False)
+            self.breaker.record(succeeded=None)
+            self._count("cancelled")
+            raise
+        except Exception:
+            self.concurrency.release(succeeded=False)
+            self.breaker.record(succeeded=False)
+            self._count("failed")
+            raise
+        self.concurrency.release(succeeded=True)
+        self.breaker.record(succeeded=True)
+        with self.lock:
+            self.latencies.append(time.monotonic() - started)
+        self._count("succeeded")
+        return result
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            snap = dict(self.stats)
+        snap["queue"] = self.concurrency.waiting
+        snap["in_flight"] = self.concurrency.in_flight
+        snap["concurrency"] = round(self.concurrency.limit, 2)
+        snap["circuit"] = self.breaker.state()
+        p95 = self.percentile(0.95)
+        snap["p95_seconds"] = round(p95, 2) if p95 is not None else None
+        return snap
+
+
+_dispatchers = {}
+_lock = threading.Lock()
+
+
+def get_dispatcher(provider: str) -> ProviderDispatcher:
+    with _lock:
+        if provider not in _dispatchers:
+            rpm, tpm, concurrency = PROVIDER_LIMITS.get(provider, DEFAULT_LIMITS)
+            _dispatchers[provider] = ProviderDispatcher(provider, rpm, tpm, concurrency)
+        return _dispatchers[provider]
+
+
+def estimate_tokens(prompt: str, max_output: int = 1000) -> int:
+    # Rough prompt size (4 characters per token) plus the answer we expect
+    return len(prompt) // 4 + max_output
+
+
+def dispatch(provider: str, send, tokens: int = 0, cancel=None, read=None):
+    return get_dispatcher(provider).call(send, tokens, cancel, read)
+
+
+def stats() -> dict:
+    # {provider: counters} for every provider used in this process
+    with _lock:
+        dispatchers = list(_dispatchers.values())
+    return {d.name: d.snapshot() for d in dispatchers}
+
+
+def total_calls() -> int:
+    # LLM requests actually made so far, all providers (a short-circuited call
+    # sends nothing); callers diff two readings to see what a step spent
+    return sum(c["calls"] - c["short_circuited"] for c in stats().values())
@@ -0,0 +1,109 @@
+# LLM Hedging — race a backup provider against a slow primary
+# - The primary request starts at once; if it has not produced an accepted
+#   answer within its p95 latency, the same prompt goes to the backup
+# - The first accepted answer (e.g. valid JSON) wins; a failed or rejected
+#   answer from one side just leaves the race to the other
+# - The loser is cancelled: its cancel event stops it before it sends
+#   (or retries); a request already on the wire finishes in the background
+#   and its answer only lands in the LLM cache
+# - A provider whose circuit breaker is open is not raced at all
+# - Hedge rate and hedge wins are counted for the end-of-run report
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from agents.llm_dispatcher import LLMUnavailable, get_dispatcher
+
+# Delay before hedging while a provider has too few samples for a p95
+HEDGE_DEFAULT_DELAY = float(os.getenv("EDUSCOUT_HEDGE_DEFAULT_SECONDS", "8"))
+HEDGE_MIN_DELAY = float(os.getenv("EDUSCOUT_HEDGE_MIN_SECONDS", "0.5"))
+HEDGE_MIN_SAMPLES = 20
+
+_pool = ThreadPoolExecutor(max_workers=int(os.getenv("EDUSCOUT_HEDGE_THREADS", "16")))
+_lock = threading.Lock()
+_stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "failed": 0}
+
+
+def _count(key: str):
+    with _lock:
+        _stats[key] += 1
+
+
+def hedge_delay(provider: str) -> float:
+    # p95 latency of the provider's recent successful calls
+    dispatcher = get_dispatcher(provider)
+    with dispatcher.lock:
+        enough = len(dispatcher.latencies) >= HEDGE_MIN_SAMPLES
+    if not enough:
+        return HEDGE_DEFAULT_DELAY
+    return max(HEDGE_MIN_DELAY, dispatcher.percentile(0.95))
+
+
+def race(candidates: list, accept=None):
+    # candidates: [(provider, fn)] in preference order; fn(cancel_event) -> text.
+    # accept(text) -> bool decides whether an answer is usable (default: any).
+    # Returns (winning text, its provider); raises LLMUnavailable when every
+    # candidate failed.
+    accept = accept or (lambda text: True)
+    candidates = [(p, fn) for p, fn in candidates if get_dispatcher(p).breaker.state() != "open"]
+    if not candidates:
+        raise LLMUnavailable("every provider's circuit is open")
+    _count("requests")
+
+    cancels = {}
+    running = {} # future -> provider
+    hedges = set() # providers started because the primary was slow
+    def start(provider, fn):
+        cancel = threading.Event()
+        cancels[provider] = cancel
+        running[_pool.submit(fn, cancel)] = provider
+
+    start(*candidates[0])
+    backups = list(candidates[1:])
+    deadline = time.monotonic() + hedge_delay(candidates[0][0])
+    errors = []
+
+    try:
+        while running:
+            timeout = None
+            if backups:
+                timeout = max(0.0, deadline - time.monotonic())
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Primary is slower than usual: fire the backup
+                _count("hedged")
+                hedges.add(backups[0][0])
+                start(*backups.pop(0))
+                continue
+
+            for future in done:
+                provider = running.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    errors.append(f"{provider}: {e}")
+                    continue
+                if accept(text):
+                    if provider in hedges:
+                        _count("hedge_wins")
+                    return text, provider
+                errors.append(f"{provider}: unusable answer")
+
+            if backups and not running:
+                # Everything in flight failed: fail over right away
+                _count("failovers")
+                start(*backups.pop(0))
+    finally:
+        for cancel in cancels.values():
+            cancel.set()
+
+    _count("failed")
+    raise LLMUnavailable("; ".join(errors) or "no provider answered")
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
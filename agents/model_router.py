@@ -0,0 +1,102 @@
+# Model Router — cheap model first, stronger model only when needed
+# - Each task (structuring, discovery) has a cascade of OpenRouter models,
+#   cheapest first; EDUSCOUT_<TASK>_CASCADE overrides it (comma-separated)
+# - An answer is kept when the task's accept() check passes (valid JSON and
+#   complete enough for structuring, a URL for discovery); otherwise, or when
+#   the call fails, the next model is asked
+# - Inputs too large for the cheap model (page size) start further down
+# - Calls, escalations and latency are counted per model
+# - Off by default; enable with EDUSCOUT_MODEL_CASCADE=on or --cascade
+
+import os
+import threading
+import time
+
+from agents.llm_dispatcher import LLMUnavailable
+
+CASCADES = {
+    "structuring": os.getenv(
+        "EDUSCOUT_STRUCTURING_CASCADE", "google/gemini-2.0-flash-lite-001,openai/gpt-4o-mini"
+    ).split(","),
+    "discovery": os.getenv(
+        "EDUSCOUT_DISCOVERY_CASCADE", "google/gemini-2.0-flash-lite-001,google/gemini-2.0-flash-001"
+    ).split(","),
+}
+
+# Prompts longer than this skip the first (cheapest) model
+CHEAP_MAX_CHARS = int(os.getenv("EDUSCOUT_CASCADE_CHEAP_MAX_CHARS", "24000"))
+
+# Structured profiles below this completeness are re-asked to a stronger model
+MIN_COMPLETENESS = float(os.getenv("EDUSCOUT_CASCADE_MIN_COMPLETENESS", "0.5"))
+
+_enabled = os.getenv("EDUSCOUT_MODEL_CASCADE", "off").lower() in ("1", "on", "true", "yes")
+_lock = threading.Lock()
+_stats = {} # model -> {"calls", "accepted", "escalated", "failed", "seconds"}
+
+
+def set_enabled(enabled: bool):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _record(model: str, outcome: str, seconds: float):
+    with _lock:
+        counters = _stats.setdefault(
+            model, {"calls": 0, "accepted": 0, "escalated": 0, "failed": 0, "seconds": 0.0}
+        )
+        counters["calls"] += 1
+        counters[outcome] += 1
+        counters["seconds"] += seconds
+
+
+def models_for(task: str, prompt: str) -> list:
+    # Cascade for this task; a big input starts at the second model
+    models = [m.strip() for m in CASCADES[task] if m.strip()]
+    if len(prompt) > CHEAP_MAX_CHARS and len(models) > 1:
+        models = models[1:]
+    return models
+
+
+def route(task: str, prompt: str, call, accept):
+    # call(model) -> text; accept(text) -> bool.
+    # Returns (answer, model that gave it): the first accepted answer, or the
+    # last answer if none was.
+    models = models_for(task, prompt)
+    last_text = None
+    last_model = None
+    last_error = None
+    for i, model in enumerate(models):
+        final = i == len(models) - 1
+        started = time.monotonic()
+        try:
+            text = call(model)
+        except LLMUnavailable as e:
+            _record(model, "failed", time.monotonic() - started)
+            last_error = e
+            continue
+        seconds = time.monotonic() - started
+        if accept(text) or final:
+            _record(model, "accepted", seconds)
+            return text, model
+        _record(model, "escalated", seconds)
+        print(f"[ROUTER] {model} answer not good enough for {task} - escalating")
+        last_text = text
+        last_model = model
+    if last_text is not None:
+        return last_text, last_model
+    raise last_error or LLMUnavailable(f"no model configured for {task}")
+
+
+def stats() -> dict:
+    # {model: counters + escalation_rate + avg_seconds}
+    with _lock:
+        snapshot = {model: dict(counters) for model, counters in _stats.items()}
+    for counters in snapshot.values():
+        calls = counters["calls"] or 1
+        counters["escalation_rate"] = counters["escalated"] / calls
+        counters["avg_seconds"] = counters["seconds"] / calls
+    return snapshot
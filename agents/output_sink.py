@@ -0,0 +1,179 @@
+# Output Sink — background writer for the ACT phase
+# - Workers hand finished profiles to a bounded queue and go back to the network
+# - One writer thread saves JSON, renders Markdown and records fingerprints,
+#   so disk I/O never holds a worker (or the write semaphore) hostage
+# - Knowledge base lines are buffered and appended in groups: one write and one
+#   index update per flush instead of one per company
+# - Flush policy: every kb_batch_size records, every flush_interval seconds,
+#   and on close()
+# - With the SQLite backend, profiles waiting in the queue are saved in one
+#   transaction (up to kb_batch_size per commit)
+# - A profile only counts as saved (after() runs, its future resolves) once
+#   its transaction committed and its KB record was flushed; a failed flush
+#   fails the futures of the records it lost, so a resumed run redoes them
+# - close() drains everything still queued before returning
+
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+from agents.profile_generator import act_save_outputs
+
+DEFAULT_QUEUE_SIZE = int(os.getenv("EDUSCOUT_SINK_QUEUE", "64"))
+DEFAULT_KB_BATCH = int(os.getenv("EDUSCOUT_SINK_KB_BATCH", "25"))
+DEFAULT_FLUSH_INTERVAL = float(os.getenv("EDUSCOUT_SINK_FLUSH_SECONDS", "2.0"))
+
+_STOP = object()
+
+
+class OutputSink:
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE, kb_batch_size: int = DEFAULT_KB_BATCH,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, router=None):
+        # router: optional ThreadLocalStdout so each job's log is captured and
+        # returned with its result instead of interleaving with the workers
+        self.queue = queue.Queue(maxsize=max(queue_size, 1))
+        self.kb_batch_size = max(kb_batch_size, 1)
+        self.flush_interval = flush_interval
+        self.router = router
+        self.kb_buffer = []
+        self.kb_since = None # when the oldest buffered KB record arrived
+        self.kb_waiting = [] # (future, after, result) of saves whose KB record is buffered
+        self.flushes = 0
+        self.kb_records = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="output-sink", daemon=True)
+        self.thread.start()
+
+    def submit(self, structured: dict, after=None) -> Future:
+        # Queue one profile; blocks while the queue is full (back-pressure).
+        # after: optional callable run on the writer thread once the profile is
+        # saved, KB record included (main.py records the fingerprint and the
+        # journal entry there).
+        # The future resolves to (has_changes, log).
+        if self.closed:
+            raise RuntimeError("output sink is closed")
+        future = Future()
+        self.queue.put((structured, after, future))
+        return future
+
+    def close(self):
+        # Drain the queue, flush the KB buffer and stop the writer thread
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_STOP)
+        self.thread.join()
+        print(f"[SINK] {self.kb_records} KB records written in {self.flushes} flushes")
+
+    # ---- writer thread ----
+
+    def _buffer_kb(self, record: dict):
+        if not self.kb_buffer:
+            self.kb_since = time.monotonic()
+        self.kb_buffer.append(record)
+
+    def _flush_kb(self):
+        if not self.kb_buffer:
+            return
+        from agents.knowledge_base import append_records
+        records, self.kb_buffer, self.kb_since = self.kb_buffer, [], None
+        waiting, self.kb_waiting = self.kb_waiting, []
+        try:
+            append_records(records)
+        except Exception as e:
+            print(f"[SINK] Knowledge base flush failed ({len(records)} records): {e}")
+            for future, _, _ in waiting:
+                future.set_exception(e)
+            return
+        self.flushes += 1
+        self.kb_records += len(records)
+        for item in waiting:
+            self._finish(*item)
+
+    def _flush_due(self) -> bool:
+        if len(self.kb_buffer) >= self.kb_batch_size:
+            return True
+        return self.kb_since is not None and time.monotonic() - self.kb_since >= self.flush_interval
+
+    def _captured(self, fn):
+        # (fn(), what it printed)
+        buffer = io.StringIO()
+        if self.router is not None:
+            self.router.capture(buffer)
+        try:
+            return fn(), buffer.getvalue()
+        finally:
+            if self.router is not None:
+                self.router.release()
+
+    def _finish(self, future, after, result):
+        # The profile is saved for good: run after() and resolve its future
+        has_changes, log = result
+        if after is not None:
+            try:
+                _, after_log = self._captured(after)
+            except Exception as e:
+                future.set_exception(e)
+                return
+            log += after_log
+        future.set_result((has_changes, log))
+
+    def _save_group(self, items):
+        # Saves the group (in one SQLite transaction when enabled); after() and
+        # the futures wait for the commit, and for the KB flush when the save
+        # buffered a KB record
+        from agents import sqlite_store
+        saved = []
+        failed = []
+        try:
+            with (sqlite_store.transaction() if sqlite_store.is_enabled() else nullcontext()):
+                for structured, after, future in items:
+                    queued = len(self.kb_buffer)
+                    try:
+                        result = self._captured(
+                            lambda: act_save_outputs(structured, kb_writer=self._buffer_kb)
+                        )
+                    except Exception as e:
+                        failed.append((future, e))
+                        continue
+                    saved.append((future, after, result, len(self.kb_buffer) > queued))
+        except Exception as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        for future, error in failed:
+            future.set_exception(error)
+        for future, after, result, buffered in saved:
+            if buffered:
+                self.kb_waiting.append((future, after, result))
+            else:
+                self._finish(future, after, result)
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush_kb() # idle for a whole interval
+                continue
+            stop = item is _STOP
+            group = [] if stop else [item]
+            while not stop and len(group) < self.kb_batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                stop = item is _STOP
+                if not stop:
+                    group.append(item)
+            if group:
+                self._save_group(group)
+            if stop:
+                self._flush_kb()
+                return
+            if self._flush_due():
+                self._flush_kb()
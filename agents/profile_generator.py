@@ -1,4 +1,8 @@
+import hashlib
 import json
+import os
+import tempfile
+import threading
 from pathlib import Path
 
 # Base folders
@@ -6,6 +10,8 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 JSON_DIR = BASE_DIR / "profiles" / "json"
 MD_DIR = BASE_DIR / "profiles" / "markdown"
 KB_PATH = BASE_DIR / "knowledge_base.jsonl"
+# Content hashes of the profile files we wrote, so unchanged profiles are not rewritten
+HASHES_PATH = BASE_DIR / "cache" / "profile_hashes.json"
 
 # Create folders if they don't exist
 JSON_DIR.mkdir(parents=True, exist_ok=True)
@@ -21,6 +27,81 @@ def safe_list(value):
         return [value]
     return [str(value)]
 
+# Helper, Write a file so readers see either the old or the new version, never half of it
+def atomic_write_text(path: Path, text: str):
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        # mkstemp creates 0600 files; keep the usual permissions instead
+        mode = path.stat().st_mode & 0o777 if path.exists() else 0o644
+        os.chmod(tmp_name, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except Exception:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+# Helper, Remembered content hashes of profile files (loaded once per process)
+_hashes = None
+_hashes_dirty = False
+_hashes_lock = threading.Lock()
+
+def _content_hash(text: str) -> str:
+    # Line endings do not count as a change (profiles were written on Windows too)
+    return hashlib.sha256(text.replace("\r\n", "\n").encode("utf-8")).hexdigest()
+
+def _load_hashes() -> dict:
+    global _hashes
+    if _hashes is None:
+        try:
+            with HASHES_PATH.open("r", encoding="utf-8") as f:
+                _hashes = json.load(f)
+        except Exception:
+            _hashes = {}
+    return _hashes
+
+def _save_hashes():
+    # Only touches the disk when something new was remembered
+    global _hashes_dirty
+    if not _hashes_dirty:
+        return
+    HASHES_PATH.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(HASHES_PATH, json.dumps(_hashes))
+    _hashes_dirty = False
+
+# Helper, True if the file on disk already holds exactly this text
+def file_unchanged(path: Path, text: str) -> bool:
+    digest = _content_hash(text)
+    with _hashes_lock:
+        entry = _load_hashes().get(path.name)
+    try:
+        stat = path.stat()
+    except OSError:
+        return False
+    # Fast path: we wrote this file ourselves and it was not touched since
+    if entry and entry["sha"] == digest and entry["mtime"] == stat.st_mtime_ns:
+        return True
+    # Otherwise read it once and remember what we found
+    with path.open("r", encoding="utf-8", newline="") as f:
+        same = _content_hash(f.read()) == digest
+    if same:
+        remember_hash(path, text)
+    return same
+
+def remember_hash(path: Path, text: str):
+    global _hashes_dirty
+    with _hashes_lock:
+        _hashes_dirty = True
+        _load_hashes()[path.name] = {
+            "sha": _content_hash(text),
+            "mtime": path.stat().st_mtime_ns,
+        }
+
 # Helper, Format list into markdown bullet points
 def format_list_for_md(items):
     items = safe_list(items)
@@ -179,7 +260,10 @@ def generate_markdown(structured: dict) -> str:
     return md
 
 # ACT PHASE – Save JSON, Markdown, KB
-def act_save_outputs(structured: dict):
+def act_save_outputs(structured: dict, kb_writer=None) -> bool:
+    # Returns True when the profile changed compared to the saved version
+    # kb_writer: optional callable taking the record instead of appending it to
+    # the KB right away (the output sink uses it to group KB appends)
 
     # Add completeness score
     structured["data_completeness_score"] = calculate_completeness(structured)
@@ -191,6 +275,7 @@ def act_save_outputs(structured: dict):
     slug = slugify(company_name)
     
     # Check for updates before saving
+    has_changes = False
     try:
         # Import the updater module
         import sys
@@ -203,27 +288,58 @@ def act_save_outputs(structured: dict):
         if has_changes:
             print(f"[ACT]  Changes detected - updating profile")
         else:
-            print(f"[ACT]  Data unchanged - saving anyway")
+            print(f"[ACT]  Data unchanged")
     except Exception as e:
         print(f"[ACT] Update check failed (continuing anyway): {e}")
 
+    # Keep the in-memory search index (if loaded) in step with the saved profile
+    from agents.search import index_profile
+    index_profile(slug, structured)
+
+    # SQLite backend: one row instead of three files (export with --export)
+    from agents import sqlite_store
+    from agents import change_detection
+    if sqlite_store.is_enabled():
+        sqlite_store.save_profile(slug, structured)
+        change_detection.commit(slug, structured)
+        print(f"[ACT] Saved profile to database → {sqlite_store.DB_PATH} ({slug})")
+        return has_changes
+
     json_path = JSON_DIR / f"{slug}.json"
     md_path = MD_DIR / f"{slug}.md"
 
+    json_text = json.dumps(structured, ensure_ascii=False, indent=2)
+    markdown = generate_markdown(structured)
+
+    # Identical content already on disk: no rewrite, no new KB line
+    if file_unchanged(json_path, json_text) and file_unchanged(md_path, markdown):
+        print(f"[ACT] Profile files unchanged - skipping writes ({slug})")
+        with _hashes_lock:
+            _save_hashes()
+        change_detection.commit(slug, structured)
+        return has_changes
+
     # Save JSON
-    with json_path.open("w", encoding="utf-8") as f:
-        json.dump(structured, f, ensure_ascii=False, indent=2)
+    atomic_write_text(json_path, json_text)
+    remember_hash(json_path, json_text)
     print(f"[ACT] Saved JSON profile → {json_path}")
 
-    # Generate Markdown
-    markdown = generate_markdown(structured)
-
     # Save Markdown
-    with md_path.open("w", encoding="utf-8") as f:
-        f.write(markdown)
+    atomic_write_text(md_path, markdown)
+    remember_hash(md_path, markdown)
     print(f"[ACT] Saved Markdown profile → {md_path}")
 
-    # Append to knowledge base
-    with KB_PATH.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(structured, ensure_ascii=False) + "\n")
-    print(f"[ACT] Appended to knowledge base → {KB_PATH}")
\ No newline at end of file
+    with _hashes_lock:
+        _save_hashes()
+    change_detection.commit(slug, structured)
+
+    # Append to knowledge base (also updates the slug -> offset index)
+    if kb_writer is not None:
+        kb_writer(structured)
+        print(f"[ACT] Queued for knowledge base → {KB_PATH}")
+    else:
+        from agents.knowledge_base import append_record
+        append_record(structured)
+        print(f"[ACT] Appended to knowledge base → {KB_PATH}")
+
+    return has_changes
\ No newline at end of file
@@ -0,0 +1,156 @@
+# Recrawl Scheduler — decides which companies a scheduled update re-checks
+# - Per-company state: last check, last change, checks, changes, current interval
+# - A check that finds no change doubles the company's interval (up to
+#   MAX_INTERVAL); a change halves it (down to MIN_INTERVAL); a first check
+#   (new profile) keeps it
+# - A failed check (site down, no website found) is recorded without backoff,
+#   so broken sites are not pushed further out
+# - Companies are due once their interval has passed; due companies are
+#   ranked by how likely their profile is stale (observed change rate x
+#   how overdue they are), never-checked companies first
+# - Each run spends at most a budget of fetches and LLM calls, charged for
+#   what each check actually used
+# - State is persisted in cache/recrawl_state.json between runs (runtime
+#   state, not part of the tracked profiles)
+
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+STATE_PATH = BASE_DIR / "cache" / "recrawl_state.json"
+
+DAY = 86400
+BASE_INTERVAL = float(os.getenv("EDUSCOUT_RECRAWL_BASE_DAYS", "1")) * DAY
+MIN_INTERVAL = float(os.getenv("EDUSCOUT_RECRAWL_MIN_DAYS", "0.5")) * DAY
+MAX_INTERVAL = float(os.getenv("EDUSCOUT_RECRAWL_MAX_DAYS", "60")) * DAY
+
+# Per-run budgets
+DEFAULT_FETCH_BUDGET = int(os.getenv("EDUSCOUT_RECRAWL_FETCH_BUDGET", "50"))
+DEFAULT_LLM_BUDGET = int(os.getenv("EDUSCOUT_RECRAWL_LLM_BUDGET", "20"))
+
+_lock = threading.Lock()
+
+
+def company_key(company_name: str) -> str:
+    # Same normalization as the text fingerprints
+    from updater import fingerprint_key
+    return fingerprint_key(company_name)
+
+
+def load_state() -> dict:
+    try:
+        with STATE_PATH.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_state(state: dict):
+    from agents.profile_generator import atomic_write_text
+    with _lock:
+        STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(STATE_PATH, json.dumps(state, ensure_ascii=False, indent=2))
+
+
+def change_rate(entry: dict) -> float:
+    # Share of checks that found a change, smoothed so one check is not the whole story
+    return (entry.get("changes", 0) + 1) / (entry.get("checks", 0) + 2)
+
+
+def priority(entry: dict, now: float) -> float:
+    # Chance the stored profile is stale: 1 - (1 - rate) ** (intervals elapsed)
+    if not entry or not entry.get("last_checked"):
+        return math.inf
+    elapsed = (now - entry["last_checked"]) / entry.get("interval", BASE_INTERVAL)
+    return 1 - (1 - change_rate(entry)) ** max(elapsed, 0)
+
+
+def is_due(entry: dict, now: float) -> bool:
+    if not entry or not entry.get("last_checked"):
+        return True
+    return now - entry["last_checked"] >= entry.get("interval", BASE_INTERVAL)
+
+
+def plan(companies: list, state: dict, now: float = None) -> list:
+    # Due companies, most likely stale first
+    now = now or time.time()
+    due = [c for c in companies if is_due(state.get(company_key(c)), now)]
+    return sorted(due, key=lambda c: -priority(state.get(company_key(c)), now))
+
+
+def _entry(state: dict, company_name: str) -> dict:
+    return state.setdefault(company_key(company_name), {
+        "company": company_name,
+        "checks": 0,
+        "changes": 0,
+        "failures": 0,
+        "interval": BASE_INTERVAL,
+        "last_checked": None,
+        "last_changed": None,
+    })
+
+
+def record_check(state: dict, company_name: str, changed, now: float = None) -> dict:
+    # Update one company after a check and return its entry.
+    # changed: True / False, or None for a first check (new profile) that says
+    # nothing about how often the company changes.
+    now = now or time.time()
+    entry = _entry(state, company_name)
+    entry["checks"] += 1
+    entry["last_checked"] = now
+    if changed:
+        entry["changes"] += 1
+        entry["last_changed"] = now
+        entry["interval"] = max(entry["interval"] / 2, MIN_INTERVAL)
+    elif changed is not None:
+        entry["interval"] = min(entry["interval"] * 2, MAX_INTERVAL)
+    return entry
+
+
+def record_failure(state: dict, company_name: str, now: float = None) -> dict:
+    # A check that could not be completed: due again after the same interval
+    now = now or time.time()
+    entry = _entry(state, company_name)
+    entry["failures"] = entry.get("failures", 0) + 1
+    entry["last_checked"] = now
+    return entry
+
+
+class Budget:
+    # Fetches and LLM calls left for this run
+    def __init__(self, fetches: int = DEFAULT_FETCH_BUDGET, llm_calls: int = DEFAULT_LLM_BUDGET):
+        self.fetches = fetches
+        self.llm_calls = llm_calls
+
+    def can_afford(self, fetches: int = 0, llm_calls: int = 0) -> bool:
+        return fetches <= self.fetches and llm_calls <= self.llm_calls
+
+    def charge(self, fetches: int = 0, llm_calls: int = 0):
+        # Record what was actually spent (may overdraw: the work is done)
+        self.fetches -= fetches
+        self.llm_calls -= llm_calls
+
+    def gate(self, fetches: int = 0, llm_calls: int = 0):
+        # Reusable context manager charging this cost on every use, for the
+        # llm_gate / fetch_gate hooks of discover_company_page
+        return _Charge(self, fetches, llm_calls)
+
+    def exhausted(self) -> bool:
+        return self.fetches <= 0
+
+
+class _Charge:
+    def __init__(self, budget: Budget, fetches: int, llm_calls: int):
+        self.budget = budget
+        self.fetches = fetches
+        self.llm_calls = llm_calls
+
+    def __enter__(self):
+        self.budget.charge(self.fetches, self.llm_calls)
+
+    def __exit__(self, *exc):
+        return False
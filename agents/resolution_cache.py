@@ -0,0 +1,132 @@
+# Resolution Cache — remembers which website each company resolved to
+# - Keyed by a normalized company name ("Khan  Academy" == "khan academy")
+# - Positive entries keep the validated URL, the final redirect target and a timestamp
+# - Negative entries (company did not resolve) expire much sooner than positive ones
+# - Stored as an append-only JSONL file; the latest line for a company wins
+
+import json # to read/write one JSON entry per line
+import os # to read TTL overrides from the environment
+import re # to normalize company names
+import threading # the batch engine calls discovery from several threads
+import time # timestamps for TTL checks
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+CACHE_DIR = BASE_DIR / "cache"
+RESOLUTION_CACHE_PATH = CACHE_DIR / "website_resolution.jsonl"
+
+# Official URLs almost never change, misses are retried sooner
+POSITIVE_TTL = float(os.getenv("EDUSCOUT_RESOLUTION_TTL_DAYS", "30")) * 86400
+NEGATIVE_TTL = float(os.getenv("EDUSCOUT_RESOLUTION_NEGATIVE_TTL_HOURS", "24")) * 3600
+
+_lock = threading.Lock()
+_entries = None # normalized name -> latest entry, loaded lazily
+
+
+def normalize_company_name(name: str) -> str:
+    # Lowercase, drop punctuation and collapse whitespace
+    name = (name or "").lower().strip()
+    name = re.sub(r"[^\w\s]", " ", name)
+    return " ".join(name.split())
+
+
+def _load_entries() -> dict:
+    # Read the JSONL file once; later lines override earlier ones
+    global _entries
+    if _entries is not None:
+        return _entries
+
+    _entries = {}
+    lines = 0
+    if RESOLUTION_CACHE_PATH.exists():
+        with RESOLUTION_CACHE_PATH.open("r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    _entries[entry["key"]] = entry
+                except Exception:
+                    continue # skip half-written or corrupt lines
+
+    # Rewrite the file when it is mostly superseded lines
+    if lines > 2 * len(_entries) + 50:
+        _rewrite_file()
+    return _entries
+
+
+def _rewrite_file():
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = RESOLUTION_CACHE_PATH.with_suffix(".jsonl.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        for entry in _entries.values():
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, RESOLUTION_CACHE_PATH)
+
+
+def _append(entry: dict):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with RESOLUTION_CACHE_PATH.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def lookup(company_name: str):
+    # Returns the fresh cache entry for this company, or None on a miss/expired entry
+    # Entry status is "resolved" (has url + final_url) or "unresolved"
+    key = normalize_company_name(company_name)
+    with _lock:
+        entry = _load_entries().get(key)
+    if not entry:
+        return None
+
+    ttl = POSITIVE_TTL if entry.get("status") == "resolved" else NEGATIVE_TTL
+    if time.time() - entry.get("timestamp", 0) > ttl:
+        return None
+    return entry
+
+
+def seen(company_name: str) -> bool:
+    # True when the company has an entry, fresh or expired: discovering it
+    # again means the earlier answer went stale
+    key = normalize_company_name(company_name)
+    with _lock:
+        return key in _load_entries()
+
+
+def store_resolved(company_name: str, url: str, final_url: str):
+    # Remember a validated website and where it redirected to
+    entry = {
+        "key": normalize_company_name(company_name),
+        "company_name": company_name,
+        "status": "resolved",
+        "url": url,
+        "final_url": final_url or url,
+        "timestamp": time.time(),
+    }
+    with _lock:
+        _load_entries()[entry["key"]] = entry
+        _append(entry)
+
+
+def store_unresolved(company_name: str):
+    # Remember that discovery failed, so we stop paying for repeated misses
+    entry = {
+        "key": normalize_company_name(company_name),
+        "company_name": company_name,
+        "status": "unresolved",
+        "url": "",
+        "final_url": "",
+        "timestamp": time.time(),
+    }
+    with _lock:
+        _load_entries()[entry["key"]] = entry
+        _append(entry)
+
+
+def invalidate(company_name: str):
+    # Drop a cached website (e.g. it stopped responding) so the next run asks the LLM again
+    key = normalize_company_name(company_name)
+    with _lock:
+        entries = _load_entries()
+        if key in entries:
+            del entries[key]
+            _rewrite_file()
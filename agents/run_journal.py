@@ -0,0 +1,99 @@
+# Run Journal — checkpoints of a batch run, so an interrupted run can resume
+# - One JSONL journal per input file under cache/runs/, one line per stage
+#   outcome: discovered, fetched, structured, saved
+# - Lines carry what a later stage needs (website, text fingerprint,
+#   structured profile), so resuming never repeats a paid LLM call
+# - A new run starts a fresh journal; --resume replays the existing one:
+#   saved companies are skipped, the rest restart at the stage that failed
+# - A half-written last line (crash mid-write) is ignored
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+JOURNAL_DIR = BASE_DIR / "cache" / "runs"
+
+STAGES = ["discovered", "fetched", "structured", "saved"]
+
+
+def journal_path(input_path: str) -> Path:
+    # companies.txt -> cache/runs/companies-<hash of its full path>.jsonl
+    resolved = Path(input_path).resolve()
+    digest = hashlib.sha256(str(resolved).encode("utf-8")).hexdigest()[:8]
+    return JOURNAL_DIR / f"{resolved.stem}-{digest}.jsonl"
+
+
+class RunJournal:
+    def __init__(self, input_path: str, resume: bool = False):
+        self.path = journal_path(input_path)
+        self.lock = threading.Lock()
+        self.progress = {} # company -> {"stage", "failed", "url", "fingerprint", "structured"}
+        JOURNAL_DIR.mkdir(parents=True, exist_ok=True)
+        if resume and self.path.exists():
+            self._replay()
+            mode = "a"
+        else:
+            mode = "w"
+        self.file = self.path.open(mode, encoding="utf-8")
+        if mode == "w":
+            self._write({"input": str(Path(input_path).resolve()), "started": time.time()})
+
+    def _replay(self):
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except Exception:
+                    continue # torn last line
+                if "company" in entry:
+                    self._apply(entry)
+
+    def _apply(self, entry: dict):
+        state = self.progress.setdefault(entry["company"], {"stage": None, "failed": None})
+        if not entry.get("ok", True):
+            state["failed"] = entry["stage"]
+            return
+        state["stage"] = entry["stage"]
+        state["failed"] = None
+        for key in ("url", "fingerprint", "structured"):
+            if key in entry:
+                state[key] = entry[key]
+
+    def _write(self, entry: dict):
+        with self.lock:
+            self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.file.flush()
+
+    def record(self, company: str, stage: str, ok: bool = True, **data):
+        # One stage outcome; data is kept for resuming (url, fingerprint, structured, error)
+        entry = {"company": company, "stage": stage, "ok": ok, "time": time.time(), **data}
+        self._write(entry)
+        with self.lock:
+            self._apply(entry)
+
+    def state(self, company: str) -> dict:
+        with self.lock:
+            return dict(self.progress.get(company, {}))
+
+    def is_done(self, company: str) -> bool:
+        return self.state(company).get("stage") == "saved"
+
+    def summary(self) -> dict:
+        # {"saved": n, "partial": n, "failed": n} over the replayed companies
+        counts = {"saved": 0, "partial": 0, "failed": 0}
+        with self.lock:
+            for state in self.progress.values():
+                if state["stage"] == "saved":
+                    counts["saved"] += 1
+                elif state["failed"]:
+                    counts["failed"] += 1
+                else:
+                    counts["partial"] += 1
+        return counts
+
+    def close(self):
+        with self.lock:
+            self.file.close()
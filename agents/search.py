@@ -0,0 +1,202 @@
+# Search — in-memory inverted index over company profiles
+# - Indexes products, target_market, key_features, competitors, category,
+#   company_name and summary tokens, per field
+# - Boolean queries: AND / OR / NOT, parentheses, field filters, "phrases"
+#     target_market:k-12 AND competitors:moodle
+#     (lms OR lxp) NOT category:"corporate training"
+# - Results ranked by a tf-idf score with per-field weights
+# - act_save_outputs feeds every saved profile in, so the index stays current
+
+import json
+import math
+import re
+import threading
+from collections import defaultdict
+
+from agents.profile_generator import JSON_DIR, safe_list
+
+# Indexed fields and how much a match in each one counts when ranking
+FIELD_WEIGHTS = {
+    "company_name": 3.0,
+    "products": 2.0,
+    "category": 2.0,
+    "competitors": 1.5,
+    "target_market": 1.5,
+    "key_features": 1.0,
+    "summary": 0.5,
+}
+
+# Fields holding one string rather than a list
+SINGLE_VALUE_FIELDS = {"company_name", "category", "summary"}
+
+QUERY_TOKEN = re.compile(r'\(|\)|[\w.-]+:"[^"]*"|"[^"]*"|[^\s()"]+')
+
+
+def tokenize(text: str) -> list:
+    # Lowercase words; "K–12" / "K-12" / "k12" all become "k12"
+    text = str(text).lower().replace("–", "-").replace("—", "-")
+    text = re.sub(r"(\w)-(\w)", r"\1\2", text)
+    return re.findall(r"\w+", text)
+
+
+class ProfileIndex:
+    def __init__(self):
+        self.postings = defaultdict(lambda: defaultdict(dict)) # field -> token -> {slug: tf}
+        self.doc_terms = {} # slug -> [(field, token)] so a profile can be replaced
+        self.names = {} # slug -> company_name for results
+        self.lock = threading.RLock()
+
+    # ---- building ----
+
+    def add(self, slug: str, profile: dict):
+        # Index (or re-index) one profile
+        with self.lock:
+            self.remove(slug)
+            terms = []
+            for field in FIELD_WEIGHTS:
+                value = profile.get(field)
+                if field in SINGLE_VALUE_FIELDS:
+                    values = [value] if value else []
+                else:
+                    values = safe_list(value)
+                for item in values:
+                    for token in tokenize(item):
+                        tf = self.postings[field][token]
+                        tf[slug] = tf.get(slug, 0) + 1
+                        terms.append((field, token))
+            self.doc_terms[slug] = terms
+            self.names[slug] = profile.get("company_name") or slug
+
+    def remove(self, slug: str):
+        with self.lock:
+            for field, token in self.doc_terms.pop(slug, []):
+                docs = self.postings[field].get(token)
+                if docs is not None:
+                    docs.pop(slug, None)
+                    if not docs:
+                        del self.postings[field][token]
+            self.names.pop(slug, None)
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    # ---- querying ----
+
+    def _docs(self, field, token) -> dict:
+        # {slug: weighted tf} for a token in one field, or in every field
+        fields = [field] if field else list(FIELD_WEIGHTS)
+        found = {}
+        for f in fields:
+            for slug, tf in self.postings[f].get(token, {}).items():
+                found[slug] = found.get(slug, 0) + tf * FIELD_WEIGHTS[f]
+        return found
+
+    def _term(self, field, text, scores):
+        # Documents matching every token of a term (a phrase is an AND of its words)
+        tokens = tokenize(text)
+        if not tokens:
+            return set(self.doc_terms)
+        result = None
+        for token in tokens:
+            docs = self._docs(field, token)
+            idf = math.log(1 + len(self.doc_terms) / (1 + len(docs)))
+            for slug, weight in docs.items():
+                scores[slug] = scores.get(slug, 0) + idf * weight
+            result = set(docs) if result is None else result & set(docs)
+        return result
+
+    def _parse(self, tokens, pos, scores):
+        # or_expr := and_expr (OR and_expr)*
+        result, pos = self._parse_and(tokens, pos, scores)
+        while pos < len(tokens) and tokens[pos] == "OR":
+            right, pos = self._parse_and(tokens, pos + 1, scores)
+            result = result | right
+        return result, pos
+
+    def _parse_and(self, tokens, pos, scores):
+        # and_expr := not_expr ((AND)? not_expr)*
+        result, pos = self._parse_not(tokens, pos, scores)
+        while pos < len(tokens) and tokens[pos] not in ("OR", ")"):
+            if tokens[pos] == "AND":
+                pos += 1
+            right, pos = self._parse_not(tokens, pos, scores)
+            result = result & right
+        return result, pos
+
+    def _parse_not(self, tokens, pos, scores):
+        # not_expr := NOT not_expr | atom
+        if pos < len(tokens) and tokens[pos] == "NOT":
+            excluded, pos = self._parse_not(tokens, pos + 1, {})
+            return set(self.doc_terms) - excluded, pos
+        return self._parse_atom(tokens, pos, scores)
+
+    def _parse_atom(self, tokens, pos, scores):
+        # atom := "(" or_expr ")" | [field:]word | [field:]"phrase"
+        if pos >= len(tokens):
+            return set(self.doc_terms), pos
+        token = tokens[pos]
+        if token == "(":
+            result, pos = self._parse(tokens, pos + 1, scores)
+            if pos < len(tokens) and tokens[pos] == ")":
+                pos += 1
+            return result, pos
+
+        field = None
+        if ":" in token:
+            name, rest = token.split(":", 1)
+            if name in FIELD_WEIGHTS:
+                field, token = name, rest
+        return self._term(field, token.strip('"'), scores), pos + 1
+
+    def search(self, query: str, limit: int = 10) -> list:
+        # [{"slug", "company_name", "score"}] best first
+        tokens = QUERY_TOKEN.findall(query)
+        scores = {}
+        with self.lock:
+            matched, _ = self._parse(tokens, 0, scores)
+            ranked = sorted(matched, key=lambda slug: (-scores.get(slug, 0), slug))
+            return [
+                {"slug": slug, "company_name": self.names.get(slug, slug), "score": round(scores.get(slug, 0), 3)}
+                for slug in ranked[:limit]
+            ]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def build_index() -> ProfileIndex:
+    # Index every stored profile (profiles/json, or the SQLite store when enabled)
+    index = ProfileIndex()
+    from agents import sqlite_store
+    if sqlite_store.is_enabled():
+        for slug, profile in sqlite_store.all_profiles().items():
+            index.add(slug, profile)
+        return index
+
+    for path in sorted(JSON_DIR.glob("*.json")):
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                index.add(path.stem, json.load(f))
+        except Exception as e:
+            print(f"[SEARCH] Skipping {path.name}: {e}")
+    return index
+
+
+def get_index() -> ProfileIndex:
+    # Process-wide index, built on first use
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = build_index()
+        return _index
+
+
+def index_profile(slug: str, profile: dict):
+    # Called by act_save_outputs; only updates an index that is already loaded
+    if _index is not None:
+        _index.add(slug, profile)
+
+
+def search(query: str, limit: int = 10) -> list:
+    return get_index().search(query, limit)
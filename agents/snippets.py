@@ -0,0 +1,174 @@
+# Snippet Selector — picks the parts of a website worth sending to the LLM
+# - Splits cleaned text into blocks of consecutive lines
+# - Scores each block against the profile fields extract_structure asks for
+# - Penalises navigation menus, cookie banners and legal boilerplate
+# - Packs the best blocks into a character (or token) budget, in page order
+
+import math # length normalisation
+import os # budget override from the environment
+import re # keyword matching
+
+# Default prompt budget, same size as the old text[:4000] cut
+SNIPPET_BUDGET_CHARS = int(os.getenv("EDUSCOUT_SNIPPET_CHARS", "4000"))
+
+# Rough characters-per-token ratio for English web text
+CHARS_PER_TOKEN = 4
+
+# Block size we aim for when grouping lines
+BLOCK_TARGET_CHARS = 300
+
+# Keywords hinting that a block answers one of the profile fields.
+# Matched as whole words (plural -s / -es allowed); a trailing "*" marks a
+# word stem ("universit*" matches university and universities).
+FIELD_KEYWORDS = {
+    "founded": ["founded", "established", "since", "our story", "history", "launched in"],
+    "headquarters": ["headquarter*", "based in", "offices in", "located in", "hq"],
+    "summary": ["about us", "who we are", "mission", "we are", "is a", "company"],
+    "products": ["product", "platform", "solution", "app", "suite", "software", "tool"],
+    "target_market": [
+        "student", "teacher", "school", "universit*", "k-12", "k12", "higher education",
+        "educator", "institution", "enterprise", "learner", "district", "business",
+    ],
+    "technology_stack": ["api", "integration", "cloud", "lti", "aws", "open source", "sso", "mobile"],
+    "pricing_model": [
+        "pricing", "price", "plan", "free", "subscription", "per month", "per year",
+        "license", "trial", "premium", "/month", "/year", "/user",
+    ],
+    "company_size": ["employees", "team of", "people", "staff", "offices"],
+    "key_features": ["feature", "analytics", "assessment", "grading", "course", "quiz", "collaborat*"],
+    "use_cases": ["use case", "online learning", "training", "classroom", "remote", "hybrid", "onboarding"],
+    "value_proposition": ["why", "help*", "empower*", "improve*", "outcome", "easy", "trusted"],
+    "market_position": ["leader", "leading", "trusted by", "million", "#1", "award", "largest", "top"],
+    "competitors": ["vs", "versus", "compared to", "alternative", "compare"],
+}
+
+# Keywords typical of text we never want in the prompt
+BOILERPLATE_KEYWORDS = [
+    "cookie", "privacy policy", "terms of", "all rights reserved", "sign in", "log in",
+    "login", "sign up", "accept all", "subscribe to our newsletter", "skip to",
+]
+
+
+def keyword_pattern(keyword: str) -> str:
+    # Whole-word regex for one keyword (see FIELD_KEYWORDS)
+    if keyword.endswith("*"):
+        return r"(?<!\w)" + re.escape(keyword[:-1]) + r"\w*"
+    left = r"(?<!\w)" if keyword[0].isalnum() else ""
+    right = r"(?:e?s)?(?!\w)" if keyword[-1].isalpha() else (r"(?!\w)" if keyword[-1].isalnum() else "")
+    return left + re.escape(keyword) + right
+
+
+FIELD_PATTERNS = {
+    field: re.compile("|".join(keyword_pattern(k) for k in keywords))
+    for field, keywords in FIELD_KEYWORDS.items()
+}
+BOILERPLATE_PATTERN = re.compile("|".join(keyword_pattern(k) for k in BOILERPLATE_KEYWORDS))
+
+
+def split_blocks(clean_text: str) -> list:
+    # Group consecutive lines into blocks of roughly BLOCK_TARGET_CHARS.
+    # Runs of short menu-like lines are kept apart from prose, but a single
+    # short line (a heading) stays attached to the paragraph after it.
+    blocks = []
+    current = []
+    short_run = 0
+    size = 0
+
+    def flush():
+        nonlocal current, short_run, size
+        if current:
+            blocks.append("\n".join(current))
+        current, short_run, size = [], 0, 0
+
+    for line in clean_text.splitlines():
+        is_short = len(line.split()) <= 3
+        if is_short and current and not short_run:
+            flush() # prose -> menu/heading
+        elif not is_short and short_run >= 3:
+            flush() # menu -> prose
+
+        current.append(line)
+        short_run = short_run + 1 if is_short else 0
+        size += len(line) + 1
+        if size >= BLOCK_TARGET_CHARS:
+            flush()
+
+    flush()
+    return blocks
+
+
+def score_block(block: str, position: int = 0) -> float:
+    # Higher is better: many profile fields touched, little boilerplate,
+    # real sentences rather than one-word menu items
+    lowered = block.lower()
+    lines = block.splitlines() or [""]
+
+    fields_hit = 0
+    keyword_hits = 0
+    for pattern in FIELD_PATTERNS.values():
+        hits = len(pattern.findall(lowered))
+        if hits:
+            fields_hit += 1
+            keyword_hits += hits
+
+    score = 2.0 * fields_hit + math.log1p(keyword_hits)
+
+    # Years and numbers often carry founded / size / pricing facts
+    if re.search(r"\b(19|20)\d{2}\b", block):
+        score += 1.0
+
+    # Menus and button rows: many lines with one or two words each
+    words_per_line = len(block.split()) / len(lines)
+    if words_per_line < 3:
+        score -= 2.0
+
+    score -= 2.0 * len(BOILERPLATE_PATTERN.findall(lowered))
+
+    # The hero section near the top usually carries the summary
+    if position < 2:
+        score += 1.0
+
+    # Do not let long blocks win just by being long
+    return score / math.sqrt(max(len(block), 1) / BLOCK_TARGET_CHARS)
+
+
+def select_snippet(clean_text: str, budget_chars: int = None, budget_tokens: int = None) -> str:
+    # Best-scoring blocks that fit in the budget, joined in page order.
+    # Text that already fits is returned unchanged; low-value blocks are
+    # left out even when there is budget left, so prompts can only shrink.
+    if budget_tokens:
+        budget_chars = budget_tokens * CHARS_PER_TOKEN
+    budget_chars = budget_chars or SNIPPET_BUDGET_CHARS
+
+    if len(clean_text) <= budget_chars:
+        return clean_text
+
+    blocks = split_blocks(clean_text)
+    ranked = sorted(
+        range(len(blocks)),
+        key=lambda i: score_block(blocks[i], i),
+        reverse=True,
+    )
+
+    chosen = []
+    seen = set()
+    used = 0
+    for i in ranked:
+        # Leftover budget is not filled with junk, unless nothing scored well
+        if chosen and score_block(blocks[i], i) <= 0:
+            break
+        # Repeated blocks (menus in header and footer) only count once
+        if blocks[i] in seen:
+            continue
+        size = len(blocks[i]) + 1
+        if used + size > budget_chars:
+            continue
+        chosen.append(i)
+        seen.add(blocks[i])
+        used += size
+
+    # Nothing fit (one giant block): fall back to a plain cut
+    if not chosen:
+        return clean_text[:budget_chars]
+
+    return "\n".join(blocks[i] for i in sorted(chosen))
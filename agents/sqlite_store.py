@@ -0,0 +1,189 @@
+# SQLite Store — optional storage backend for profiles
+# - Enable with EDUSCOUT_STORAGE=sqlite (or python main.py --storage sqlite)
+# - Holds profiles and fetch metadata in indexed tables
+#   (change history has its own store, agents/change_history.py)
+# - WAL mode: readers never block the writer; writes can be grouped in one transaction
+# - JSON / Markdown files are only written when exported on request; the
+#   knowledge base file is never touched (it also holds records saved in
+#   file mode)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from agents.profile_generator import JSON_DIR, MD_DIR, atomic_write_text, generate_markdown
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = BASE_DIR / "eduscout.sqlite3"
+
+_enabled = os.getenv("EDUSCOUT_STORAGE", "files").lower() == "sqlite"
+_local = threading.local() # one connection per thread
+_write_lock = threading.Lock() # SQLite has a single writer anyway
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    slug TEXT PRIMARY KEY,
+    company_name TEXT,
+    category TEXT,
+    completeness REAL,
+    data TEXT NOT NULL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS profiles_category ON profiles(category);
+
+CREATE TABLE IF NOT EXISTS fetches (
+    company TEXT PRIMARY KEY,
+    url TEXT,
+    final_url TEXT,
+    status INTEGER,
+    etag TEXT,
+    last_modified TEXT,
+    from_cache INTEGER,
+    fetched_at REAL
+);
+"""
+
+
+def set_enabled(enabled: bool):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def connect() -> sqlite3.Connection:
+    # This thread's connection, created (and the schema ensured) on first use
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(str(DB_PATH), timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+        _local.depth = 0
+    return conn
+
+
+@contextmanager
+def transaction():
+    # Group many writes into one commit; nested uses join the outer transaction
+    conn = connect()
+    if _local.depth:
+        _local.depth += 1
+        try:
+            yield conn
+        finally:
+            _local.depth -= 1
+        return
+
+    with _write_lock:
+        _local.depth = 1
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            _local.depth = 0
+
+
+# ---- profiles ----
+
+def save_profiles(profiles: dict):
+    # {slug: profile} written in a single transaction
+    now = time.time()
+    rows = [
+        (
+            slug,
+            profile.get("company_name"),
+            profile.get("category"),
+            profile.get("data_completeness_score"),
+            json.dumps(profile, ensure_ascii=False),
+            now,
+        )
+        for slug, profile in profiles.items()
+    ]
+    with transaction() as conn:
+        conn.executemany("INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def save_profile(slug: str, profile: dict):
+    save_profiles({slug: profile})
+
+
+def load_profile(slug: str):
+    row = connect().execute("SELECT data FROM profiles WHERE slug = ?", (slug,)).fetchone()
+    return json.loads(row["data"]) if row else None
+
+
+def profiles_by_category(category: str) -> dict:
+    rows = connect().execute(
+        "SELECT slug, data FROM profiles WHERE category = ? ORDER BY slug", (category,)
+    ).fetchall()
+    return {row["slug"]: json.loads(row["data"]) for row in rows}
+
+
+def profile_stamps(slugs: list = None) -> dict:
+    # {slug: updated_at} as text, for change detection to spot stale hashes
+    if slugs is None:
+        rows = connect().execute("SELECT slug, updated_at FROM profiles").fetchall()
+    else:
+        marks = ",".join("?" * len(slugs))
+        rows = connect().execute(
+            f"SELECT slug, updated_at FROM profiles WHERE slug IN ({marks})", list(slugs)
+        ).fetchall()
+    return {row["slug"]: repr(row["updated_at"]) for row in rows}
+
+
+def all_profiles() -> dict:
+    rows = connect().execute("SELECT slug, data FROM profiles ORDER BY slug").fetchall()
+    return {row["slug"]: json.loads(row["data"]) for row in rows}
+
+
+# ---- fetch metadata ----
+
+def record_fetch(company: str, page):
+    # page: discovery_4.ResolvedPage. Header names are case-insensitive (HTTP/2
+    # servers send "etag"), and page.headers may be a plain dict copy
+    headers = {name.lower(): value for name, value in (page.headers or {}).items()}
+    with transaction() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO fetches VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                company,
+                page.url,
+                page.final_url,
+                page.status,
+                headers.get("etag", ""),
+                headers.get("last-modified", ""),
+                int(page.from_cache),
+                time.time(),
+            ),
+        )
+
+
+# ---- export ----
+
+def export_files(slugs: list = None, json_dir: Path = JSON_DIR, md_dir: Path = MD_DIR):
+    # Write JSON + Markdown profiles from the database (the KB file is left alone)
+    profiles = all_profiles()
+    if slugs:
+        profiles = {slug: profiles[slug] for slug in slugs if slug in profiles}
+
+    json_dir.mkdir(parents=True, exist_ok=True)
+    md_dir.mkdir(parents=True, exist_ok=True)
+    for slug, profile in profiles.items():
+        atomic_write_text(json_dir / f"{slug}.json", json.dumps(profile, ensure_ascii=False, indent=2))
+        atomic_write_text(md_dir / f"{slug}.md", generate_markdown(profile))
+
+    print(f"[STORE] Exported {len(profiles)} profiles from {DB_PATH.name}")
+    return len(profiles)
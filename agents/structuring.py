@@ -1,11 +1,22 @@
 #This is baially the decide agent 
 #Takes clean website text and turns it into a structured Python dict
-#using an LLM (OpenRouter or Gemini) or a mock fallback.
+#using an LLM (OpenRouter or Gemini). The mock answer is only used when
+#EDUSCOUT_MOCK_LLM=on (offline demos), never as a silent fallback.
 
+import io #captures the log of a batched request
 import os #lets python read environment
 import json #converts between pythn dictionaries and json text
-import requests #make http requests
+import threading #the batcher collects requests from several worker threads
+import time #batcher wait timer
+from concurrent.futures import Future #one pending result per batched request
+from agents.http_client import get_session #shared pooled session to make http requests
 from dotenv import load_dotenv # loads the evn file
+from agents import llm_cache # answers to prompts we already asked
+from agents.llm_dispatcher import LLMUnavailable, dispatch, estimate_tokens # rate limits + retries
+from agents import llm_hedging # races the other provider when the first one is slow
+from agents import model_router # cheap model first, stronger one when the answer is poor
+from agents import json_salvage # recovers JSON from fenced / chatty / cut-off answers
+from agents import json_stream # streamed answers, closed as soon as the JSON is complete
 
 #Load environment variables from .env
 load_dotenv()
@@ -13,15 +24,56 @@ load_dotenv()
 PROVIDER = os.getenv("LLM_PROVIDER", "openrouter")
 OPENROUTER_KEY = os.getenv("OPENROUTER_API_KEY")
 GEMINI_KEY = os.getenv("GEMINI_API_KEY")
+OPENROUTER_MODEL = "openai/gpt-4o-mini"
+#point at a local stand-in (benchmarks/fake_llm_provider.py) for offline tests
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+GEMINI_MODEL = "gemini-1.5-flash"
+#offline demo mode: answer every prompt with the fixed mock profile
+MOCK_LLM = os.getenv("EDUSCOUT_MOCK_LLM", "off").lower() in ("1", "on", "true", "yes")
+#hedging: send the prompt to the other provider too when the first one is slow or down
+HEDGE = os.getenv("EDUSCOUT_LLM_HEDGE", "off").lower() in ("1", "on", "true", "yes")
+#streaming: read OpenRouter answers as server-sent events and stop at the end of the JSON
+STREAM_LLM = os.getenv("EDUSCOUT_LLM_STREAM", "off").lower() in ("1", "on", "true", "yes")
+
+#batched structuring: how much page text one request may carry, and how many companies
+BATCH_TOKEN_BUDGET = int(os.getenv("EDUSCOUT_STRUCTURE_BATCH_TOKENS", "12000"))
+BATCH_MAX_ITEMS = int(os.getenv("EDUSCOUT_STRUCTURE_BATCH_ITEMS", "6"))
+CHARS_PER_TOKEN = 4
+
+#fields every profile should have, shared by the single and batched prompts
+PROFILE_FIELDS_TEXT = """- company_name
+- founded
+- headquarters
+- summary
+- products (list of strings)
+- target_market (list of strings)
+- technology_stack (object, e.g. languages, frameworks, infrastructure)
+- pricing_model
+- company_size
+- key_features (list of strings)
+- use_cases (list of strings)
+- value_proposition
+- market_position
+- competitors (list of strings)
+- metadata (object, may include sources, confidence, notes)"""
 
 #first function of callingt the open router
-def call_openrouter_llm(prompt: str) -> str:
-    #Call an LLM via OpenRouter if not working witch to mock
-    if not OPENROUTER_KEY:
-        print("warning  OPENROUTER_API_KEY missing now using mock LLM.")
+def call_openrouter_llm(prompt: str, prompt_version: str = llm_cache.PROMPT_VERSION, cancel=None,
+                        model: str = None, opener: str = "{") -> str:
+    #Call an LLM via OpenRouter; raises LLMUnavailable when no answer comes back
+    #model: overrides OPENROUTER_MODEL (the model router picks one per call)
+    #opener: how the expected JSON starts ({ profile, [ batch), for streaming
+    model = model or OPENROUTER_MODEL
+    cached = llm_cache.get("openrouter", model, prompt, prompt_version)
+    if cached is not None:
+        return cached
+
+    if MOCK_LLM:
         return call_mock_llm(prompt)
+    if not OPENROUTER_KEY:
+        raise LLMUnavailable("OPENROUTER_API_KEY missing")
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
+    url = f"{OPENROUTER_BASE_URL}/chat/completions"
     headers = {#identify to api, setting the key, tell the model the data were going to send
         "Authorization": f"Bearer {OPENROUTER_KEY}",
         "Content-Type": "application/json",
@@ -29,29 +81,56 @@ def call_openrouter_llm(prompt: str) -> str:
         "X-Title": "EduScout Agent",
     }
     payload = {
-        "model": "openai/gpt-4o-mini",
+        "model": model,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": 0,
     }
+    stream = STREAM_LLM
+    if stream:
+        payload["stream"] = True
 
-    try:#here we send post requests, and checking if succesful, prases respone aand etract the text
-        resp = requests.post(url, headers=headers, json=payload, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"]
-    except Exception as e:#if anything fails we use mock
-        print("[ERROR] OpenRouter call failed:", e)
-        return call_mock_llm(prompt)
+    #the dispatcher waits for rate limits, retries 429/5xx and raises when it gives up;
+    #a streamed body is read inside the call, so it keeps its concurrency slot
+    started = time.monotonic()
+    read = None
+    if stream:
+        read = lambda response: json_stream.read_stream(response, started, cancel, opener)
+    try:#prases respone aand etract the text
+        resp = dispatch(
+            "openrouter",
+            lambda: get_session().post(url, headers=headers, json=payload, timeout=30, stream=stream),
+            estimate_tokens(prompt),
+            cancel,
+            read,
+        )
+        if stream:
+            content, parsed = resp
+        else:
+            data = resp.json()
+            content = data["choices"][0]["message"]["content"]
+            parsed = True
+    except LLMUnavailable:
+        raise #cancelled mid-stream (another provider won the race) or cut off: never cached
+    except Exception as e:
+        raise LLMUnavailable(f"openrouter: unexpected response ({e})")
+    if parsed: #a streamed answer that never parsed is salvaged, not kept
+        llm_cache.put("openrouter", model, prompt, content, prompt_version)
+    return content
 
 #Now for gemini same thing 
-def call_gemini_llm(prompt: str) -> str:
-    if not GEMINI_KEY:
-        print("waring GEMINI_API_KEY missing now using mock LLM.")
+def call_gemini_llm(prompt: str, prompt_version: str = llm_cache.PROMPT_VERSION, cancel=None) -> str:
+    cached = llm_cache.get("gemini", GEMINI_MODEL, prompt, prompt_version)
+    if cached is not None:
+        return cached
+
+    if MOCK_LLM:
         return call_mock_llm(prompt)
+    if not GEMINI_KEY:
+        raise LLMUnavailable("GEMINI_API_KEY missing")
 
     url = (
         "https://generativelanguage.googleapis.com/"
-        "v1beta/models/gemini-1.5-flash:generateContent"
+        f"v1beta/models/{GEMINI_MODEL}:generateContent"
     )
     #gemini uss key url not parameter
     headers = {"Content-Type": "application/json"}
@@ -61,28 +140,29 @@ def call_gemini_llm(prompt: str) -> str:
         "generationConfig": {"temperature": 0.0},
     }
 
+    resp = dispatch(
+        "gemini",
+        lambda: get_session().post(url, headers=headers, params=params, json=payload, timeout=30),
+        estimate_tokens(prompt),
+        cancel,
+    )
     try:
-        resp = requests.post(
-            url, headers=headers, params=params, json=payload, timeout=30
-        )
-        resp.raise_for_status()
         data = resp.json()
-        candidates = data.get("candidates", [])
-        if not candidates:
-            print("[WARN] Gemini returned no candidates → using mock.")
-            return call_mock_llm(prompt)
-        parts = candidates[0].get("content", {}).get("parts", [])
-        if not parts:
-            print("warning Gemini candidates have no parts now using mock.")
-            return call_mock_llm(prompt)
-        return parts[0].get("text", "")
     except Exception as e:
-        print("error Gemini API call failed:", e)
-        return call_mock_llm(prompt)
+        raise LLMUnavailable(f"gemini: unexpected response ({e})")
+    candidates = data.get("candidates", [])
+    if not candidates:
+        raise LLMUnavailable("gemini: no candidates")
+    parts = candidates[0].get("content", {}).get("parts", [])
+    if not parts:
+        raise LLMUnavailable("gemini: candidate has no parts")
+    text = parts[0].get("text", "")
+    llm_cache.put("gemini", GEMINI_MODEL, prompt, text, prompt_version)
+    return text
 
 #now for mock
 def call_mock_llm(prompt: str) -> str:
-    #Offline fallback return a fixed JSON example as text
+    #Offline demo answer: a fixed JSON example as text (EDUSCOUT_MOCK_LLM=on)
     print("Using mock LLM output.")
     sample_output = {
         "company_name": "Canvas LMS",
@@ -121,10 +201,72 @@ def call_mock_llm(prompt: str) -> str:
     }
     return json.dumps(sample_output, indent=2)
 
-#deciding agent now
-def extract_structure(clean_text: str, detail_level: str = "standard") -> dict:
-    #Turn clean website text into a structured company profile dict.
-    prompt = f"""
+def set_hedging(enabled: bool):
+    global HEDGE
+    HEDGE = enabled
+
+def set_llm_streaming(enabled: bool):
+    global STREAM_LLM
+    STREAM_LLM = enabled
+
+
+def is_json(text: str) -> bool:
+    #JSON we can use, possibly after salvage (fences, prose, trailing commas...)
+    return json_salvage.salvage_json(text)[0] is not None
+
+
+#send a prompt to whichever provider is configured
+def call_llm(prompt: str, accept=None, opener: str = "{"):
+    #Returns (answer, (provider, model) that gave it): with the cascade or
+    #hedging that is not always the configured model, and cache keys need it.
+    #accept: which answers the model cascade keeps (default: valid JSON); a
+    #rejected one goes to a stronger model. A hedge race only needs JSON it can
+    #parse: a sparse but valid profile is still an answer, not a failure.
+    #The cascade and hedging do not combine (main.py rejects both flags together);
+    #if both are switched on through the environment, the cascade wins.
+    if model_router.is_enabled() and PROVIDER != "gemini" and not MOCK_LLM:
+        text, model = model_router.route(
+            "structuring", prompt,
+            lambda model: call_openrouter_llm(prompt, model=model, opener=opener),
+            accept or is_json,
+        )
+        return text, ("openrouter", model)
+    if HEDGE and not MOCK_LLM:
+        return call_llm_hedged(prompt, opener=opener)
+    if PROVIDER == "gemini":
+        return call_gemini_llm(prompt), ("gemini", GEMINI_MODEL)
+    return call_openrouter_llm(prompt, opener=opener), ("openrouter", OPENROUTER_MODEL)
+
+
+def call_llm_hedged(prompt: str, accept=is_json, opener: str = "{"):
+    #configured provider first, the other one if it is slower than its p95 or fails
+    callers = {
+        "openrouter": lambda cancel: call_openrouter_llm(prompt, cancel=cancel, opener=opener),
+        "gemini": lambda cancel: call_gemini_llm(prompt, cancel=cancel),
+    }
+    keys = {"openrouter": OPENROUTER_KEY, "gemini": GEMINI_KEY}
+    primary = "gemini" if PROVIDER == "gemini" else "openrouter"
+    order = [primary] + [p for p in callers if p != primary]
+    #a provider we have no key for cannot win; only keep it if nothing else is left
+    order = [p for p in order if keys[p]] or order
+    text, provider = llm_hedging.race([(p, callers[p]) for p in order], accept)
+    return text, (provider, GEMINI_MODEL if provider == "gemini" else OPENROUTER_MODEL)
+
+
+def answer_sources(prompt: str) -> list:
+    #(provider, model) pairs call_llm may have answered this prompt with, so
+    #where a cached answer can be; the strongest cascade model comes first
+    if model_router.is_enabled() and PROVIDER != "gemini" and not MOCK_LLM:
+        return [("openrouter", m) for m in reversed(model_router.models_for("structuring", prompt))]
+    primary = ("gemini", GEMINI_MODEL) if PROVIDER == "gemini" else ("openrouter", OPENROUTER_MODEL)
+    if HEDGE and not MOCK_LLM:
+        backup = ("openrouter", OPENROUTER_MODEL) if PROVIDER == "gemini" else ("gemini", GEMINI_MODEL)
+        return [primary, backup]
+    return [primary]
+
+
+def build_structure_prompt(clean_text: str, detail_level: str = "standard") -> str:
+    return f"""
 You are an expert market-research assistant.
 
 You receive raw text from the website of an EdTech or LMS company.
@@ -133,21 +275,7 @@ From this text, extract a structured JSON object describing the company.
 Always return ONLY valid JSON, no explanations, no markdown.
 
 Desired JSON fields:
-- company_name
-- founded
-- headquarters
-- summary
-- products (list of strings)
-- target_market (list of strings)
-- technology_stack (object, e.g. languages, frameworks, infrastructure)
-- pricing_model
-- company_size
-- key_features (list of strings)
-- use_cases (list of strings)
-- value_proposition
-- market_position
-- competitors (list of strings)
-- metadata (object, may include sources, confidence, notes)
+{PROFILE_FIELDS_TEXT}
 
 Detail level: {detail_level}
 
@@ -159,13 +287,275 @@ Here is the raw text:
 Return ONLY valid JSON. No extra text.
 """
 
-    if PROVIDER == "gemini":
-        response_text = call_gemini_llm(prompt)
-    else:
-        response_text = call_openrouter_llm(prompt)
+def is_good_profile(text: str) -> bool:
+    #salvageable profile that fills enough of the profile fields
+    profile, _ = json_salvage.salvage_profile(text)
+    return profile is not None and _complete_enough(profile)
+
+
+def _complete_enough(profile: dict) -> bool:
+    from agents.profile_generator import calculate_completeness
+    return calculate_completeness(profile) >= model_router.MIN_COMPLETENESS
+
+
+def build_repair_prompt(broken_text: str) -> str:
+    #much shorter than asking again: only the broken answer goes back
+    return f"""
+The text below was meant to be a single JSON object describing a company,
+but it is not valid JSON.
+
+Fix the JSON syntax only. Keep every field and value that is there, do not
+invent new information. Return ONLY the corrected JSON object, no markdown.
+
+--------------------------------
+{broken_text[:8000]}
+--------------------------------
+"""
+
 
+#deciding agent now
+def extract_structure(clean_text: str, detail_level: str = "standard") -> dict:
+    #Turn clean website text into a structured company profile dict.
+    prompt = build_structure_prompt(clean_text, detail_level)
     try:
-        return json.loads(response_text)
-    except Exception:
-        print("warning Could not parse JSON from LLM. Returning raw response.")
+        response_text, _ = call_llm(prompt, accept=is_good_profile)
+    except LLMUnavailable as e:
+        #no profile rather than a made-up one; callers skip error records
+        print(f"[ERROR] LLM unavailable: {e}")
+        return {"error": "llm_unavailable", "detail": str(e)}
+
+    profile, how = json_salvage.salvage_profile(response_text)
+    if profile is not None:
+        json_salvage.record(how)
+        if how == "salvaged":
+            print("[DECIDE] Recovered the JSON from an imperfect answer")
+        return profile
+    if json_salvage.salvage_json(response_text)[0] is not None:
+        #valid JSON but not an object (a list, string or number): a syntax repair won't help
+        json_salvage.record("failed")
+        print("warning LLM answer is not a JSON object. Returning raw response.")
         return {"error": "invalid_json", "raw_response": response_text}
+
+    #parsing failed: one targeted repair request instead of giving up on a paid answer
+    print("warning Could not parse JSON from LLM. Asking it to repair the answer.")
+    json_salvage.record("repair_prompts")
+    try:
+        repaired_text, _ = call_llm(
+            build_repair_prompt(response_text),
+            accept=lambda text: json_salvage.salvage_profile(text)[0] is not None,
+        )
+    except LLMUnavailable as e:
+        print(f"[ERROR] LLM unavailable: {e}")
+        repaired_text = ""
+    profile, _ = json_salvage.salvage_profile(repaired_text)
+    if profile is not None:
+        json_salvage.record("repaired")
+        return profile
+
+    json_salvage.record("failed")
+    print("warning Could not parse JSON from LLM. Returning raw response.")
+    return {"error": "invalid_json", "raw_response": response_text}
+
+
+#batched version: several companies in one request
+def build_batch_prompt(texts: list, detail_level: str = "standard") -> str:
+    blocks = "\n\n".join(
+        f"=== COMPANY {i} ===\n{text}\n=== END COMPANY {i} ==="
+        for i, text in enumerate(texts, start=1)
+    )
+    return f"""
+You are an expert market-research assistant.
+
+You receive raw text from the websites of {len(texts)} EdTech or LMS companies.
+For EACH company, extract a structured JSON object describing it.
+
+Always return ONLY a valid JSON array, no explanations, no markdown.
+The array has one object per company. Each object has a field "company_index"
+with the number of the company block it describes, plus these fields:
+{PROFILE_FIELDS_TEXT}
+
+Detail level: {detail_level}
+
+Here is the raw text:
+--------------------------------
+{blocks}
+--------------------------------
+
+Return ONLY the JSON array. No extra text.
+"""
+
+
+def parse_batch_response(response_text: str) -> dict:
+    #company_index -> profile dict, skipping anything unreadable
+    data, _ = json_salvage.salvage_json(response_text, "[")
+    if data is None:
+        data = []
+
+    if isinstance(data, dict):
+        #some models wrap the array, e.g. {"profiles": [...]}
+        data = next((v for v in data.values() if isinstance(v, list)), [])
+
+    profiles = {}
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.pop("company_index"))
+        except Exception:
+            continue
+        profile = json_salvage.validate_profile(item)
+        if profile is not None:
+            profiles[index] = profile
+    return profiles
+
+
+def extract_structure_batch(items: dict, detail_level: str = "standard") -> dict:
+    #items: key -> clean text. Returns key -> profile dict.
+    #Companies already answered singly come from the cache; the rest are
+    #packed into as few requests as the token budget allows. Entries the
+    #batched answer misses or garbles are retried one by one.
+    results = {}
+    todo = []
+    for key, text in items.items():
+        prompt = build_structure_prompt(text, detail_level)
+        for provider, model in answer_sources(prompt):
+            cached = llm_cache.get(provider, model, prompt)
+            profile = json_salvage.salvage_profile(cached)[0] if cached is not None else None
+            if profile is not None:
+                results[key] = profile
+                break
+        else:
+            todo.append(key)
+
+    #group by token budget (at least one company per group)
+    groups, current, used = [], [], 0
+    for key in todo:
+        tokens = len(items[key]) // CHARS_PER_TOKEN + 1
+        if current and (used + tokens > BATCH_TOKEN_BUDGET or len(current) >= BATCH_MAX_ITEMS):
+            groups.append(current)
+            current, used = [], 0
+        current.append(key)
+        used += tokens
+    if current:
+        groups.append(current)
+
+    for group in groups:
+        if len(group) == 1:
+            results[group[0]] = extract_structure(items[group[0]], detail_level)
+            continue
+
+        print(f"[DECIDE] Structuring {len(group)} companies in one request")
+        try:
+            response_text, (provider, model) = call_llm(
+                build_batch_prompt([items[k] for k in group], detail_level), opener="["
+            )
+        except LLMUnavailable as e:
+            print(f"[ERROR] LLM unavailable: {e}")
+            for key in group:
+                results[key] = {"error": "llm_unavailable", "detail": str(e)}
+            continue
+        profiles = parse_batch_response(response_text)
+
+        for i, key in enumerate(group, start=1):
+            profile = profiles.get(i)
+            if profile is None:
+                print(f"warning Batched answer missing company {i}, retrying it alone.")
+                results[key] = extract_structure(items[key], detail_level)
+                continue
+            if model_router.is_enabled() and not _complete_enough(profile):
+                #the batched answer may come from the cheap model: escalate this one alone
+                print(f"[ROUTER] Batched profile for company {i} too sparse, asking again alone.")
+                results[key] = extract_structure(items[key], detail_level)
+                continue
+            results[key] = profile
+            #remember it as if asked singly (under the model that actually answered),
+            #so later runs hit the cache either way
+            llm_cache.put(
+                provider, model,
+                build_structure_prompt(items[key], detail_level),
+                json.dumps(profile, ensure_ascii=False),
+            )
+
+    return results
+
+
+class StructuringBatcher:
+    #Collects extract_structure requests from pipeline threads and sends them
+    #in groups through extract_structure_batch. A group goes out when it is
+    #full (items or token budget) or max_wait seconds after its first request.
+    #Futures resolve to (profile, log). router: optional ThreadLocalStdout; the
+    #log of a batched request is then captured and handed to the first company
+    #of the group, so it prints with that company instead of out of order.
+    def __init__(self, max_items: int = BATCH_MAX_ITEMS, max_wait: float = 2.0,
+                 gate=None, detail_level: str = "standard", router=None):
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self.gate = gate
+        self.detail_level = detail_level
+        self.router = router
+        self.cond = threading.Condition()
+        self.pending = [] #(text, future)
+        self.first_at = 0.0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, clean_text: str) -> Future:
+        future = Future()
+        with self.cond:
+            if not self.pending:
+                self.first_at = time.monotonic()
+            self.pending.append((clean_text, future))
+            self.cond.notify()
+        return future
+
+    def _full(self) -> bool:
+        tokens = sum(len(text) // CHARS_PER_TOKEN + 1 for text, _ in self.pending)
+        return len(self.pending) >= self.max_items or tokens >= BATCH_TOKEN_BUDGET
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending or not (self.closed or self._full()):
+                    if self.closed and not self.pending:
+                        return
+                    if self.pending:
+                        left = self.max_wait - (time.monotonic() - self.first_at)
+                        if left <= 0:
+                            break
+                        self.cond.wait(left)
+                    else:
+                        self.cond.wait()
+                batch = self.pending[:self.max_items]
+                self.pending = self.pending[self.max_items:]
+                self.first_at = time.monotonic()
+            threading.Thread(target=self._send, args=(batch,), daemon=True).start()
+
+    def _send(self, batch):
+        buffer = io.StringIO()
+        if self.router is not None:
+            self.router.capture(buffer)
+        try:
+            items = {str(i): text for i, (text, _) in enumerate(batch)}
+            if self.gate is not None:
+                with self.gate:
+                    results = extract_structure_batch(items, self.detail_level)
+            else:
+                results = extract_structure_batch(items, self.detail_level)
+            if self.router is not None:
+                self.router.release()
+            for i, (_, future) in enumerate(batch):
+                future.set_result((results[str(i)], buffer.getvalue() if i == 0 else ""))
+        except Exception as e:
+            if self.router is not None:
+                self.router.release()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def close(self):
+        #send whatever is still waiting and stop the collector thread
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
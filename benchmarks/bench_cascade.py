@@ -0,0 +1,53 @@
+# Benchmark — model cascade vs always using the strong structuring model
+# Runs extract_structure over synthetic pages against the local fake provider
+# (benchmarks/fake_llm_provider.py) and reports average latency per profile,
+# average completeness and the escalation rate of each model. Runs offline.
+#
+# Usage: python benchmarks/bench_cascade.py [pages]
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[0]))
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from fake_llm_provider import start_server
+
+server = start_server()
+os.environ["OPENROUTER_BASE_URL"] = server.base_url
+os.environ["OPENROUTER_API_KEY"] = "fake-key"
+os.environ["LLM_PROVIDER"] = "openrouter"
+os.environ["EDUSCOUT_LLM_CACHE"] = "off"
+
+from agents import model_router
+from agents.profile_generator import calculate_completeness
+from agents.structuring import extract_structure
+
+
+def page(i: int) -> str:
+    return f"Company {i}\nWe build learning software for schools and universities.\nPlans from $5 per month."
+
+
+def run(pages: int, cascade: bool):
+    model_router.set_enabled(cascade)
+    started = time.perf_counter()
+    scores = [calculate_completeness(extract_structure(page(i))) for i in range(pages)]
+    elapsed = time.perf_counter() - started
+    return elapsed / pages, sum(scores) / pages
+
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+
+    strong_latency, strong_quality = run(pages, cascade=False)
+    cascade_latency, cascade_quality = run(pages, cascade=True)
+
+    print(f"pages: {pages}")
+    print(f"strong model only : {strong_latency * 1000:7.1f} ms/profile, completeness {strong_quality:.2f}")
+    print(f"cascade           : {cascade_latency * 1000:7.1f} ms/profile, completeness {cascade_quality:.2f}")
+    for model, counters in model_router.stats().items():
+        print(
+            f"  {model:40s} {counters['calls']:4d} calls  "
+            f"{100 * counters['escalation_rate']:5.1f}% escalated  avg {counters['avg_seconds'] * 1000:6.1f} ms"
+        )
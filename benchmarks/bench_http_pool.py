@@ -0,0 +1,107 @@
+# Benchmark — connections (TCP/TLS handshakes) opened per company
+# Compares bare requests.get/post/head calls with the shared pooled session
+# from agents/http_client.py, using two local servers as stand-ins for
+# openrouter.ai and a company website. Runs fully offline.
+#
+# Usage: python benchmarks/bench_http_pool.py [companies]
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from agents.http_client import build_session
+
+
+class CountingServer(ThreadingHTTPServer):
+    # Counts every accepted TCP connection (each one is a handshake in real life)
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def verify_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        return True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, like real servers
+    disable_nagle_algorithm = True
+
+    def _reply(self, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(b"<html><body><p>Homepage</p></body></html>")
+
+    def do_HEAD(self):
+        self._reply(b"")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self._reply(b'{"choices": [{"message": {"content": "https://example.com"}}]}')
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server() -> CountingServer:
+    server = CountingServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def one_company(client, llm_url: str, site_url: str):
+    # Same request pattern as test_pipeline: 2 discovery prompts, HEAD + GET
+    # validation, homepage fetch, one structuring call
+    client.post(llm_url, json={"prompt": "website?"}, timeout=5)
+    client.post(llm_url, json={"prompt": "homepage?"}, timeout=5)
+    client.head(site_url, timeout=5)
+    client.get(site_url, timeout=5)
+    client.get(site_url, timeout=5)
+    client.post(llm_url, json={"prompt": "structure"}, timeout=5)
+
+
+def run(label: str, client, companies: int):
+    llm, site = start_server(), start_server()
+    llm_url = f"http://127.0.0.1:{llm.server_address[1]}/api/v1/chat/completions"
+    site_url = f"http://127.0.0.1:{site.server_address[1]}/"
+
+    start = time.perf_counter()
+    for _ in range(companies):
+        one_company(client, llm_url, site_url)
+    elapsed = time.perf_counter() - start
+
+    total = llm.connections + site.connections
+    print(
+        f"{label:<16} connections={total:<5} per company={total / companies:.2f}  "
+        f"time={elapsed * 1000:.0f} ms"
+    )
+    llm.shutdown()
+    site.shutdown()
+    return total
+
+
+if __name__ == "__main__":
+    companies = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"[BENCH] {companies} companies, 6 requests each\n")
+    bare = run("bare requests", requests, companies)
+    session = build_session()
+    pooled = run("pooled session", session, companies)
+    session.close()
+    saved = (bare - pooled) / companies
+    print(f"\n[BENCH] Handshakes saved per company: {saved:.2f}")
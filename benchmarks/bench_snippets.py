@@ -0,0 +1,141 @@
+# Benchmark — text[:4000] truncation vs relevance-ranked snippets
+# Uses the homepages already stored in the HTML cache (cache/html) by earlier
+# batch runs. Reports prompt size and how many reference facts each snippet
+# keeps. The reference is independent of the selector's keywords: the values
+# (founded, headquarters, products, competitors, ...) of a profile built from
+# the full page text that literally appear in that text. Offline the stored
+# profile of the company is the reference; with --llm the full text is
+# structured again and both snippets are structured too, comparing
+# calculate_completeness scores (this makes real, paid LLM calls).
+#
+# Usage: python benchmarks/bench_snippets.py [--llm] [--budget 4000]
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from agents import html_cache, resolution_cache
+from agents.discovery_4 import extract_text_from_html
+from agents.snippets import select_snippet
+
+# Profile fields whose values are usually copied from the page, not paraphrased
+FACT_FIELDS = [
+    "founded", "headquarters", "pricing_model", "company_size",
+    "products", "target_market", "key_features", "use_cases", "competitors",
+]
+
+
+def words(text: str) -> set:
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def profile_facts(profile: dict) -> list:
+    # Word sets of every short value in FACT_FIELDS
+    facts = []
+    for field in FACT_FIELDS:
+        value = profile.get(field)
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, str) and 0 < len(item) <= 80:
+                facts.append(words(item))
+    return [fact for fact in facts if fact]
+
+
+def facts_kept(facts: list, text: str) -> int:
+    # Facts whose words all appear in the text
+    present = words(text)
+    return sum(1 for fact in facts if fact <= present)
+
+
+def stored_profile(url: str):
+    # Profile saved for the company that resolved to this URL, if any
+    from updater import FINGERPRINTS_PATH, load_existing_profile
+    from agents.profile_generator import slugify
+    try:
+        fingerprints = json.loads(FINGERPRINTS_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        fingerprints = {}
+    for key, entry in resolution_cache._load_entries().items():
+        if url not in (entry.get("url"), entry.get("final_url")):
+            continue
+        slug = (fingerprints.get(key) or {}).get("slug") or slugify(entry.get("company_name", key))
+        profile = load_existing_profile(slug)
+        if profile:
+            return profile
+    return None
+
+
+def cached_pages():
+    # (url, html) for every distinct body in the HTML cache
+    try:
+        index = json.loads(html_cache.INDEX_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return []
+    pages, seen = [], set()
+    for url, entry in index.items():
+        if entry["sha"] in seen:
+            continue
+        seen.add(entry["sha"])
+        path = html_cache.OBJECTS_DIR / f"{entry['sha']}.html"
+        if path.exists():
+            pages.append((url, path.read_text(encoding="utf-8", errors="replace")))
+    return pages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm", action="store_true", help="also compare completeness via the LLM")
+    parser.add_argument("--budget", type=int, default=4000)
+    args = parser.parse_args()
+
+    pages = cached_pages()
+    if not pages:
+        print("[BENCH] HTML cache is empty, run a batch first (python main.py).")
+        sys.exit(0)
+
+    totals = {"cut_chars": 0, "sel_chars": 0, "facts": 0, "cut_facts": 0, "sel_facts": 0,
+              "no_reference": 0, "cut_score": 0.0, "sel_score": 0.0}
+    for url, html in pages:
+        text = extract_text_from_html(html)
+        cut = text[:args.budget]
+        selected = select_snippet(text, args.budget)
+        totals["cut_chars"] += len(cut)
+        totals["sel_chars"] += len(selected)
+        line = f"{url[:50]:<50}"
+
+        if args.llm:
+            from agents.structuring import extract_structure
+            reference = extract_structure(text)
+        else:
+            reference = stored_profile(url)
+        if isinstance(reference, dict) and "error" not in reference:
+            # Only facts the full page really contains can be kept or lost
+            facts = [fact for fact in profile_facts(reference) if fact <= words(text)]
+            cut_kept, sel_kept = facts_kept(facts, cut), facts_kept(facts, selected)
+            totals["facts"] += len(facts)
+            totals["cut_facts"] += cut_kept
+            totals["sel_facts"] += sel_kept
+            line += f" facts {cut_kept:>2} -> {sel_kept:>2} of {len(facts):>2}"
+        else:
+            totals["no_reference"] += 1
+            line += " no reference profile"
+
+        if args.llm:
+            from agents.profile_generator import calculate_completeness
+            cut_score = calculate_completeness(extract_structure(cut))
+            sel_score = calculate_completeness(extract_structure(selected))
+            totals["cut_score"] += cut_score
+            totals["sel_score"] += sel_score
+            line += f"  completeness {cut_score:.2f} -> {sel_score:.2f}"
+        print(line)
+
+    n = len(pages)
+    facts = totals["facts"] or 1
+    print(f"\n[BENCH] {n} pages ({totals['no_reference']} without a reference profile)")
+    print(f"[BENCH] avg prompt chars  {totals['cut_chars'] / n:.0f} -> {totals['sel_chars'] / n:.0f}")
+    print(f"[BENCH] reference facts   {100 * totals['cut_facts'] / facts:.0f}% -> "
+          f"{100 * totals['sel_facts'] / facts:.0f}% kept ({totals['facts']} facts)")
+    if args.llm:
+        print(f"[BENCH] avg completeness  {totals['cut_score'] / n:.2f} -> {totals['sel_score'] / n:.2f}")
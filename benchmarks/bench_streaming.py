@@ -0,0 +1,62 @@
+# Benchmark — streamed vs buffered structuring answers
+# Runs extract_structure over synthetic pages against the local fake provider
+# (benchmarks/fake_llm_provider.py), which generates answers at a fixed token
+# rate and adds a closing remark after the JSON. Reports latency per profile
+# and, for streaming, the average time to the first complete field. Runs offline.
+#
+# Usage: python benchmarks/bench_streaming.py [pages]
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[0]))
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from fake_llm_provider import start_server
+
+CHATTER = (
+    "\n\nI extracted these fields from the website text. Some values, such as the"
+    " company size and market position, are estimates; let me know if you want"
+    " me to double-check them or add more detail on pricing."
+)
+
+server = start_server()
+server.token_seconds = 0.01
+server.chatter = CHATTER
+os.environ["OPENROUTER_BASE_URL"] = server.base_url
+os.environ["OPENROUTER_API_KEY"] = "fake-key"
+os.environ["LLM_PROVIDER"] = "openrouter"
+os.environ["EDUSCOUT_LLM_CACHE"] = "off"
+
+from agents import json_stream
+from agents.profile_generator import calculate_completeness
+from agents.structuring import extract_structure, set_llm_streaming
+
+
+def page(i: int) -> str:
+    return f"Company {i}\nWe build learning software for schools and universities.\nPlans from $5 per month."
+
+
+def run(pages: int, stream: bool):
+    set_llm_streaming(stream)
+    started = time.perf_counter()
+    scores = [calculate_completeness(extract_structure(page(i))) for i in range(pages)]
+    elapsed = time.perf_counter() - started
+    return elapsed / pages, sum(scores) / pages
+
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    buffered_latency, buffered_quality = run(pages, stream=False)
+    streamed_latency, streamed_quality = run(pages, stream=True)
+    streaming = json_stream.stats()
+
+    print(f"pages: {pages}")
+    print(f"buffered : {buffered_latency * 1000:7.1f} ms/profile, completeness {buffered_quality:.2f}")
+    print(f"streamed : {streamed_latency * 1000:7.1f} ms/profile, completeness {streamed_quality:.2f}")
+    print(
+        f"  first field after {streaming['avg_first_field_seconds'] * 1000:.1f} ms, "
+        f"{streaming['completed']}/{streaming['streams']} streams closed at the end of the JSON"
+    )
@@ -0,0 +1,173 @@
+# Fake LLM provider — a local stand-in for the OpenRouter chat completions API
+# Answers POST /chat/completions like OpenRouter does, so the pipeline can be
+# exercised offline (set OPENROUTER_BASE_URL=http://127.0.0.1:<port>).
+#
+# Model behaviour:
+# - names containing "lite", "nano" or "mini-cheap" are fast but weak: for
+#   about HARD_SHARE of the pages (chosen from a hash of the prompt, so runs
+#   repeat) they return a sparse profile or broken JSON
+# - every other model is slower and always returns a full profile
+# - discovery prompts ("website" in the prompt) get a URL back
+# - "stream": true requests are answered with server-sent events, one
+#   CHUNK_CHARS piece of the content per event, like OpenRouter streaming
+# - token_seconds (per CHUNK_CHARS piece) and chatter (text after the JSON)
+#   are off by default; the streaming benchmark turns them on
+#
+# Usage: python benchmarks/fake_llm_provider.py [port]
+
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHEAP_MARKERS = ("lite", "nano", "mini-cheap")
+CHEAP_LATENCY = 0.15
+STRONG_LATENCY = 0.6
+HARD_SHARE = 0.3
+CHUNK_CHARS = 16
+
+
+def is_cheap(model: str) -> bool:
+    return any(marker in model for marker in CHEAP_MARKERS)
+
+
+def company_from_prompt(prompt: str) -> str:
+    # First non-empty line of the page text between the dashed rulers
+    match = re.search(r"-{10,}\n(.*?)\n", prompt)
+    name = match.group(1).strip() if match else ""
+    return name[:60] or "Example Learning"
+
+
+def full_profile(name: str) -> dict:
+    return {
+        "company_name": name,
+        "founded": "2015",
+        "headquarters": "Berlin, Germany",
+        "summary": f"{name} builds a learning platform for schools.",
+        "products": [f"{name} LMS", f"{name} Analytics"],
+        "target_market": ["K-12", "Higher Education"],
+        "technology_stack": {"languages": ["Python"], "frameworks": ["Django"], "infrastructure": ["AWS"]},
+        "pricing_model": "Subscription",
+        "company_size": "50-200 employees",
+        "key_features": ["Course authoring", "Assessments"],
+        "use_cases": ["Blended learning"],
+        "value_proposition": "Simple course delivery",
+        "market_position": "Challenger",
+        "competitors": ["Moodle", "Canvas"],
+        "metadata": {"sources": "fake provider", "confidence": "high"},
+    }
+
+
+def answer(model: str, prompt: str) -> str:
+    if "website" in prompt.lower() and "JSON fields" not in prompt:
+        slug = re.sub(r"\W+", "", company_from_prompt(prompt).lower()) or "example"
+        return f"https://www.{slug}.com"
+
+    name = company_from_prompt(prompt)
+    profile = full_profile(name)
+    if not is_cheap(model):
+        return json.dumps(profile)
+
+    bucket = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+    if bucket < HARD_SHARE / 2:
+        return json.dumps(profile)[:-20] # cut off mid-object
+    if bucket < HARD_SHARE:
+        return json.dumps({"company_name": name, "summary": profile["summary"]})
+    return json.dumps(profile)
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        model = request.get("model", "")
+        prompt = (request.get("messages") or [{}])[-1].get("content", "")
+
+        time.sleep(CHEAP_LATENCY if is_cheap(model) else STRONG_LATENCY)
+        self.server.count(model)
+        content = answer(model, prompt) + self.server.chatter
+        pieces = [content[i:i + CHUNK_CHARS] for i in range(0, len(content), CHUNK_CHARS)]
+        if request.get("stream"):
+            self.stream(model, pieces)
+            return
+
+        time.sleep(self.server.token_seconds * len(pieces)) # the whole answer is generated first
+        body = json.dumps({
+            "model": model,
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream(self, model: str, pieces: list):
+        # Chunked transfer, one SSE event per chunk; stops quietly when the
+        # client closes the connection early
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+        events = [
+            {"model": model, "choices": [{"delta": {"content": piece}}]} for piece in pieces
+        ]
+        try:
+            for event in events:
+                time.sleep(self.server.token_seconds)
+                self.write_chunk(f"data: {json.dumps(event)}\n\n")
+            self.write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0):
+        super().__init__(("127.0.0.1", port), FakeProviderHandler)
+        self.requests = {} # model -> requests served
+        self.token_seconds = 0.0 # generation time per CHUNK_CHARS of content
+        self.chatter = "" # appended after the JSON, like a talkative model
+        self.lock = threading.Lock()
+
+    def count(self, model: str):
+        with self.lock:
+            self.requests[model] = self.requests.get(model, 0) + 1
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+def start_server(port: int = 0) -> FakeProviderServer:
+    # Serve on a background thread; returns the server (see .base_url)
+    server = FakeProviderServer(port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    server = FakeProviderServer(int(sys.argv[1]) if len(sys.argv) > 1 else 8099)
+    print(f"Fake LLM provider on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
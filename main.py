@@ -1,17 +1,37 @@
+import argparse
+import io
 import json
 import os
+import sys
+import threading
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 print(">>> OPENROUTER KEY:", os.getenv("OPENROUTER_API_KEY"))
 
-from agents.discovery_4 import (
-    discover_company_website,
-    fetch_website,
-    extract_text_from_html,
-)
+from agents.discovery_4 import discover_company_page, discover_websites_batch, set_streaming
+from agents.output_sink import OutputSink
+from agents.run_journal import RunJournal
 
-from agents.structuring import extract_structure
-from agents.profile_generator import act_save_outputs
+from agents import (
+    change_history, json_salvage, json_stream, knowledge_base, llm_cache, llm_dispatcher, llm_hedging,
+    model_router, search, sqlite_store,
+)
+from agents.snippets import select_snippet
+from agents.structuring import BATCH_MAX_ITEMS, StructuringBatcher, extract_structure, set_hedging, set_llm_streaming
+from agents.profile_generator import act_save_outputs, slugify
+from updater import detect_corpus_changes, is_real_profile, save_fingerprint, scheduled_update, text_fingerprint
 from utils import load_companies_from_file
 
+# Concurrency limits for the batch engine (overridable from the command line)
+DEFAULT_WORKERS = 8            # companies in flight at the same time
+DEFAULT_LLM_CONCURRENCY = 4    # simultaneous LLM calls (discovery + structuring)
+DEFAULT_FETCH_CONCURRENCY = 8  # simultaneous website downloads
+DEFAULT_WRITE_CONCURRENCY = 1  # simultaneous JSON/Markdown/KB writers
+DEFAULT_DISCOVERY_BATCH = 20   # companies per batched website-discovery prompt (0 = off)
+DEFAULT_STRUCTURE_BATCH = 0    # companies per batched structuring request (0 = one each)
+
 # Helper Pretty printing dividers
 
 def print_section(title: str):
@@ -19,58 +39,518 @@ def print_section(title: str):
     print(f"{title}")
     print("=" * 70 + "\n")
 
+# Helper, returns the semaphore guarding a stage (or a no-op when running sequentially)
+def stage_slot(limits, stage: str):
+    if not limits or stage not in limits:
+        return nullcontext()
+    return limits[stage]
+
+# Helper, opens the checkpoint journal for a batch run and reports what a resume skips
+def open_journal(path: str, resume: bool) -> RunJournal:
+    journal = RunJournal(path, resume=resume)
+    if resume:
+        counts = journal.summary()
+        print(
+            f"[RESUME] {journal.path.name}: {counts['saved']} saved, "
+            f"{counts['partial']} part-way, {counts['failed']} failed\n"
+        )
+    return journal
+
+# Helper, this run's LLM cache and provider dispatch counters
+def print_llm_cache_stats():
+    if not llm_cache.is_enabled():
+        print("[CACHE] LLM response cache disabled.")
+    else:
+        stats = llm_cache.stats()
+        print(
+            f"[CACHE] LLM responses: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['stores']} stored, {stats['evictions']} evicted"
+        )
+    for provider, counters in llm_dispatcher.stats().items():
+        print(
+            f"[LLM] {provider}: {counters['succeeded']}/{counters['calls']} calls ok, "
+            f"{counters['throttled']} throttled, {counters['retries']} retries, "
+            f"{counters['failed']} failed, max queue {counters['max_queue']}, "
+            f"waited {counters['wait_seconds']:.1f}s, concurrency now {counters['concurrency']}, "
+            f"p95 {counters['p95_seconds']}s, circuit {counters['circuit']}"
+        )
+    hedging = llm_hedging.stats()
+    if hedging["requests"]:
+        rate = 100 * hedging["hedged"] / hedging["requests"]
+        print(
+            f"[HEDGE] {hedging['hedged']}/{hedging['requests']} requests hedged ({rate:.0f}%), "
+            f"{hedging['hedge_wins']} won by the hedge, {hedging['failovers']} failovers, "
+            f"{hedging['failed']} failed on every provider"
+        )
+    for model, counters in model_router.stats().items():
+        print(
+            f"[ROUTER] {model}: {counters['calls']} calls, "
+            f"{100 * counters['escalation_rate']:.0f}% escalated, {counters['failed']} failed, "
+            f"avg {counters['avg_seconds']:.2f}s"
+        )
+    parsing = json_salvage.stats()
+    if any(parsing.values()):
+        print(
+            f"[JSON] {parsing['clean']} clean, {parsing['salvaged']} salvaged, "
+            f"{parsing['repair_prompts']} repair prompts ({parsing['repaired']} repaired), "
+            f"{parsing['failed']} unparseable"
+        )
+    streaming = json_stream.stats()
+    if streaming["streams"]:
+        print(
+            f"[STREAM] {streaming['streams']} streamed answers, {streaming['completed']} closed at the end of the JSON, "
+            f"{streaming['incomplete']} incomplete, first field after {streaming['avg_first_field_seconds']:.2f}s, "
+            f"total {streaming['avg_total_seconds']:.2f}s (averages)"
+        )
+
 # Single-company pipeline (Sense Decide Act)
 
-def test_pipeline(company_name: str):
-    print_section(f"PROCESSING COMPANY: {company_name.upper()}")
-    # 1. SENSE Discover website
-    url = discover_company_website(company_name)
-    print(f"[DISCOVERY] Website:", url if url else "âŒ NOT FOUND")
-    if not url:
+def sense_and_decide(company_name: str, limits=None, candidate_url: str = "", batcher=None,
+                     journal=None):
+    # Steps 1-4 of the pipeline; returns (structured, text fingerprint) or (None, None).
+    # Each finished stage is checkpointed in the journal, if any.
+    def checkpoint(stage, ok=True, **data):
+        if journal is not None:
+            journal.record(company_name, stage, ok, **data)
+    # 1. SENSE Discover website (validation already downloads the homepage)
+    page = discover_company_page(
+        company_name,
+        llm_gate=stage_slot(limits, "llm"),
+        fetch_gate=stage_slot(limits, "fetch"),
+        candidate_url=candidate_url,
+    )
+    print(f"[DISCOVERY] Website:", page.url if page else "âŒ NOT FOUND")
+    if not page:
         print(f"[SKIP] No website detected for '{company_name}'.\n")
-        return
-    # 2. SENSE Fetch HTML
-    html = fetch_website(url)
-    if not html:
+        checkpoint("discovered", ok=False)
+        return None, None
+    checkpoint("discovered", url=page.final_url)
+    if sqlite_store.is_enabled():
+        with stage_slot(limits, "write"):
+            sqlite_store.record_fetch(company_name, page)
+    # 2. SENSE HTML comes with the resolved page
+    if not page.html and not page.text:
         print("[ERROR] Unable to fetch HTML.\n")
-        return
-    print(f"[FETCH] HTML downloaded ({len(html)} characters)")
+        checkpoint("fetched", ok=False)
+        return None, None
+    if page.streamed:
+        cut = " (stopped early)" if page.truncated else ""
+        print(f"[FETCH] HTML streamed{cut}")
+    else:
+        print(f"[FETCH] HTML downloaded ({len(page.html)} characters)")
     # 3. SENSE Clean HTML readable text
-    text = extract_text_from_html(html)
+    text = page.clean_text()
     print(f"[CLEAN] Extracted clean text ({len(text)} characters)")
-    # Limit size sent to LLM
-    snippet = text[:4000]
+    # Lets scheduled_update skip this company while its website text stays the same
+    fingerprint = text_fingerprint(text)
+    checkpoint("fetched", fingerprint=fingerprint)
+    # Limit size sent to LLM, keeping the blocks most relevant to the profile fields
+    snippet = select_snippet(text)
     # 4. DECIDE: Ask LLM to extract structure
     print("\n[DECIDE] Sending clean text to LLM...\n")
-    structured = extract_structure(snippet, detail_level="standard")
+    if batcher is not None:
+        structured, batch_log = batcher.submit(snippet).result()
+        print(batch_log, end="")
+    else:
+        with stage_slot(limits, "llm"):
+            structured = extract_structure(snippet, detail_level="standard")
+    if not isinstance(structured, dict):
+        # A JSON list, string or number is not a profile
+        structured = {"error": f"not a profile ({type(structured).__name__})"}
+    if "error" in structured:
+        # Nothing usable came back: keep it out of the profiles and the KB
+        print(f"[ERROR] No profile for '{company_name}': {structured['error']}\n")
+        checkpoint("structured", ok=False, error=structured["error"])
+        return None, None
+    checkpoint("structured", structured=structured)
+    return structured, fingerprint
+
+
+def test_pipeline(company_name: str, limits=None, candidate_url: str = "", batcher=None,
+                  save=None, journal=None) -> bool:
+    # limits: optional {"llm": Semaphore, "fetch": Semaphore, "write": Semaphore}
+    # so the batch engine can bound each stage separately.
+    # candidate_url: website proposed by a batched discovery prompt, if any.
+    # batcher: optional StructuringBatcher grouping several companies per LLM request.
+    # save: optional save(structured, after) handing the ACT phase to a background
+    # writer; after() records the fingerprint once the profile is on disk.
+    # journal: optional RunJournal; finished stages of an interrupted run are reused.
+    # Returns True on success.
+    print_section(f"PROCESSING COMPANY: {company_name.upper()}")
+    if journal is not None and journal.is_done(company_name):
+        print("[RESUME] Already saved by the interrupted run - skipping\n")
+        return True
+    progress = journal.state(company_name) if journal is not None else {}
+    if progress.get("stage") == "structured":
+        # The LLM was already paid for: go straight to ACT
+        print("[RESUME] Reusing the structured result from the interrupted run")
+        structured, fingerprint = progress["structured"], progress.get("fingerprint")
+    else:
+        if progress.get("url") and not candidate_url:
+            print(f"[RESUME] Re-validating website from the interrupted run: {progress['url']}")
+            candidate_url = progress["url"]
+        structured, fingerprint = sense_and_decide(company_name, limits, candidate_url, batcher, journal)
+        if structured is None:
+            return False
     # Pretty JSON output
     print("[STRUCTURED RESULT]\n")
     print(json.dumps(structured, indent=2, ensure_ascii=False))
     # 5. ACT: Save JSON + Markdown + KB
     print("\n[ACT] Saving formatted outputs...")
-    act_save_outputs(structured)
+    def after_save():
+        # Runs only once the profile is saved; error / mock results get no fingerprint
+        if fingerprint and is_real_profile(structured):
+            save_fingerprint(
+                company_name,
+                fingerprint,
+                slugify(structured.get("company_name") or "unknown_company"),
+            )
+        if journal is not None:
+            journal.record(company_name, "saved")
+    if save is not None:
+        save(structured, after_save)
+        print("[ACT] Queued for the background writer")
+    else:
+        with stage_slot(limits, "write"):
+            act_save_outputs(structured)
+            after_save()
     print(f"\n[DONE] Completed processing for: {company_name}")
     print("=" * 70 + "\n")
+    return True
 
 # Batch processor for companies.txt
 
-def run_batch_from_file(path: str = "companies.txt"):
+def run_batch_from_file(path: str = "companies.txt", resume: bool = False):
+    # resume: continue the interrupted run of this file from its checkpoint journal
     print_section("PHASE 4 BATCH PROCESSING STARTED")
     companies = load_companies_from_file(path)
     if not companies:
         print("[ERROR] No companies found inside companies.txt")
         return
     print(f"[INFO] Found {len(companies)} companies to process.\n")
-    for i, company in enumerate(companies, start=1):
-        print(f"---- ({i}/{len(companies)}) {company} ----")
-        try:
-            test_pipeline(company)
-        except Exception as e:
-            print(f"[ERROR] Unexpected failure for '{company}': {e}")
-            print("[INFO] Continuing to next company...\n")
+    print(f"[INFO] Change history run id: {change_history.start_run('batch')}\n")
+    journal = open_journal(path, resume)
+    try:
+        for i, company in enumerate(companies, start=1):
+            print(f"---- ({i}/{len(companies)}) {company} ----")
+            try:
+                test_pipeline(company, journal=journal)
+            except Exception as e:
+                print(f"[ERROR] Unexpected failure for '{company}': {e}")
+                print("[INFO] Continuing to next company...\n")
+    finally:
+        journal.close()
     print_section("PHASE 4 BATCH PROCESSING COMPLETED")
     print("[SUCCESS] All companies processed.\n")
+    print_llm_cache_stats()
+
+# Concurrent batch engine
+
+class ThreadLocalStdout:
+    # Routes print() calls from worker threads into that worker's own buffer,
+    # so each company's log can be printed in one piece and in input order.
+    def __init__(self, real):
+        self.real = real
+        self.local = threading.local()
+
+    def capture(self, buffer):
+        self.local.buffer = buffer
+
+    def release(self):
+        self.local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer or self.real).write(text)
+
+    def flush(self):
+        self.real.flush()
+
+    def __getattr__(self, name):
+        # encoding, isatty(), fileno(), ... come from the real stream
+        return getattr(self.real, name)
+
+
+def discover_chunk(chunk, limits, router: ThreadLocalStdout):
+    # One batched discovery prompt for a group of companies.
+    # Returns (candidates, log); the log is printed in input order, ahead of
+    # the first company of the chunk, so it does not interleave with other threads
+    buffer = io.StringIO()
+    router.capture(buffer)
+    try:
+        with stage_slot(limits, "llm"):
+            candidates = discover_websites_batch(chunk)
+    except Exception as e:
+        print(f"[ERROR] Batched discovery failed, using per-company prompts: {e}")
+        candidates = {}
+    finally:
+        router.release()
+    return candidates, buffer.getvalue()
+
+
+def run_company_isolated(company: str, limits, router: ThreadLocalStdout,
+                         candidates_future=None, batcher=None, sink=None, journal=None):
+    # Runs one company inside a worker; failures never leak into other companies.
+    # With a sink, also returns the future of the queued write (else None).
+    buffer = io.StringIO()
+    router.capture(buffer)
+    writes = []
+    save = None
+    if sink is not None:
+        save = lambda structured, after: writes.append(sink.submit(structured, after))
+    try:
+        candidate_url = ""
+        if candidates_future is not None:
+            candidate_url = candidates_future.result()[0].get(company, "")
+        ok = test_pipeline(company, limits, candidate_url, batcher, save, journal)
+    except Exception as e:
+        print(f"[ERROR] Unexpected failure for '{company}': {e}")
+        ok = False
+    finally:
+        router.release()
+    return ok, buffer.getvalue(), (writes[0] if writes else None)
+
+
+def run_batch_concurrent(
+    path: str = "companies.txt",
+    workers: int = DEFAULT_WORKERS,
+    llm_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+    fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+    write_concurrency: int = DEFAULT_WRITE_CONCURRENCY,
+    discovery_batch: int = DEFAULT_DISCOVERY_BATCH,
+    structure_batch: int = DEFAULT_STRUCTURE_BATCH,
+    async_writes: bool = True,
+    resume: bool = False,
+):
+    # Same pipeline as run_batch_from_file, but several companies are in flight
+    # at once. Each stage has its own limit, so total time tracks the slowest
+    # stage instead of the sum of every network wait.
+    # Websites are first asked for discovery_batch companies per LLM call;
+    # only companies whose batched answer fails validation get their own prompts.
+    # With structure_batch > 0, snippets from several companies share one
+    # structuring request too.
+    # With async_writes, profiles are saved by a background OutputSink that
+    # groups knowledge base appends; workers never wait on the disk.
+    # With resume, companies finished by an interrupted run are skipped and the
+    # rest restart at the stage that failed.
+    print_section("PHASE 4 CONCURRENT BATCH PROCESSING STARTED")
+    companies = load_companies_from_file(path)
+    if not companies:
+        print("[ERROR] No companies found inside companies.txt")
+        return
+    print(
+        f"[INFO] Found {len(companies)} companies to process "
+        f"(workers={workers}, llm={llm_concurrency}, "
+        f"fetch={fetch_concurrency}, write={write_concurrency}).\n"
+    )
+    print(f"[INFO] Change history run id: {change_history.start_run('batch')}\n")
+
+    limits = {
+        "llm": threading.BoundedSemaphore(llm_concurrency),
+        "fetch": threading.BoundedSemaphore(fetch_concurrency),
+        "write": threading.BoundedSemaphore(write_concurrency),
+    }
+
+    batcher = None
+    router = ThreadLocalStdout(sys.stdout)
+    if structure_batch > 0:
+        batcher = StructuringBatcher(max_items=structure_batch, gate=limits["llm"], router=router)
+
+    sys.stdout = router
+    sink = OutputSink(router=router) if async_writes else None
+    journal = open_journal(path, resume)
+    succeeded = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Discovery chunks are queued first, so no worker waits on a chunk
+            # that has not been scheduled yet
+            chunk_of = {}
+            # Companies the journal already has a website for need no discovery prompt
+            to_discover = [c for c in companies if not journal.state(c).get("url")]
+            if discovery_batch > 0:
+                for start in range(0, len(to_discover), discovery_batch):
+                    chunk = to_discover[start:start + discovery_batch]
+                    chunk_future = pool.submit(discover_chunk, chunk, limits, router)
+                    for company in chunk:
+                        chunk_of[company] = chunk_future
+
+            futures = [
+                pool.submit(
+                    run_company_isolated,
+                    company, limits, router, chunk_of.get(company), batcher, sink, journal,
+                )
+                for company in companies
+            ]
+            # Print results in input order as soon as each one is ready
+            printed_chunks = set()
+            for i, (company, future) in enumerate(zip(companies, futures), start=1):
+                ok, log, write = future.result()
+                chunk_future = chunk_of.get(company)
+                if chunk_future is not None and id(chunk_future) not in printed_chunks:
+                    # The chunk's discovery log goes with its first company
+                    printed_chunks.add(id(chunk_future))
+                    router.real.write(chunk_future.result()[1])
+                if write is not None:
+                    try:
+                        _, write_log = write.result()
+                        log += write_log
+                    except Exception as e:
+                        log += f"[ERROR] Saving outputs failed for '{company}': {e}\n"
+                        ok = False
+                router.real.write(f"---- ({i}/{len(companies)}) {company} ----\n")
+                router.real.write(log)
+                router.real.flush()
+                succeeded += 1 if ok else 0
+    finally:
+        if batcher is not None:
+            batcher.close()
+        sys.stdout = router.real
+        if sink is not None:
+            sink.close()
+        journal.close()
+
+    print_section("PHASE 4 CONCURRENT BATCH PROCESSING COMPLETED")
+    print(f"[SUCCESS] {succeeded}/{len(companies)} companies processed.\n")
+    print_llm_cache_stats()
+
 # Entry point
 if __name__ == "__main__":
-    # Run everything from companies.txt
-    run_batch_from_file("companies.txt")   
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="EduScout batch runner")
+    parser.add_argument("path", nargs="?", default="companies.txt")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="process several companies at once")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--llm-concurrency", type=int, default=DEFAULT_LLM_CONCURRENCY)
+    parser.add_argument("--fetch-concurrency", type=int, default=DEFAULT_FETCH_CONCURRENCY)
+    parser.add_argument("--write-concurrency", type=int, default=DEFAULT_WRITE_CONCURRENCY)
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted batch run from its checkpoint journal")
+    parser.add_argument("--sync-writes", action="store_true",
+                        help="save outputs on the worker threads instead of a background writer")
+    parser.add_argument("--discovery-batch", type=int, default=DEFAULT_DISCOVERY_BATCH,
+                        help="companies per batched website-discovery prompt (0 = one prompt each)")
+    parser.add_argument("--structure-batch", type=int, default=DEFAULT_STRUCTURE_BATCH,
+                        help=f"companies per batched structuring request (0 = one request each, at most "
+                             f"{BATCH_MAX_ITEMS}; EDUSCOUT_STRUCTURE_BATCH_ITEMS raises the cap)")
+    parser.add_argument("--hedge", action="store_true",
+                        help="also ask the other LLM provider when the first one is slower than usual")
+    parser.add_argument("--cascade", action="store_true",
+                        help="try a cheaper model first and escalate only poor answers")
+    parser.add_argument("--stream-llm", action="store_true",
+                        help="stream LLM answers and stop reading once the JSON is complete")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="always call the LLM provider, ignoring cached answers")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream homepages and stop once enough text is collected")
+    parser.add_argument("--compact-kb", action="store_true",
+                        help="rewrite knowledge_base.jsonl to one latest record per company and exit")
+    parser.add_argument("--search", metavar="QUERY",
+                        help='search saved profiles, e.g. \'target_market:k-12 AND competitors:moodle\'')
+    parser.add_argument("--diff-corpus", metavar="DIR",
+                        help="compare a folder of re-crawled JSON profiles with the stored ones and exit")
+    parser.add_argument("--history", metavar="COMPANY",
+                        help="print the recorded changes for one company and exit")
+    parser.add_argument("--days", type=float, default=30,
+                        help="how far back --history and --churn look (default 30)")
+    parser.add_argument("--churn", action="store_true",
+                        help="print which fields changed most often and exit")
+    parser.add_argument("--render-changes", action="store_true",
+                        help="rebuild changes.log from the change history and exit")
+    parser.add_argument("--recrawl", action="store_true",
+                        help="re-check the companies most likely to have changed, within a budget")
+    parser.add_argument("--fetch-budget", type=int,
+                        help="homepage fetches a --recrawl run may spend")
+    parser.add_argument("--llm-budget", type=int,
+                        help="LLM calls a --recrawl run may spend")
+    parser.add_argument("--storage", choices=["files", "sqlite"],
+                        help="where profiles are saved (default: EDUSCOUT_STORAGE or files)")
+    parser.add_argument("--export", action="store_true",
+                        help="write JSON/Markdown files from the SQLite store and exit")
+    args = parser.parse_args()
+    if args.structure_batch > BATCH_MAX_ITEMS:
+        parser.error(f"--structure-batch {args.structure_batch} is above the {BATCH_MAX_ITEMS} companies "
+                     f"one request may carry; set EDUSCOUT_STRUCTURE_BATCH_ITEMS to raise the cap")
+    if args.cascade and args.hedge:
+        parser.error("--cascade and --hedge cannot be combined: the cascade only uses OpenRouter models, "
+                     "so there is no second provider to hedge with. Pick one.")
+
+    if args.storage:
+        sqlite_store.set_enabled(args.storage == "sqlite")
+    if args.export:
+        sqlite_store.export_files()
+        sys.exit(0)
+
+    if args.search:
+        for hit in search.search(args.search):
+            print(f"{hit['score']:>8.3f}  {hit['company_name']}  ({hit['slug']})")
+        sys.exit(0)
+
+    if args.diff_corpus:
+        recrawl = {}
+        for profile_path in sorted(Path(args.diff_corpus).glob("*.json")):
+            with profile_path.open("r", encoding="utf-8") as f:
+                recrawl[profile_path.stem] = json.load(f)
+        result = detect_corpus_changes(recrawl)
+        for slug, changes in result["changed"].items():
+            print(f"[CHANGED] {slug}: {', '.join(change['field'] for change in changes)}")
+        print(
+            f"[DIFF] {len(result['changed'])} changed, {result['unchanged']} unchanged, "
+            f"{len(result['new'])} new, {len(result['missing'])} not in this crawl"
+        )
+        sys.exit(0)
+
+    if args.history or args.churn:
+        since = time.time() - args.days * 86400
+        if args.history:
+            for change in change_history.changes_for(slugify(args.history), since):
+                when = time.strftime("%Y-%m-%d %H:%M", time.localtime(change["changed_at"]))
+                print(f"{when}  {change['field']}: {change['old']} → {change['new']}  ({change['run_id']})")
+        else:
+            for field, count in change_history.field_churn(since):
+                print(f"{count:>6}  {field}")
+        sys.exit(0)
+
+    if args.render_changes:
+        count = change_history.render_log()
+        if count:
+            print(f"[HISTORY] Rendered {count} changes → {change_history.CHANGES_LOG}")
+        else:
+            print("[HISTORY] No recorded changes - changes.log left as it is")
+        sys.exit(0)
+
+    if args.compact_kb:
+        knowledge_base.compact()
+        sys.exit(0)
+
+    if args.stream:
+        set_streaming(True)
+
+    if args.no_llm_cache:
+        llm_cache.set_enabled(False)
+
+    if args.hedge:
+        set_hedging(True)
+
+    if args.cascade:
+        model_router.set_enabled(True)
+
+    if args.stream_llm:
+        set_llm_streaming(True)
+
+    if args.recrawl:
+        scheduled_update(args.fetch_budget, args.llm_budget, args.path)
+    elif args.concurrent:
+        run_batch_concurrent(
+            args.path,
+            workers=args.workers,
+            llm_concurrency=args.llm_concurrency,
+            fetch_concurrency=args.fetch_concurrency,
+            write_concurrency=args.write_concurrency,
+            discovery_batch=args.discovery_batch,
+            structure_batch=args.structure_batch,
+            async_writes=not args.sync_writes,
+            resume=args.resume,
+        )
+    else:
+        # Run everything from companies.txt
+        run_batch_from_file(args.path, resume=args.resume)   
\ No newline at end of file
@@ -0,0 +1,9 @@
+# Tests run from the repo root or from tests/: make the flat modules
+# (main, updater, utils, agents.*) importable either way
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
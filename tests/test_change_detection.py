@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from agents import change_detection, profile_generator, sqlite_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Files backend with its profiles and hash cache under tmp_path
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    monkeypatch.setattr(profile_generator, "JSON_DIR", json_dir)
+    monkeypatch.setattr(change_detection, "FIELD_HASHES_PATH", tmp_path / "field_hashes.json")
+    monkeypatch.setattr(change_detection, "SQLITE_FIELD_HASHES_PATH", tmp_path / "field_hashes.sqlite.json")
+    monkeypatch.setattr(change_detection, "_hashes", {})
+    monkeypatch.setattr(change_detection, "_dirty", set())
+    monkeypatch.setattr(sqlite_store, "_enabled", False)
+    return json_dir
+
+
+def write_profile(json_dir, slug, profile):
+    (json_dir / f"{slug}.json").write_text(json.dumps(profile), encoding="utf-8")
+
+
+def loader(json_dir):
+    def load(slug):
+        try:
+            return json.loads((json_dir / f"{slug}.json").read_text(encoding="utf-8"))
+        except OSError:
+            return None
+    return load
+
+
+PROFILE = {"summary": "Reading app", "products": ["Reader", "Writer"], "founded": "2012"}
+
+
+def test_lists_compare_as_sets():
+    a = change_detection.field_hashes({"products": ["A", "B", "A"]})
+    b = change_detection.field_hashes({"products": ["B", "A"]})
+    assert a == b
+    c = change_detection.field_hashes({"products": ["A", "C"]})
+    assert change_detection.diff_fields(a, c) == ["products"]
+
+
+def test_new_profile_is_none(store):
+    assert change_detection.detect("acme", PROFILE, loader(store)) is None
+
+
+def test_detect_reports_old_and_new(store):
+    write_profile(store, "acme", PROFILE)
+    changes = change_detection.detect("acme", dict(PROFILE, founded="2013"), loader(store))
+    assert changes == [{"field": "founded", "old": "2012", "new": "2013"}]
+    reordered = dict(PROFILE, products=["Writer", "Reader"])
+    assert change_detection.detect("acme", reordered, loader(store)) == []
+
+
+def test_detect_does_not_record_the_new_profile(store):
+    write_profile(store, "acme", PROFILE)
+    new = dict(PROFILE, founded="2013")
+    change_detection.detect("acme", new, loader(store))
+    # Not saved: asking again still reports the change
+    assert change_detection.detect("acme", new, loader(store)) == [{"field": "founded", "old": "2012", "new": "2013"}]
+
+
+def test_commit_after_save(store):
+    write_profile(store, "acme", PROFILE)
+    new = dict(PROFILE, founded="2013")
+    write_profile(store, "acme", new)
+    change_detection.commit("acme", new)
+    stored = json.loads(change_detection.FIELD_HASHES_PATH.read_text(encoding="utf-8"))
+    assert stored["acme"]["fields"] == change_detection.field_hashes(new)
+    assert stored["acme"]["stamp"] == change_detection.profile_stamp("acme")
+
+    calls = []
+    def load(slug):
+        calls.append(slug)
+        return loader(store)(slug)
+    assert change_detection.detect("acme", new, load) == []
+    assert calls == [] # hashes were current, the profile was not read
+
+
+def test_commit_without_saved_profile_records_nothing(store):
+    change_detection.commit("ghost", PROFILE)
+    assert not change_detection.FIELD_HASHES_PATH.exists()
+
+
+def test_hand_edit_is_noticed(store):
+    write_profile(store, "acme", PROFILE)
+    change_detection.commit("acme", PROFILE)
+    edited = dict(PROFILE, summary="Edited by hand, a different length")
+    write_profile(store, "acme", edited)
+    changes = change_detection.detect("acme", edited, loader(store))
+    assert changes == []
+
+
+def test_diff_corpus(store):
+    write_profile(store, "acme", PROFILE)
+    write_profile(store, "gone", {"summary": "x"})
+    result = change_detection.diff_corpus({
+        "acme": dict(PROFILE, founded="2013"),
+        "fresh": {"summary": "new"},
+    })
+    assert result["changed"] == {"acme": [{"field": "founded", "old": "2012", "new": "2013"}]}
+    assert result["new"] == ["fresh"]
+    assert result["missing"] == ["gone"]
+    assert result["unchanged"] == 0
+
+    # The re-crawl itself was not recorded
+    again = change_detection.diff_corpus({"acme": dict(PROFILE, founded="2013")})
+    assert list(again["changed"]) == ["acme"]
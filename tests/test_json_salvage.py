@@ -0,0 +1,94 @@
+import pytest
+
+from agents import json_salvage
+from agents.json_salvage import outermost, repair, salvage_json, salvage_profile, validate_profile
+
+
+def test_clean_json_parses_as_is():
+    assert salvage_json('{"a": 1}') == ({"a": 1}, "clean")
+
+
+def test_empty_or_no_json():
+    assert salvage_json("") == (None, None)
+    assert salvage_json("Sorry, I cannot help with that.") == (None, None)
+
+
+def test_fenced_json_with_prose():
+    text = 'Here is the profile:\n```json\n{"company_name": "Acme"}\n```\nLet me know!'
+    assert salvage_json(text) == ({"company_name": "Acme"}, "salvaged")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}),
+    ("{'a': 'it\\'s'}", {"a": "it's"}),
+    ('{a: 1, b_c: "x"}', {"a": 1, "b_c": "x"}),
+    ('{"a": True, "b": None, "c": False}', {"a": True, "b": None, "c": False}),
+    ('{"a": 1, // note\n "b": /* old */ 2}', {"a": 1, "b": 2}),
+    ('{\u201ca\u201d: \u201cb\u201d}', {"a": "b"}),
+])
+def test_repairs(text, expected):
+    assert salvage_json(text) == (expected, "salvaged")
+
+
+def test_repair_leaves_strings_alone():
+    text = '{"summary": "True, None, // and a trailing comma,]"}'
+    assert repair(text) == text
+
+
+def test_cut_off_answer_is_closed():
+    assert outermost('{"a": [1, 2') == '{"a": [1, 2]}'
+    assert outermost('{"a": "unfinish') == '{"a": "unfinish"}'
+    value, how = salvage_json('{"a": 1, "b": ["x", "y"], "c": "half')
+    assert how == "salvaged"
+    assert value["a"] == 1 and value["b"] == ["x", "y"]
+
+
+def test_incomplete_member_is_dropped():
+    assert salvage_json('{"a": 1, "b":') == ({"a": 1}, "salvaged")
+
+
+def test_array_opener():
+    assert salvage_json('Results: [{"a": 1}, {"a": 2}] done', "[") == ([{"a": 1}, {"a": 2}], "salvaged")
+
+
+def test_validate_profile_coerces_shapes():
+    profile = validate_profile({
+        "company_name": ["Acme", "Inc"],
+        "founded": 2012,
+        "products": "Reader",
+        "competitors": {"a": "X", "b": "Y"},
+        "technology_stack": ["Python", "AWS"],
+        "metadata": "generated",
+    })
+    assert profile["company_name"] == "Acme, Inc"
+    assert profile["founded"] == "2012"
+    assert profile["products"] == ["Reader"]
+    assert profile["competitors"] == ["X", "Y"]
+    assert profile["technology_stack"] == {"tools": ["Python", "AWS"]}
+    assert profile["metadata"] == {"notes": "generated"}
+
+
+def test_validate_profile_unwraps():
+    assert validate_profile([{"company_name": "Acme"}]) == {"company_name": "Acme"}
+    assert validate_profile({"profile": {"company_name": "Acme"}}) == {"company_name": "Acme"}
+
+
+def test_sparse_profile_is_still_a_profile():
+    assert validate_profile({"company_name": "Acme"}) == {"company_name": "Acme"}
+    assert validate_profile({}) == {}
+
+
+@pytest.mark.parametrize("data", [None, "text", 3, [1, 2]])
+def test_validate_profile_rejects_non_objects(data):
+    assert validate_profile(data) is None
+
+
+def test_salvage_profile():
+    assert salvage_profile('```{"products": "A"}```') == ({"products": ["A"]}, "salvaged")
+    assert salvage_profile("[1, 2]") == (None, None)
+
+
+def test_record_counts():
+    before = json_salvage.stats()["failed"]
+    json_salvage.record("failed")
+    assert json_salvage.stats()["failed"] == before + 1
@@ -0,0 +1,135 @@
+import json
+import threading
+
+import pytest
+
+from agents import json_stream
+from agents.json_stream import JsonStreamParser, read_stream, sse_deltas
+from agents.llm_dispatcher import LLMCancelled, LLMUnavailable
+
+
+def feed_all(parser, pieces):
+    # Index of the piece that completed the JSON, or None
+    for i, piece in enumerate(pieces):
+        if parser.feed(piece):
+            return i
+    return None
+
+
+def test_object_completes_on_closing_brace():
+    parser = JsonStreamParser()
+    assert feed_all(parser, ['{"a": ', '1, "b": {"c"', ': [1]}', '}', " trailing"]) == 3
+    assert parser.done
+    assert json.loads(parser.text()) == {"a": 1, "b": {"c": [1]}}
+
+
+def test_prose_and_fence_before_json_are_skipped():
+    parser = JsonStreamParser()
+    feed_all(parser, ["Sure! ```json\n", '{"a": 1}', "\n```"])
+    assert parser.text() == '{"a": 1}'
+
+
+def test_brackets_and_quotes_inside_strings():
+    parser = JsonStreamParser()
+    text = '{"a": "} ] \\" {", "b": "x"}'
+    assert feed_all(parser, list(text)) == len(text) - 1
+    assert json.loads(parser.text()) == {"a": '} ] " {', "b": "x"}
+
+
+def test_first_field_time():
+    parser = JsonStreamParser()
+    parser.feed('{"a": 1')
+    assert parser.first_field_at is None
+    parser.feed(', "b"')
+    assert parser.first_field_at is not None
+    nested = JsonStreamParser()
+    nested.feed('{"a": {"x": 1, "y": 2')
+    assert nested.first_field_at is None # commas below the top level do not count
+
+
+def test_array():
+    parser = JsonStreamParser("[")
+    assert feed_all(parser, ["[", "1, 2", "]"]) == 2
+    assert parser.text() == "[1, 2]"
+
+
+def test_only_the_expected_opener_starts_a_value():
+    parser = JsonStreamParser("{")
+    feed_all(parser, ["Here is the profile [JSON below]:\n", '{"a": [1]}'])
+    assert parser.text() == '{"a": [1]}'
+
+
+def test_closed_value_that_does_not_parse_is_skipped():
+    parser = JsonStreamParser("[")
+    assert feed_all(parser, ["See [JSON below]:\n", '[{"a": 1}]']) == 1
+    assert parser.rejected == "[JSON below]"
+    assert json.loads(parser.text()) == [{"a": 1}]
+
+
+def test_incomplete_text_is_everything_received():
+    parser = JsonStreamParser()
+    parser.feed('ok {"a": ')
+    assert not parser.done
+    assert parser.text() == 'ok {"a": '
+
+
+def event(content):
+    return "data: " + json.dumps({"choices": [{"delta": {"content": content}}]})
+
+
+def test_sse_deltas():
+    lines = [": keep-alive", "", "event: message", event("a"), "data: not json", event(""), event("b"), "data: [DONE]", event("c")]
+    assert list(sse_deltas(lines)) == ["a", "b"]
+
+
+def test_sse_error_event():
+    with pytest.raises(ValueError):
+        list(sse_deltas(['data: {"error": "overloaded"}']))
+
+
+class FakeResponse:
+    def __init__(self, lines):
+        self.lines = lines
+        self.encoding = None
+        self.closed = False
+        self.read = 0
+
+    def iter_lines(self, decode_unicode=True):
+        for line in self.lines:
+            self.read += 1
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+def test_read_stream_closes_early():
+    response = FakeResponse([event('{"a"'), event(": 1}"), event(" Let me know if..."), "data: [DONE]"])
+    assert read_stream(response, started=0.0) == ('{"a": 1}', True)
+    assert response.closed
+    assert response.read == 2
+
+
+def test_unparsed_answer_is_returned_for_salvage():
+    response = FakeResponse([event("Profile {see below}: "), event('{"a": 1,}'), "data: [DONE]"])
+    assert read_stream(response, started=0.0) == ('Profile {see below}: {"a": 1,}', False)
+
+
+def test_incomplete_stream_raises_and_is_counted():
+    before = json_stream.stats()["incomplete"]
+    response = FakeResponse([event('{"a": 1,'), "data: [DONE]"])
+    with pytest.raises(LLMUnavailable):
+        read_stream(response, started=0.0)
+    assert response.closed
+    assert json_stream.stats()["incomplete"] == before + 1
+
+
+def test_cancelled_stream():
+    cancel = threading.Event()
+    cancel.set()
+    before = json_stream.stats()["streams"]
+    response = FakeResponse([event('{"a": 1}')])
+    with pytest.raises(LLMCancelled):
+        read_stream(response, started=0.0, cancel=cancel)
+    assert response.closed
+    assert json_stream.stats()["streams"] == before + 1
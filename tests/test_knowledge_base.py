@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from agents import knowledge_base
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    path = tmp_path / "knowledge_base.jsonl"
+    monkeypatch.setattr(knowledge_base, "KB_PATH", path)
+    monkeypatch.setattr(knowledge_base, "INDEX_PATH", tmp_path / "knowledge_base.idx.json")
+    monkeypatch.setattr(knowledge_base, "_index", None)
+    return path
+
+
+def lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_latest_record_wins(kb):
+    knowledge_base.append_records([{"company_name": "Acme", "v": 1}, {"company_name": "Other", "v": 1}])
+    knowledge_base.append_record({"company_name": "Acme", "v": 2})
+    assert knowledge_base.read_profile("acme")["v"] == 2
+    assert sorted(knowledge_base.all_slugs()) == ["acme", "other"]
+    assert len(lines(kb)) == 3
+
+
+def test_index_is_rebuilt_after_outside_edits(kb):
+    knowledge_base.append_record({"company_name": "Acme", "v": 1})
+    with kb.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"company_name": "Acme", "v": 9}) + "\n")
+    assert knowledge_base.read_profile("acme")["v"] == 9
+
+
+def test_compact(kb):
+    for v in range(3):
+        knowledge_base.append_records([{"company_name": "Acme", "v": v}, {"company_name": "Other", "v": v}])
+    assert knowledge_base.compact() == (6, 2)
+    assert [r["v"] for r in lines(kb)] == [2, 2]
+    assert knowledge_base.read_profile("other")["v"] == 2
+
+
+def test_threshold_compacts_synchronously(kb, monkeypatch):
+    monkeypatch.setattr(knowledge_base, "COMPACT_MIN_LINES", 6)
+    monkeypatch.setattr(knowledge_base, "COMPACT_RATIO", 3)
+    for v in range(5):
+        knowledge_base.append_records([{"company_name": "Acme", "v": v}])
+    assert len(lines(kb)) == 5
+    knowledge_base.append_records([{"company_name": "Acme", "v": 5}])
+    assert lines(kb) == [{"company_name": "Acme", "v": 5}]
+    knowledge_base.append_records([{"company_name": "Acme", "v": 6}])
+    assert knowledge_base.read_profile("acme")["v"] == 6
@@ -0,0 +1,170 @@
+import threading
+import time
+
+import pytest
+
+from agents import llm_dispatcher
+from agents.llm_dispatcher import AdaptiveConcurrency, CircuitBreaker, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_dispatcher.time, "monotonic", clock)
+    return clock
+
+
+def test_bucket_burst_then_waits(clock):
+    bucket = TokenBucket(60) # one per second, burst of 60
+    assert all(bucket.take() == 0.0 for _ in range(60))
+    assert bucket.take() == pytest.approx(1.0)
+    assert bucket.take() == pytest.approx(2.0) # reservations queue up
+
+
+def test_bucket_refills(clock):
+    bucket = TokenBucket(60, burst=2)
+    bucket.take(2)
+    clock.now += 1.0
+    assert bucket.take() == 0.0
+    clock.now += 10.0
+    assert bucket.level <= bucket.capacity
+    bucket.take()
+    assert bucket.level == pytest.approx(1.0) # capped at the burst size
+
+
+def test_bucket_oversized_request_is_capped(clock):
+    bucket = TokenBucket(600, burst=100)
+    assert bucket.take(5000) == 0.0 # waits for a full bucket, not forever
+
+
+def test_unlimited_bucket():
+    assert TokenBucket(0).take(10**6) == 0.0
+
+
+def test_aimd_additive_increase():
+    limit = AdaptiveConcurrency(initial=2, maximum=4)
+    for _ in range(2):
+        limit.acquire()
+        limit.release()
+    assert limit.limit == pytest.approx(2 + 1 / 2 + 1 / 2.5)
+    for _ in range(100):
+        limit.acquire()
+        limit.release()
+    assert limit.limit == 4
+
+
+def test_aimd_multiplicative_decrease():
+    limit = AdaptiveConcurrency(initial=8, maximum=8)
+    limit.acquire()
+    limit.release(throttled=True)
+    assert limit.limit == 4
+    for _ in range(5):
+        limit.acquire()
+        limit.release(throttled=True)
+    assert limit.limit == 1
+    limit.acquire()
+    limit.release(succeeded=False)
+    assert limit.limit == 1 # a plain failure neither grows nor shrinks
+
+
+def test_aimd_blocks_at_limit():
+    limit = AdaptiveConcurrency(initial=1, maximum=1)
+    limit.acquire()
+    entered = threading.Event()
+
+    def worker():
+        limit.acquire()
+        entered.set()
+        limit.release()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not entered.wait(0.1)
+    assert limit.waiting == 1
+    limit.release()
+    assert entered.wait(2)
+    thread.join()
+    assert limit.in_flight == 0
+
+
+def test_breaker_opens_and_recovers(clock):
+    breaker = CircuitBreaker(failures=2, cooldown=30)
+    breaker.record(False)
+    assert breaker.state() == "closed"
+    breaker.record(False)
+    assert breaker.state() == "open" and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.state() == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow() # one trial at a time
+    breaker.record(False)
+    assert breaker.state() == "open" # a failed trial re-opens it
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state() == "closed" and breaker.allow()
+
+
+def test_breaker_ignores_cancelled_calls(clock):
+    breaker = CircuitBreaker(failures=1, cooldown=30)
+    breaker.record(None)
+    assert breaker.state() == "closed"
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_retry_after():
+    assert llm_dispatcher.retry_after_seconds(None) is None
+    assert llm_dispatcher.retry_after_seconds(Response({})) is None
+    assert llm_dispatcher.retry_after_seconds(Response({"Retry-After": "7"})) == 7.0
+    assert llm_dispatcher.retry_after_seconds(Response({"Retry-After": "soon"})) is None
+    date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 60))
+    assert 50 < llm_dispatcher.retry_after_seconds(Response({"Retry-After": date})) <= 60
+
+
+class Ok:
+    status_code = 200
+    headers = {}
+
+
+def test_streamed_body_holds_the_slot():
+    dispatcher = llm_dispatcher.ProviderDispatcher("test-stream", 0, 0, 4)
+    seen = []
+
+    def read(response):
+        seen.append(dispatcher.concurrency.in_flight)
+        time.sleep(0.05)
+        return "body"
+
+    assert dispatcher.call(lambda: Ok(), read=read) == "body"
+    assert seen == [1]
+    assert dispatcher.concurrency.in_flight == 0
+    assert dispatcher.latencies[-1] >= 0.05
+
+
+def test_broken_body_releases_the_slot():
+    dispatcher = llm_dispatcher.ProviderDispatcher("test-broken", 0, 0, 4)
+    calls = []
+
+    def read(response):
+        calls.append(1)
+        raise llm_dispatcher.LLMUnavailable("cut off")
+
+    with pytest.raises(llm_dispatcher.LLMUnavailable):
+        dispatcher.call(lambda: Ok(), read=read)
+    assert calls == [1] # not retried
+    assert dispatcher.concurrency.in_flight == 0
+    assert dispatcher.stats["failed"] == 1 and not dispatcher.latencies
@@ -0,0 +1,101 @@
+import math
+
+from agents import recrawl_scheduler
+from agents.recrawl_scheduler import (
+    BASE_INTERVAL, DAY, MAX_INTERVAL, MIN_INTERVAL, Budget, company_key,
+    is_due, plan, priority, record_check, record_failure,
+)
+
+NOW = 1_700_000_000.0
+
+
+def test_unchanged_checks_back_off():
+    state = {}
+    entry = record_check(state, "Acme", False, now=NOW)
+    assert entry["interval"] == 2 * BASE_INTERVAL
+    for _ in range(20):
+        record_check(state, "Acme", False, now=NOW)
+    assert entry["interval"] == MAX_INTERVAL
+    assert entry["checks"] == 21 and entry["changes"] == 0
+
+
+def test_change_shortens_interval():
+    state = {}
+    entry = record_check(state, "Acme", True, now=NOW)
+    assert entry["interval"] == max(BASE_INTERVAL / 2, MIN_INTERVAL)
+    assert entry["last_changed"] == NOW
+    for _ in range(10):
+        record_check(state, "Acme", True, now=NOW)
+    assert entry["interval"] == MIN_INTERVAL
+
+
+def test_first_check_keeps_interval():
+    state = {}
+    entry = record_check(state, "Acme", None, now=NOW)
+    assert entry["interval"] == BASE_INTERVAL
+    assert entry["checks"] == 1 and entry["changes"] == 0
+    assert entry["last_checked"] == NOW
+
+
+def test_failure_has_no_backoff():
+    state = {}
+    record_check(state, "Acme", False, now=NOW)
+    entry = record_failure(state, "Acme", now=NOW + DAY)
+    assert entry["interval"] == 2 * BASE_INTERVAL
+    assert entry["failures"] == 1
+    assert entry["checks"] == 1
+    assert entry["last_checked"] == NOW + DAY
+
+
+def test_company_names_share_an_entry():
+    state = {}
+    record_check(state, "Khan Academy", False, now=NOW)
+    record_check(state, "khan  academy!", False, now=NOW)
+    assert len(state) == 1
+    assert state[company_key("KHAN ACADEMY")]["checks"] == 2
+
+
+def test_due_and_priority():
+    state = {}
+    entry = record_check(state, "Acme", False, now=NOW)
+    assert is_due(None, NOW) and priority(None, NOW) == math.inf
+    assert not is_due(entry, NOW + entry["interval"] - 1)
+    assert is_due(entry, NOW + entry["interval"])
+    assert priority(entry, NOW + 2 * entry["interval"]) > priority(entry, NOW + entry["interval"])
+
+
+def test_plan_ranks_never_checked_then_most_likely_stale():
+    state = {}
+    for _ in range(3):
+        record_check(state, "Steady", False, now=NOW - 10 * DAY)
+    state[company_key("Steady")]["interval"] = DAY
+    for _ in range(3):
+        record_check(state, "Busy", True, now=NOW - 10 * DAY)
+    state[company_key("Busy")]["interval"] = DAY
+    record_check(state, "Recent", False, now=NOW)
+
+    assert plan(["Steady", "Busy", "Recent", "New"], state, now=NOW) == ["New", "Busy", "Steady"]
+
+
+def test_state_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(recrawl_scheduler, "STATE_PATH", tmp_path / "state.json")
+    assert recrawl_scheduler.load_state() == {}
+    state = {}
+    record_check(state, "Acme", True, now=NOW)
+    recrawl_scheduler.save_state(state)
+    assert recrawl_scheduler.load_state() == state
+
+
+def test_budget():
+    budget = Budget(fetches=3, llm_calls=1)
+    assert budget.can_afford(fetches=3, llm_calls=1)
+    assert not budget.can_afford(llm_calls=2)
+    gate = budget.gate(fetches=1)
+    with gate:
+        pass
+    with gate:
+        pass
+    assert budget.fetches == 1
+    budget.charge(fetches=2, llm_calls=1)
+    assert budget.fetches == -1 and budget.llm_calls == 0
+    assert budget.exhausted()
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from agents import resolution_cache
+from agents.resolution_cache import normalize_company_name
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    path = tmp_path / "website_resolution.jsonl"
+    monkeypatch.setattr(resolution_cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(resolution_cache, "RESOLUTION_CACHE_PATH", path)
+    monkeypatch.setattr(resolution_cache, "_entries", None)
+    return path
+
+
+def reload():
+    resolution_cache._entries = None
+
+
+def test_normalize_company_name():
+    assert normalize_company_name("  Khan   Academy ") == "khan academy"
+    assert normalize_company_name("Khan-Academy, Inc.") == "khan academy inc"
+    assert normalize_company_name(None) == ""
+
+
+def test_resolved_round_trip(cache):
+    assert resolution_cache.lookup("Acme") is None
+    resolution_cache.store_resolved("Acme", "https://acme.com", "https://www.acme.com/")
+    reload()
+    entry = resolution_cache.lookup("acme ")
+    assert entry["status"] == "resolved"
+    assert entry["url"] == "https://acme.com"
+    assert entry["final_url"] == "https://www.acme.com/"
+
+
+def test_final_url_defaults_to_url(cache):
+    resolution_cache.store_resolved("Acme", "https://acme.com", "")
+    assert resolution_cache.lookup("Acme")["final_url"] == "https://acme.com"
+
+
+def test_latest_line_wins(cache):
+    resolution_cache.store_unresolved("Acme")
+    resolution_cache.store_resolved("Acme", "https://acme.com", None)
+    reload()
+    assert resolution_cache.lookup("Acme")["status"] == "resolved"
+    assert len(cache.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_negative_entries_expire_sooner(cache, monkeypatch):
+    resolution_cache.store_resolved("Acme", "https://acme.com", None)
+    resolution_cache.store_unresolved("Nowhere")
+    later = resolution_cache.time.time() + resolution_cache.NEGATIVE_TTL + 1
+    monkeypatch.setattr(resolution_cache.time, "time", lambda: later)
+    assert resolution_cache.lookup("Acme") is not None
+    assert resolution_cache.lookup("Nowhere") is None
+
+
+def test_seen_includes_expired_entries(cache, monkeypatch):
+    assert not resolution_cache.seen("Nowhere")
+    resolution_cache.store_unresolved("Nowhere")
+    later = resolution_cache.time.time() + resolution_cache.NEGATIVE_TTL + 1
+    monkeypatch.setattr(resolution_cache.time, "time", lambda: later)
+    assert resolution_cache.lookup("Nowhere") is None
+    assert resolution_cache.seen("nowhere")
+    resolution_cache.invalidate("Nowhere")
+    assert not resolution_cache.seen("Nowhere")
+
+
+def test_corrupt_lines_are_skipped(cache):
+    resolution_cache.store_resolved("Acme", "https://acme.com", None)
+    with cache.open("a", encoding="utf-8") as f:
+        f.write('{"key": "half-writ')
+    reload()
+    assert resolution_cache.lookup("Acme")["url"] == "https://acme.com"
+
+
+def test_invalidate_rewrites_the_file(cache):
+    resolution_cache.store_resolved("Acme", "https://acme.com", None)
+    resolution_cache.store_resolved("Other", "https://other.com", None)
+    resolution_cache.invalidate("ACME")
+    assert resolution_cache.lookup("Acme") is None
+    reload()
+    assert resolution_cache.lookup("Acme") is None
+    keys = [json.loads(line)["key"] for line in cache.read_text(encoding="utf-8").splitlines()]
+    assert keys == ["other"]
+
+
+def test_superseded_lines_are_compacted_on_load(cache):
+    for i in range(60):
+        resolution_cache.store_resolved("Acme", f"https://acme{i}.com", None)
+    reload()
+    assert resolution_cache.lookup("Acme")["url"] == "https://acme59.com"
+    assert len(cache.read_text(encoding="utf-8").splitlines()) == 1
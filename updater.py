@@ -1,11 +1,31 @@
+import hashlib
 import json
+import re
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List
 
-BASE_DIR = Path(__file__).resolve().parents[1]
+BASE_DIR = Path(__file__).resolve().parent
 JSON_DIR = BASE_DIR / "profiles" / "json"
-CHANGES_LOG = BASE_DIR / "changes.log"
+# Runtime state: lives with the other caches, not the tracked profiles
+FINGERPRINTS_PATH = BASE_DIR / "cache" / "fingerprints.json"
+
+# Lines that change on every visit without the company changing
+# (dates, times, "updated 3 hours ago", copyright years)
+VOLATILE_LINE = re.compile(
+    r"(\b\d{4}-\d{2}-\d{2}\b"
+    r"|\b\d{1,2}[/.]\d{1,2}[/.]\d{2,4}\b"
+    r"|\b\d{1,2}:\d{2}\b"
+    r"|\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.? \d{1,2}\b"
+    r"|\b\d{1,2} (jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b"
+    r"|\bago\b|©|\bcopyright\b)"
+)
+# Counters like "12,345 learners" or "1500000 users" drift constantly
+COUNTER = re.compile(r"\b\d{1,3}(?:[,.]\d{3})+\b|\b\d{5,}\b")
+
+# Batch workers may record fingerprints at the same time
+_fingerprints_lock = threading.Lock()
 
 
 def load_existing_profile(company_slug: str) -> Dict:
@@ -13,6 +33,10 @@ def load_existing_profile(company_slug: str) -> Dict:
     # INPUT: "instructure"
     # OUTPUT: existing JSON data or None if doesn't exist
     
+    from agents import sqlite_store
+    if sqlite_store.is_enabled():
+        return sqlite_store.load_profile(company_slug)
+
     json_path = JSON_DIR / f"{company_slug}.json"
     
     if not json_path.exists():
@@ -28,54 +52,34 @@ def load_existing_profile(company_slug: str) -> Dict:
 
 def detect_changes(old_data: Dict, new_data: Dict) -> List[Dict]:
     # Compare old vs new data and detect what changed
-    
-    changes = []
-    
-    # Fields to monitor for changes
-    monitored_fields = [
-        "founded", "headquarters", "summary", "products", 
-        "target_market", "pricing_model", "company_size",
-        "key_features", "use_cases", "value_proposition",
-        "market_position", "competitors", "technology_stack"
-    ]
-    
-    for field in monitored_fields:
-        old_value = old_data.get(field)
-        new_value = new_data.get(field)
-        
-        # Convert to JSON strings for comparison (handles lists/dicts)
-        old_str = json.dumps(old_value, sort_keys=True)
-        new_str = json.dumps(new_value, sort_keys=True)
-        
-        if old_str != new_str:
-            changes.append({
-                "field": field,
-                "old": old_value,
-                "new": new_value
-            })
-    
-    return changes
+    # (lists compare as sets: reordering products is not a change)
+    from agents.change_detection import build_changes, diff_fields, field_hashes
+
+    fields = diff_fields(field_hashes(old_data), field_hashes(new_data))
+    return build_changes(fields, old_data, new_data)
+
 
+def detect_corpus_changes(new_profiles: Dict, log: bool = False) -> Dict:
+    # Diff a full re-crawl {slug: profile} against the stored profiles in one pass
+    # (see agents.change_detection.diff_corpus for the result shape)
+    from agents.change_detection import diff_corpus
 
-def log_changes(company_name: str, changes: List[Dict]):
-    # Write changes to log file with timestamp
+    result = diff_corpus(new_profiles)
+    if log:
+        for slug, changes in result["changed"].items():
+            log_changes(new_profiles[slug].get("company_name", slug), changes, slug)
+    return result
+
+
+def log_changes(company_name: str, changes: List[Dict], company_slug: str = None):
+    # Record changes in the change history (changes.log gets the rendered block)
     
     if not changes:
         return
     
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    with CHANGES_LOG.open("a", encoding="utf-8") as f:
-        f.write(f"\n{'='*70}\n")
-        f.write(f"[{timestamp}] CHANGES DETECTED: {company_name}\n")
-        f.write(f"{'='*70}\n")
-        
-        for change in changes:
-            f.write(f"\nField: {change['field']}\n")
-            f.write(f"  OLD: {change['old']}\n")
-            f.write(f"  NEW: {change['new']}\n")
-        
-        f.write(f"\n")
+    from agents import change_history
+    from agents.profile_generator import slugify
+    change_history.record(company_slug or slugify(company_name), company_name, changes)
     
     print(f"[UPDATE] Logged {len(changes)} changes for {company_name}")
 
@@ -84,57 +88,181 @@ def check_for_updates(company_slug: str, new_data: Dict) -> bool:
     # Main update checker function
     # Returns True if changes were detected, False if no changes
     
-    # Load existing profile
-    old_data = load_existing_profile(company_slug)
+    from agents import change_detection
+
+    # Per-field hashes of the stored profile; it is only read from disk
+    # when a field changed (or its hashes were never recorded)
+    # (act_save_outputs commits the new hashes once the profile is written)
+    changes = change_detection.detect(company_slug, new_data, load_existing_profile)
+    change_detection.save()
     
     # If no existing profile, this is a new entry
-    if old_data is None:
+    if changes is None:
         print(f"[UPDATE] New company profile created: {company_slug}")
         return False
     
-    # Detect changes
-    changes = detect_changes(old_data, new_data)
-    
     if changes:
         company_name = new_data.get("company_name", company_slug)
-        log_changes(company_name, changes)
+        log_changes(company_name, changes, company_slug)
         print(f"[UPDATE] {len(changes)} changes detected!")
         return True
     else:
         print(f"[UPDATE]  No changes detected (data is up-to-date)")
         return False
 
-def scheduled_update():
-    # This function could be called by a scheduler (cron, schedule library, etc.)
-    # For now, it's just a placeholder showing how it would work
+def text_fingerprint(clean_text: str) -> str:
+    # Hash of the cleaned website text, ignoring volatile lines and counters
+    stable_lines = []
+    for line in clean_text.lower().splitlines():
+        if VOLATILE_LINE.search(line):
+            continue
+        line = COUNTER.sub("#", line)
+        stable_lines.append(" ".join(line.split()))
+    return hashlib.sha256("\n".join(stable_lines).encode("utf-8")).hexdigest()
+
+
+def fingerprint_key(company_name: str) -> str:
+    # Fingerprints are keyed by the name from companies.txt, normalized
+    # the same way as the website resolution cache
+    from agents.resolution_cache import normalize_company_name
+    return normalize_company_name(company_name)
+
+
+def is_real_profile(profile) -> bool:
+    # Worth a fingerprint: not an error record and not the offline mock answer.
+    # A fingerprint makes later runs skip the site, so a failed structuring
+    # must never leave one behind.
+    if not isinstance(profile, dict) or "error" in profile:
+        return False
+    metadata = profile.get("metadata")
+    return not (isinstance(metadata, dict) and metadata.get("source") == "mock")
+
+
+def load_fingerprints() -> Dict:
+    try:
+        with FINGERPRINTS_PATH.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_fingerprint(company_name: str, fingerprint: str, profile_slug: str):
+    # Remember the text a profile was built from
+    with _fingerprints_lock:
+        fingerprints = load_fingerprints()
+        fingerprints[fingerprint_key(company_name)] = {
+            "fingerprint": fingerprint,
+            "slug": profile_slug,
+            "checked": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        FINGERPRINTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = FINGERPRINTS_PATH.with_suffix(".json.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(fingerprints, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(FINGERPRINTS_PATH)
+
+
+def is_unchanged(company_name: str, fingerprint: str) -> bool:
+    # True if the site text matches the one the saved profile was built from
+    entry = load_fingerprints().get(fingerprint_key(company_name))
+    if not entry or entry.get("fingerprint") != fingerprint:
+        return False
+    return load_existing_profile(entry.get("slug")) is not None
+
+
+def scheduled_update(fetch_budget: int = None, llm_budget: int = None, path: str = "companies.txt"):
+    # Called by a scheduler (cron, schedule library, ...). Re-checks the companies
+    # most likely to have changed, within a per-run budget of fetches and LLM calls.
+    # Companies that keep coming back unchanged are checked less and less often.
     
     from utils import load_companies_from_file
-    from agents.discovery_4 import discover_company_website, fetch_website, extract_text_from_html
+    from agents.discovery_4 import discover_company_page
+    from agents.snippets import select_snippet
     from agents.structuring import extract_structure
+    from agents.profile_generator import act_save_outputs, slugify
+    from agents import change_detection, change_history, llm_dispatcher, recrawl_scheduler, resolution_cache
     
     print("\n[SCHEDULER] Starting scheduled update check...")
+    print(f"[SCHEDULER] Change history run id: {change_history.start_run('scheduled')}")
+    
+    companies = load_companies_from_file(path)
+    state = recrawl_scheduler.load_state()
+    budget = recrawl_scheduler.Budget(
+        recrawl_scheduler.DEFAULT_FETCH_BUDGET if fetch_budget is None else fetch_budget,
+        recrawl_scheduler.DEFAULT_LLM_BUDGET if llm_budget is None else llm_budget,
+    )
+    queue = recrawl_scheduler.plan(companies, state)
+    print(f"[SCHEDULER] {len(queue)}/{len(companies)} companies due "
+          f"(budget: {budget.fetches} fetches, {budget.llm_calls} LLM calls)")
     
-    companies = load_companies_from_file("companies.txt")
     changes_detected = 0
+    skipped_unchanged = 0
+    checked = 0
+    deferred = 0
     
-    for company in companies[:5]:  # Process first 5 for demo
+    for company in queue:
+        if budget.exhausted():
+            break
+        # A company without a cached website needs at least one discovery prompt
+        discovery_calls = 0 if resolution_cache.lookup(company) else 1
+        if not budget.can_afford(fetches=1, llm_calls=discovery_calls):
+            deferred += 1
+            continue
         print(f"\n[SCHEDULER] Checking: {company}")
         
-        # Re-run discovery and structuring
-        url = discover_company_website(company)
-        if not url:
+        # Re-run discovery (charged per fetch and per LLM call actually made)
+        calls_before = llm_dispatcher.total_calls()
+        page = discover_company_page(company, fetch_gate=budget.gate(fetches=1))
+        budget.charge(llm_calls=llm_dispatcher.total_calls() - calls_before)
+        if not page or not (page.html or page.text):
+            # No backoff: a broken site should not drift further out
+            print("[SCHEDULER] No website content - will retry after the usual interval")
+            recrawl_scheduler.record_failure(state, company)
+            recrawl_scheduler.save_state(state)
             continue
         
-        html = fetch_website(url)
-        if not html:
+        text = page.clean_text()
+
+        # Same website text as last time: no LLM call, no profile rewrite
+        fingerprint = text_fingerprint(text)
+        if is_unchanged(company, fingerprint):
+            print("[SCHEDULER] Website content unchanged - skipping")
+            skipped_unchanged += 1
+            checked += 1
+            recrawl_scheduler.record_check(state, company, changed=False)
+            recrawl_scheduler.save_state(state)
+            continue
+
+        if not budget.can_afford(llm_calls=1):
+            print("[SCHEDULER] LLM budget spent - leaving this company for the next run")
+            deferred += 1
+            continue
+
+        # Cascade escalations or a repair prompt can make this more than one call
+        calls_before = llm_dispatcher.total_calls()
+        new_data = extract_structure(select_snippet(text))
+        budget.charge(llm_calls=llm_dispatcher.total_calls() - calls_before)
+        if not isinstance(new_data, dict):
+            new_data = {"error": f"not a profile ({type(new_data).__name__})"}
+        if "error" in new_data:
+            print(f"[SCHEDULER] No usable profile ({new_data['error']}) - will retry next run")
             continue
         
-        text = extract_text_from_html(html)
-        new_data = extract_structure(text[:4000])
-        
-        # Check for changes
-        slug = company.lower().replace(" ", "_")
-        if check_for_updates(slug, new_data):
+        # Check for changes and save the refreshed profile
+        slug = slugify(new_data.get("company_name") or "unknown_company")
+        is_new = change_detection.profile_stamp(slug) is None
+        changed = act_save_outputs(new_data)
+        if changed:
             changes_detected += 1
+        if is_real_profile(new_data):
+            save_fingerprint(company, fingerprint, slug)
+        checked += 1
+        # A first profile is a plain check: it says nothing about change frequency
+        entry = recrawl_scheduler.record_check(state, company, changed=None if is_new else changed)
+        recrawl_scheduler.save_state(state)
+        print(f"[SCHEDULER] Next check in {entry['interval'] / 86400:.1f} days")
     
-    print(f"\n[SCHEDULER] Update check complete. {changes_detected} companies changed.")
+    print(
+        f"\n[SCHEDULER] Update check complete. {checked} checked, {changes_detected} companies changed, "
+        f"{skipped_unchanged} skipped (content unchanged), {deferred} deferred (budget)."
+    )